@@ -0,0 +1,83 @@
+"""
+Benchmark de carga de hechos en 'preprocessed_products':
+compara la ruta con execute_values (bulk_ingest_preprocessed_products)
+contra la carga con COPY FROM STDIN (copy_preprocessed_products_from_df).
+
+Uso (desde la raíz del repositorio, con la BD de config.py disponible):
+    python -m benchmarks.benchmark_fact_loader --rows 100000 --chunk-size 50000
+
+Las filas se generan sintéticamente bajo un sitio web propio del benchmark
+y se eliminan al terminar.
+"""
+import argparse
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from config import DB_CONFIG
+from database_manager import PostgresManager
+
+BENCHMARK_SITE = "Benchmark Loader"
+
+
+def build_synthetic_df(rows, distinct_products=5000):
+    rng = np.random.default_rng(42)
+    product_idx = rng.integers(0, distinct_products, size=rows)
+    return pd.DataFrame({
+        'name': [f"BENCH producto {i}" for i in product_idx],
+        'price': rng.uniform(0.5, 50, size=rows).round(2),
+        'currency': 'USD',
+        'site': BENCHMARK_SITE,
+        'url': 'https://benchmark.local/producto',
+        'extracted_quantity': rng.choice([250.0, 500.0, 1.0], size=rows),
+        'normalized_unit': rng.choice(['gramos', 'mililitros', 'unidades'], size=rows),
+        'product_type': 'benchmark',
+    })
+
+
+def cleanup(db):
+    db.cursor.execute("""
+        DELETE FROM preprocessed_products
+        WHERE website_id IN (SELECT id FROM websites WHERE name = %s);
+    """, (BENCHMARK_SITE,))
+    db.cursor.execute("DELETE FROM products WHERE name LIKE 'BENCH producto %%';")
+    db.cursor.execute("DELETE FROM product_type WHERE name = 'benchmark';")
+    db.cursor.execute("DELETE FROM websites WHERE name = %s;", (BENCHMARK_SITE,))
+    db.conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--chunk-size', type=int, default=50000)
+    args = parser.parse_args()
+
+    df = build_synthetic_df(args.rows)
+    now = datetime.now()
+
+    with PostgresManager(DB_CONFIG) as db:
+        if not db.conn:
+            raise SystemExit("No se pudo conectar a la base de datos.")
+        cleanup(db)
+        try:
+            start = time.perf_counter()
+            counts = db.bulk_ingest_preprocessed_products(df.to_dict('records'), now)
+            execute_values_time = time.perf_counter() - start
+            print(f"execute_values: {counts['facts_written']} filas en {execute_values_time:.2f}s "
+                  f"({counts['facts_written'] / execute_values_time:,.0f} filas/s)")
+
+            start = time.perf_counter()
+            counts = db.copy_preprocessed_products_from_df(df, now, chunk_size=args.chunk_size)
+            copy_time = time.perf_counter() - start
+            print(f"COPY (csv):     {counts['facts_written']} filas en {copy_time:.2f}s "
+                  f"({counts['facts_written'] / copy_time:,.0f} filas/s)")
+
+            print(f"Aceleración COPY vs execute_values: {execute_values_time / copy_time:.1f}x")
+        finally:
+            cleanup(db)
+
+
+if __name__ == '__main__':
+    main()
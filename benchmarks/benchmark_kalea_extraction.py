@@ -0,0 +1,79 @@
+"""
+Equivalencia y rendimiento de los modos de extracción de KaleaMarketScraper.
+
+Abre cada página HTML guardada de Kalea Market (por ejemplo con "Guardar como"
+después de cargar todos los productos) en el navegador, ejecuta la extracción
+'element' (find_element por tarjeta, referencia) y la extracción 'bulk' (un único
+execute_script), verifica que ambas devuelvan exactamente los mismos productos y
+reporta el tiempo de cada una. Si junto a la página hay un '<página>.expected.json'
+(nombre, precio y moneda de cada producto), ambas extracciones deben coincidir además
+con ese resultado.
+
+benchmarks/fixtures/kalea_price_branches.html tiene una tarjeta por rama de la selección
+de precio (contenedor oculto con 'hide', varios candidatos, p.price sin contenedor,
+precios tachados con uno y dos <del>, tarjetas repetidas o sin nombre) y se usa por defecto.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.benchmark_kalea_extraction
+    python -m benchmarks.benchmark_kalea_extraction benchmarks/fixtures/kalea_price_branches.html otra_pagina.html
+"""
+import argparse
+import json
+import logging
+import pathlib
+import time
+
+from scraper.scrapers.kalea import KaleaMarketScraper
+from scraper.webdriver_manager import WebDriverManager
+
+DEFAULT_FIXTURE = pathlib.Path(__file__).parent / 'fixtures' / 'kalea_price_branches.html'
+
+
+def load_expected(fixture):
+    """Lee '<página>.expected.json' si existe. Devuelve None si no hay resultado esperado."""
+    expected_path = pathlib.Path(fixture).with_suffix('.expected.json')
+    if not expected_path.exists():
+        return None
+    with open(expected_path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('fixtures', nargs='*', default=[str(DEFAULT_FIXTURE)],
+                        help="Páginas HTML guardadas de Kalea Market.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    scraper = KaleaMarketScraper()
+    all_identical = True
+    with WebDriverManager() as driver:
+        for fixture in args.fixtures:
+            fixture_url = pathlib.Path(fixture).resolve().as_uri()
+            driver.get(fixture_url)
+
+            results = {}
+            for mode, extract in (('element', scraper._extract_products_per_element),
+                                  ('bulk', scraper._extract_products_bulk)):
+                start = time.perf_counter()
+                results[mode], _ = extract(driver, fixture_url)
+                print(f"{fixture} [{mode:>7}]: {len(results[mode])} productos en {time.perf_counter() - start:.2f}s")
+
+            identical = results['element'] == results['bulk']
+            all_identical &= identical
+            print(f"{fixture}: resultados {'idénticos' if identical else 'DIFERENTES'}")
+
+            expected = load_expected(fixture)
+            if expected is not None:
+                for mode, items in results.items():
+                    got = [{key: item[key] for key in ('name', 'price', 'currency')} for item in items]
+                    matches = got == expected
+                    all_identical &= matches
+                    print(f"{fixture} [{mode:>7}]: {'coincide' if matches else 'NO coincide'} con el resultado esperado")
+
+    if not all_identical:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
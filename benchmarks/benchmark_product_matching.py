@@ -0,0 +1,137 @@
+"""
+Benchmark del matching de productos (Analyzer._perform_product_matching).
+
+Usa los nombres de 'initial_data.parquet' como catálogo interno y genera
+productos del mercado sintéticos a partir de ellos (orden de palabras
+alterado y mayúsculas/minúsculas). Compara la búsqueda exhaustiva
+original contra 'match_products', verifica que las coincidencias sean
+idénticas para los productos con marca y reporta comparaciones y tiempo.
+Cada motor de puntuación ('thefuzz', 'rapidfuzz') se ejecuta por separado
+y se verifica que todos devuelvan las mismas coincidencias. Con '--tfidf' los
+productos sin marca se bloquean con el índice TF-IDF en lugar de prefijos.
+'--workers' repite cada motor con distintos números de procesos para medir
+el escalado del matching en paralelo.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.benchmark_product_matching --market-sizes 1000 10000 50000 --skip-exhaustive
+    python -m benchmarks.benchmark_product_matching --market-sizes 50000 --skip-exhaustive --workers 1 2 4 8
+"""
+import argparse
+import random
+import time
+
+import pandas as pd
+from thefuzz import fuzz
+
+from config import DB_CONFIG, SCORE_THRESHOLD
+from data_analysis.analyzer import Analyzer
+from data_analysis.product_matching import match_products, resolve_worker_count
+from data_analysis.tfidf_retrieval import TfidfCandidateRetriever
+from data_processor.utils import UDMExtractor
+
+
+def exhaustive_match(market_products, internal_products, score_threshold):
+    """Implementación de referencia: bucle O(mercado x interno) original."""
+    matches = []
+    for market_prod in market_products:
+        best_match = None
+        best_score = -1
+        for internal_prod in internal_products:
+            if market_prod['brand'] and internal_prod['brand'] and market_prod['brand'] != internal_prod['brand']:
+                continue
+            market_qty_unit = market_prod['quantity_unit']
+            internal_qty_unit = internal_prod['quantity_unit']
+            if market_qty_unit and internal_qty_unit:
+                if market_qty_unit[1] != internal_qty_unit[1] or market_qty_unit[0] != internal_qty_unit[0]:
+                    continue
+            current_score = fuzz.token_set_ratio(market_prod['normalized_name'], internal_prod['normalized_name'])
+            if current_score > best_score:
+                best_score = current_score
+                best_match = internal_prod
+        if best_match and best_score >= score_threshold:
+            matches.append({'cluster_id': best_match['id'], 'vendedor': market_prod['website_id'],
+                            'producto': market_prod['name']})
+    return matches
+
+
+def build_market_names(internal_names, size, seed=42):
+    rng = random.Random(seed)
+    names = []
+    for i in range(size):
+        words = rng.choice(internal_names).split()
+        if len(words) > 2 and rng.random() < 0.5:
+            words[0], words[1] = words[1], words[0]
+        name = ' '.join(words)
+        names.append(name.title() if rng.random() < 0.5 else name)
+    return names
+
+
+def add_features(analyzer, df):
+    udm_extractor = UDMExtractor()
+    df['normalized_name'] = df['name'].apply(analyzer._normalize_name_advanced)
+    df['brand'] = df['name'].apply(lambda x: analyzer._extract_brand(x, analyzer.marcas_conocidas_normalized))
+    df['quantity_unit'] = df['name'].apply(udm_extractor._extract_quantity_unit_pair)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', default='initial_data.parquet')
+    parser.add_argument('--market-sizes', type=int, nargs='+', default=[1000])
+    parser.add_argument('--engines', nargs='+', default=['thefuzz', 'rapidfuzz'],
+                        help="Motores de puntuación a comparar.")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1],
+                        help="Números de procesos a comparar (<= 0 usa todos los núcleos).")
+    parser.add_argument('--tfidf', action='store_true',
+                        help="Recuperar candidatos de productos sin marca con el índice TF-IDF.")
+    parser.add_argument('--skip-exhaustive', action='store_true',
+                        help="No ejecutar la búsqueda exhaustiva (útil para tamaños grandes).")
+    args = parser.parse_args()
+
+    analyzer = Analyzer(db_config=DB_CONFIG)
+    internal_names = pd.read_parquet(args.data)['name'].drop_duplicates().tolist()
+    internal_df = add_features(analyzer, pd.DataFrame({'id': range(len(internal_names)), 'name': internal_names}))
+    internal_products = internal_df.to_dict('records')
+    retriever = None
+    if args.tfidf:
+        start = time.perf_counter()
+        retriever = TfidfCandidateRetriever.build([p['normalized_name'] for p in internal_products])
+        print(f"Índice TF-IDF construido en {time.perf_counter() - start:.2f}s")
+
+    for size in args.market_sizes:
+        market_names = build_market_names(internal_names, size)
+        market_df = add_features(analyzer, pd.DataFrame({'name': market_names, 'website_id': 1}))
+        market_products = market_df.to_dict('records')
+        print(f"--- {size} productos del mercado x {len(internal_products)} internos ---")
+
+        results = {}
+        for engine in args.engines:
+            baseline = None
+            for workers in args.workers:
+                matches, stats = match_products(market_products, internal_products, SCORE_THRESHOLD,
+                                                engine=engine, retriever=retriever, workers=workers)
+                results[(engine, workers)] = matches
+                baseline = baseline or stats['elapsed_seconds']
+                print(f"{engine:>10} x{resolve_worker_count(workers):<2}: {stats['elapsed_seconds']:.2f}s "
+                      f"(speedup {baseline / stats['elapsed_seconds']:.2f}x), {stats['comparisons']} comparaciones "
+                      f"({stats['exhaustive_comparisons'] - stats['comparisons']} ahorradas), {len(matches)} coincidencias")
+        if len(results) > 1:
+            status = "idénticas" if all(m == matches for m in results.values()) else "DIFERENTES"
+            print(f"Coincidencias entre motores y números de procesos: {status}")
+
+        if args.skip_exhaustive:
+            continue
+        start = time.perf_counter()
+        reference = exhaustive_match(market_products, internal_products, SCORE_THRESHOLD)
+        print(f"exhaustivo: {time.perf_counter() - start:.2f}s, {stats['exhaustive_comparisons']} comparaciones, "
+              f"{len(reference)} coincidencias")
+
+        branded = {p['name'] for p in market_products if p['brand']}
+        ref_branded = [m for m in reference if m['producto'] in branded]
+        new_branded = [m for m in matches if m['producto'] in branded]
+        status = "idénticas" if ref_branded == new_branded else "DIFERENTES"
+        print(f"Coincidencias de productos con marca: {status} ({len(new_branded)})")
+
+
+if __name__ == '__main__':
+    main()
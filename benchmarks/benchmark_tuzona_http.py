@@ -0,0 +1,59 @@
+"""
+Benchmark de los motores HTTP de TuzonaMarketScraper contra el servidor stub local.
+
+Compara el motor 'sequential' (requests.get por página más una pausa fija) con el
+motor 'async' (pool keep-alive, concurrencia acotada, token bucket y reintentos) y
+verifica que ambos devuelvan los mismos productos en el mismo orden.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.benchmark_tuzona_http --pages-dir benchmarks/tuzona_pages --latency 0.2 --error-rate 0.05
+
+Sin '--pages-dir' se generan páginas sintéticas en un directorio temporal
+('--no-metadata' las genera sin campos de paginación, para medir la detección
+del final por páginas vacías). '--end-page' fija un límite; por defecto la
+última página se detecta a partir de la respuesta de la API.
+"""
+import argparse
+import logging
+import tempfile
+import time
+
+from benchmarks.tuzona_stub_server import StubApiServer, write_synthetic_pages
+from scraper.scrapers.tuzonamarket import TuzonaMarketScraper
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages-dir', default=None)
+    parser.add_argument('--pages', type=int, default=135, help="Páginas sintéticas a generar.")
+    parser.add_argument('--no-metadata', action='store_true')
+    parser.add_argument('--end-page', type=int, default=None)
+    parser.add_argument('--latency', type=float, default=0.2, help="Latencia simulada por respuesta (s).")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Proporción de respuestas 503.")
+    parser.add_argument('--delay', type=float, default=1.0, help="Pausa del motor secuencial (s).")
+    parser.add_argument('--skip-sequential', action='store_true')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pages_dir = args.pages_dir
+        if pages_dir is None:
+            pages_dir = tmp_dir
+            write_synthetic_pages(pages_dir, args.pages, with_metadata=not args.no_metadata)
+
+        results = {}
+        for engine in (['async'] if args.skip_sequential else ['sequential', 'async']):
+            with StubApiServer(pages_dir, latency=args.latency, error_rate=args.error_rate) as server:
+                scraper = TuzonaMarketScraper(base_api_url=server.base_api_url)
+                start = time.perf_counter()
+                results[engine] = scraper.scrape(end_page=args.end_page, delay_between_requests=args.delay, engine=engine)
+                print(f"{engine:>10}: {time.perf_counter() - start:.2f}s, {len(results[engine])} productos, "
+                      f"{server.requests_served} peticiones servidas")
+
+        if len(results) > 1:
+            status = "idénticos" if results['sequential'] == results['async'] else "DIFERENTES"
+            print(f"Productos entre motores: {status}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Tiempo de carga y memoria de los perfiles de Chrome de WebDriverManager.
+
+Para cada perfil ('full' y 'lean') inicia un navegador, abre cada URL, mide el
+tiempo hasta el evento 'load' (Navigation Timing), los bytes transferidos, y
+la memoria residente (RSS) sumada de chromedriver y todos los procesos de
+Chrome. La memoria se lee de /proc, por lo que sólo está disponible en Linux.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.benchmark_webdriver_profiles --repeat 3
+    python -m benchmarks.benchmark_webdriver_profiles --url https://www.kromionline.com/Products.php?cat=VIV
+"""
+import argparse
+import os
+import statistics
+import time
+
+from config import URL_KALEA_MARKET_CAT, URL_KROMI_VIVERES
+from scraper.webdriver_manager import WebDriverManager
+
+NAVIGATION_METRICS_SCRIPT = """
+    var nav = performance.getEntriesByType('navigation')[0];
+    var resources = performance.getEntriesByType('resource');
+    return {
+        load_ms: nav ? nav.loadEventEnd : null,
+        resources: resources.length,
+        transfer_bytes: resources.reduce(function (total, r) { return total + (r.transferSize || 0); },
+                                         nav ? nav.transferSize || 0 : 0)
+    };
+"""
+
+
+def _children_by_parent():
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    return children
+
+
+def process_tree_rss_mb(root_pid):
+    """RSS total (MB) de 'root_pid' y sus descendientes. None si /proc no está disponible."""
+    if not os.path.isdir('/proc'):
+        return None
+    children = _children_by_parent()
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    total, pending = 0, [root_pid]
+    while pending:
+        pid = pending.pop()
+        pending.extend(children.get(pid, []))
+        try:
+            with open(f'/proc/{pid}/statm') as f:
+                total += int(f.read().split()[1]) * page_size
+        except (OSError, IndexError, ValueError):
+            continue
+    return total / (1024 * 1024)
+
+
+def measure_profile(profile, urls, repeat):
+    manager = WebDriverManager(profile=profile)
+    start = time.perf_counter()
+    driver = manager.start_driver()
+    if not driver:
+        raise SystemExit(f"No se pudo iniciar Chrome con el perfil '{profile}'.")
+    startup = time.perf_counter() - start
+    root_pid = driver.service.process.pid
+    rows = []
+    try:
+        for url in urls:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                driver.get(url)
+                wall = time.perf_counter() - start
+                metrics = driver.execute_script(NAVIGATION_METRICS_SCRIPT)
+                rows.append({'url': url, 'wall_s': wall, 'rss_mb': process_tree_rss_mb(root_pid), **metrics})
+    finally:
+        manager.stop_driver()
+    return startup, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', action='append', dest='urls', help="URL a cargar (repetible).")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--profiles', nargs='+', default=['full', 'lean'])
+    args = parser.parse_args()
+    urls = args.urls or [URL_KROMI_VIVERES, URL_KALEA_MARKET_CAT]
+
+    for profile in args.profiles:
+        startup, rows = measure_profile(profile, urls, args.repeat)
+        print(f"\nPerfil '{profile}': inicio de Chrome {startup:.2f}s")
+        for url in urls:
+            url_rows = [row for row in rows if row['url'] == url]
+            rss = [row['rss_mb'] for row in url_rows if row['rss_mb'] is not None]
+            print(f"  {url}\n"
+                  f"    carga (load): {statistics.median(row['load_ms'] or 0 for row in url_rows) / 1000:.2f}s"
+                  f" | get(): {statistics.median(row['wall_s'] for row in url_rows):.2f}s"
+                  f" | recursos: {url_rows[-1]['resources']}"
+                  f" | transferido: {url_rows[-1]['transfer_bytes'] / 1024:.0f} KiB"
+                  f" | RSS máx.: {f'{max(rss):.0f} MB' if rss else 'n/d'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+"""
+Servidor HTTP local que imita la API de categorías de Tuzona Market a partir de
+páginas JSON grabadas, para probar y medir TuzonaMarketScraper sin tocar el sitio real.
+
+Grabar páginas reales (una vez):
+    python -m benchmarks.tuzona_stub_server record --out benchmarks/tuzona_pages --end-page 135
+
+Servir páginas grabadas (con latencia y errores 5xx inyectados):
+    python -m benchmarks.tuzona_stub_server serve --pages benchmarks/tuzona_pages --latency 0.2 --error-rate 0.05
+
+Las páginas se guardan como 'page_<n>.json'. Una página sin archivo responde con
+'producto.data' vacío, como la API real después de la última página. Con 'etags'
+cada página incluye un ETag y responde 304 a las peticiones If-None-Match que coinciden.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+API_PATH = "/api/categoria/supermercado/2"
+EMPTY_PAGE = {"producto": {"data": []}}
+
+
+def page_path(pages_dir, page_num):
+    return os.path.join(pages_dir, f"page_{page_num}.json")
+
+
+def record_pages(out_dir, start_page, end_page, base_api_url, delay=1.0):
+    """Descarga las páginas de la API real y las guarda en 'out_dir'."""
+    os.makedirs(out_dir, exist_ok=True)
+    with requests.Session() as session:
+        for page_num in range(start_page, end_page + 1):
+            response = session.get(f"{base_api_url}{page_num}", timeout=15)
+            response.raise_for_status()
+            with open(page_path(out_dir, page_num), 'w', encoding='utf-8') as f:
+                json.dump(response.json(), f, ensure_ascii=False)
+            print(f"Página {page_num} grabada.")
+            time.sleep(delay)
+
+
+def write_synthetic_pages(out_dir, pages, products_per_page=24, with_metadata=True):
+    """
+    Genera páginas sintéticas con la misma estructura que la API, para cuando no hay grabaciones.
+    Con 'with_metadata=False' se omiten los campos de paginación de 'producto'.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    for page_num in range(1, pages + 1):
+        data = [{
+            "nombre": f"Producto sintético {page_num}-{i}",
+            "slug": f"producto-sintetico-{page_num}-{i}",
+            "categoria": [{"nombre": "Alimentos"}],
+            "precio": [{"usuarioTipo": {"nombre": "Basico"}, "precio": 100 * (i + 1),
+                        "impuesto": {"porcentaje": 1600}}],
+        } for i in range(products_per_page)]
+        producto = {"data": data}
+        if with_metadata:
+            producto.update({"current_page": page_num, "last_page": pages,
+                             "per_page": products_per_page, "total": pages * products_per_page})
+        with open(page_path(out_dir, page_num), 'w', encoding='utf-8') as f:
+            json.dump({"producto": producto}, f)
+
+
+class StubApiServer:
+    """
+    Servidor en segundo plano que sirve las páginas de 'pages_dir'.
+
+    Args:
+        latency (float): Segundos de espera antes de cada respuesta.
+        error_rate (float): Probabilidad de responder 503 en lugar de la página.
+        etags (bool): Enviar ETag y responder 304 a peticiones condicionales.
+    """
+    def __init__(self, pages_dir, latency=0.0, error_rate=0.0, seed=0, host="127.0.0.1", port=0, etags=False):
+        self.pages_dir = pages_dir
+        self.etags = etags
+        self.not_modified_served = 0
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests_served = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._build_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_api_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{API_PATH}?pag="
+
+    def _build_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                with stub._lock:
+                    stub.requests_served += 1
+                    fail = stub._rng.random() < stub.error_rate
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if url.path != API_PATH:
+                    return self._send(404, {"error": "not found"})
+                if fail:
+                    return self._send(503, {"error": "unavailable"})
+                page_num = parse_qs(url.query).get('pag', ['1'])[0]
+                path = page_path(stub.pages_dir, page_num)
+                if not os.path.exists(path):
+                    return self._send(200, EMPTY_PAGE)
+                with open(path, 'rb') as f:
+                    body = f.read()
+                if not stub.etags:
+                    return self._send_raw(200, body)
+                etag = f'"{hashlib.sha1(body).hexdigest()}"'
+                if self.headers.get('If-None-Match') == etag:
+                    with stub._lock:
+                        stub.not_modified_served += 1
+                    return self._send_raw(304, b"", {"ETag": etag})
+                self._send_raw(200, body, {"ETag": etag})
+
+            def _send(self, status, payload):
+                self._send_raw(status, json.dumps(payload).encode('utf-8'))
+
+            def _send_raw(self, status, body, extra_headers=None):
+                self.send_response(status)
+                for name, value in (extra_headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="TuzonaStubServer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    record = subparsers.add_parser('record', help="Grabar páginas de la API real.")
+    record.add_argument('--out', required=True)
+    record.add_argument('--start-page', type=int, default=1)
+    record.add_argument('--end-page', type=int, default=135)
+    record.add_argument('--base-api-url', default="https://api.tuzonamarket.com/api/categoria/supermercado/2?pag=")
+
+    serve = subparsers.add_parser('serve', help="Servir páginas grabadas.")
+    serve.add_argument('--pages', required=True)
+    serve.add_argument('--port', type=int, default=8765)
+    serve.add_argument('--latency', type=float, default=0.0)
+    serve.add_argument('--error-rate', type=float, default=0.0)
+
+    args = parser.parse_args()
+    if args.command == 'record':
+        record_pages(args.out, args.start_page, args.end_page, args.base_api_url)
+        return
+
+    with StubApiServer(args.pages, latency=args.latency, error_rate=args.error_rate, port=args.port) as server:
+        print(f"Sirviendo '{args.pages}' en {server.base_api_url}<n> (Ctrl+C para terminar)")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
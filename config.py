@@ -7,6 +7,60 @@ CHROME_BROWSER_PATH = os.getenv("CHROME_BROWSER_PATH", r"driver/chrome/chrome")
 CHROME_DRIVER_EXECUTABLE_PATH = os.getenv("CHROME_DRIVER_EXECUTABLE_PATH", r"driver/chrome-driver/chromedriver")
 URL_KROMI_VIVERES = "https://www.kromionline.com/Products.php?cat=VIV"
 URL_KALEA_MARKET_CAT = "https://kaleamarket.com/purchases;category=SYujECu7g0UJamAYdCTu"
+# Ejecutar cada sitio en su propio hilo y WebDriver en lugar de uno tras otro.
+SCRAPERS_CONCURRENT = os.getenv("SCRAPERS_CONCURRENT", "true").lower() in ("1", "true", "yes")
+# Motor HTTP de Tuzona Market: 'async' (pool keep-alive concurrente) o 'sequential' (una página a la vez).
+TUZONA_HTTP_ENGINE = os.getenv("TUZONA_HTTP_ENGINE", "async")
+TUZONA_MAX_CONCURRENCY = int(os.getenv("TUZONA_MAX_CONCURRENCY", "8"))
+TUZONA_RATE_PER_SECOND = float(os.getenv("TUZONA_RATE_PER_SECOND", "5"))
+TUZONA_MAX_RETRIES = int(os.getenv("TUZONA_MAX_RETRIES", "3"))
+# Fin de catálogo sin metadatos de paginación: páginas vacías consecutivas y tope de seguridad.
+TUZONA_MAX_EMPTY_PAGES = int(os.getenv("TUZONA_MAX_EMPTY_PAGES", "2"))
+# Páginas consecutivas fallidas (tras los reintentos) tras las que se aborta el recorrido.
+TUZONA_MAX_FAILED_PAGES = int(os.getenv("TUZONA_MAX_FAILED_PAGES", "3"))
+TUZONA_MAX_PAGES = int(os.getenv("TUZONA_MAX_PAGES", "1000"))
+# Extracción de Kromi: 'bulk' (un único execute_script) o 'element' (find_element por tarjeta).
+KROMI_EXTRACTION_MODE = os.getenv("KROMI_EXTRACTION_MODE", "bulk")
+# Scroll de Kromi: 'event' (salto al final con espera en el navegador) o 'slow' (scroll_slowly con sondeo).
+KROMI_SCROLL_MODE = os.getenv("KROMI_SCROLL_MODE", "event")
+# Extracción de Kalea: 'bulk' (un único execute_script) o 'element' (find_element por tarjeta).
+KALEA_EXTRACTION_MODE = os.getenv("KALEA_EXTRACTION_MODE", "bulk")
+# Rastreo de Kalea: 'sharded' (una tarea por sub-categoría, en paralelo) o 'single' (sólo despensa → Ver todo).
+KALEA_CRAWL_MODE = os.getenv("KALEA_CRAWL_MODE", "sharded")
+KALEA_SHARD_WORKERS = int(os.getenv("KALEA_SHARD_WORKERS", "2"))
+# Rondas extra para los fragmentos de Kalea que fallaron o no obtuvieron WebDriver.
+KALEA_SHARD_RETRIES = int(os.getenv("KALEA_SHARD_RETRIES", "1"))
+# Categorías de primer nivel a rastrear, separadas por comas (vacío = todas).
+KALEA_CATEGORIES = [c.strip() for c in os.getenv("KALEA_CATEGORIES", "").split(",") if c.strip()] or None
+# Origen de los productos de Kromi y Kalea: 'dom' (página renderizada) o 'network' (respuestas JSON
+# capturadas por CDP, con las páginas siguientes repetidas por HTTP; si no se captura nada se usa el DOM).
+SCRAPER_CAPTURE_MODE = os.getenv("SCRAPER_CAPTURE_MODE", "dom")
+SCRAPER_NETWORK_MAX_REPLAY_PAGES = int(os.getenv("SCRAPER_NETWORK_MAX_REPLAY_PAGES", "500"))
+# Perfil de Chrome: 'full' (maximizado, todos los recursos) o 'lean' (headless, sin imágenes,
+# multimedia, fuentes ni rastreadores). Ver benchmarks/benchmark_webdriver_profiles.py.
+WEBDRIVER_PROFILE = os.getenv("WEBDRIVER_PROFILE", "full")
+WEBDRIVER_LEAN_WINDOW_SIZE = os.getenv("WEBDRIVER_LEAN_WINDOW_SIZE", "1280,900")
+# Pool de sesiones de Chrome compartido entre ejecuciones (0 = un WebDriver nuevo por tarea).
+WEBDRIVER_POOL_SIZE = int(os.getenv("WEBDRIVER_POOL_SIZE", "2"))
+# Páginas (préstamos) servidas por una sesión antes de reciclarla.
+WEBDRIVER_POOL_MAX_PAGES = int(os.getenv("WEBDRIVER_POOL_MAX_PAGES", "20"))
+WEBDRIVER_POOL_ACQUIRE_TIMEOUT = float(os.getenv("WEBDRIVER_POOL_ACQUIRE_TIMEOUT", "600"))
+# Detección de cambios por página: las páginas sin cambios desde la ejecución anterior no se
+# parsean ni se preprocesan y sus precios se arrastran (ver scraper/change_tracker.py).
+SCRAPER_CHANGE_DETECTION = os.getenv("SCRAPER_CHANGE_DETECTION", "true").lower() in ("1", "true", "yes")
+# Archivo de los productos crudos de cada ejecución en Parquet particionado por sitio/fecha
+# (ver scraper/raw_archive.py). Permite repetir el preprocesamiento y la ingesta sin red.
+SCRAPE_ARCHIVE_ENABLED = os.getenv("SCRAPE_ARCHIVE_ENABLED", "true").lower() in ("1", "true", "yes")
+SCRAPE_ARCHIVE_DIR = os.getenv("SCRAPE_ARCHIVE_DIR", "data/raw_scrapes")
+SCRAPE_ARCHIVE_COMPRESSION = os.getenv("SCRAPE_ARCHIVE_COMPRESSION", "zstd")
+# Orquestador: 'streaming' encadena scraping, preprocesamiento e ingesta como etapas concurrentes
+# unidas por colas acotadas (lotes); 'batch' espera a todos los scrapers y procesa todo junto.
+ORCHESTRATOR_PIPELINE_MODE = os.getenv("ORCHESTRATOR_PIPELINE_MODE", "streaming")
+# Lotes en espera entre etapas y productos por lote de preprocesamiento.
+ORCHESTRATOR_QUEUE_SIZE = int(os.getenv("ORCHESTRATOR_QUEUE_SIZE", "4"))
+ORCHESTRATOR_BATCH_SIZE = int(os.getenv("ORCHESTRATOR_BATCH_SIZE", "500"))
+# Segundos de espera por cada etapa del pipeline al terminar antes de registrar que sigue viva.
+ORCHESTRATOR_STAGE_JOIN_TIMEOUT = float(os.getenv("ORCHESTRATOR_STAGE_JOIN_TIMEOUT", "60"))
 
 DB_HOST = os.getenv("DB_HOST", "localhost")
 DB_PORT = os.getenv("DB_PORT", "8090")
@@ -21,8 +75,28 @@ DB_CONFIG = {
     "password": DB_PASSWORD
 }
 
+# Pool de conexiones compartido por el proceso (hilos de Dash, scheduler y Analyzer).
+DB_POOL_MIN_CONN = int(os.getenv("DB_POOL_MIN_CONN", "1"))
+DB_POOL_MAX_CONN = int(os.getenv("DB_POOL_MAX_CONN", "10"))
+# Segundos de espera por una conexión libre cuando el pool está agotado (0 o negativo = sin límite).
+DB_POOL_ACQUIRE_TIMEOUT = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "30"))
+DB_POOL_ACQUIRE_TIMEOUT = None if DB_POOL_ACQUIRE_TIMEOUT <= 0 else DB_POOL_ACQUIRE_TIMEOUT
+
 DB_CONNECTION_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 SCORE_THRESHOLD = 85
+# Longitud de los prefijos de token usados para bloquear candidatos de productos sin marca.
+MATCHING_TOKEN_PREFIX_LENGTH = 3
+# Motor de puntuación del matching: 'rapidfuzz' (matricial, process.cdist) o 'thefuzz' (par a par).
+MATCHING_ENGINE = os.getenv("MATCHING_ENGINE", "rapidfuzz")
+# Hilos usados por rapidfuzz.process.cdist (-1 = todos los núcleos).
+MATCHING_CDIST_WORKERS = int(os.getenv("MATCHING_CDIST_WORKERS", "-1"))
+# Procesos para el matching de productos (1 = secuencial, <= 0 = todos los núcleos).
+MATCHING_WORKERS = int(os.getenv("MATCHING_WORKERS", "1"))
+# Candidatos TF-IDF (n-gramas de caracteres) por producto del mercado sin marca y ruta del índice persistido.
+MATCHING_TFIDF_TOP_K = int(os.getenv("MATCHING_TFIDF_TOP_K", "20"))
+MATCHING_TFIDF_INDEX_PATH = os.getenv("MATCHING_TFIDF_INDEX_PATH", "model/matching_tfidf_index.joblib")
+POS_TAGGER_CACHE_DIR = os.getenv("POS_TAGGER_CACHE_DIR", "model/nlp_cache")
+PRODUCT_FEATURE_LRU_SIZE = int(os.getenv("PRODUCT_FEATURE_LRU_SIZE", "50000"))
 CODIGO_PAIS_FESTIVOS = 'VE'
 
 MARCAS_CONOCIDAS = ["ACE","P.A.N.","Juana","Mary","Primor","Ronco","Capri","Vatel","Mazeite","Mavesa","Heinz","Pampero",
@@ -154,12 +154,29 @@ def build_config_section():
         className="mt-4"
     )
 
+def build_match_cache_section():
+    """
+    Crea la sección para invalidar la caché de coincidencias del matching de productos.
+    """
+    return dbc.Card(
+        dbc.CardBody([
+            html.H4("Caché de Matching de Productos", className="card-title"),
+            html.P("Las coincidencias entre productos del mercado y el catálogo interno se reutilizan entre "
+                   "entrenamientos. Invalida la caché si cambió la normalización de nombres o las marcas conocidas; "
+                   "el próximo entrenamiento recalculará todas las coincidencias."),
+            dmc.Button("Invalidar Caché de Matching", id="invalidate-match-cache-button", variant="outline", color="red"),
+            html.Div(id="match-cache-status-message", className="mt-3")
+        ]),
+        className="mt-4"
+    )
+
 def layout():
     return dbc.Container([
         dmc.Title("Panel de Administración", order=2, className="mb-4"),
         build_user_management_section(),
         build_edit_user_section(),
-        build_config_section()
+        build_config_section(),
+        build_match_cache_section()
     ], fluid=True)
 
 @callback(
@@ -418,4 +435,30 @@ def save_or_clear_config(save_clicks, clear_clicks, key, value, desc):
         else:
             return dmc.Alert(f"Error al guardar el parámetro '{key}'.", color="red"), no_update, no_update, no_update, no_update
 
-    return no_update
\ No newline at end of file
+    return no_update
+
+@callback(
+    Output('match-cache-status-message', 'children'),
+    Input('invalidate-match-cache-button', 'n_clicks'),
+    prevent_initial_call=True
+)
+def invalidate_match_cache(n_clicks):
+    """
+    Vacía la caché de coincidencias del matching de productos.
+    Args:
+        n_clicks (int): Número de clics en el botón de invalidar.
+    Returns:
+        dmc.Alert: Mensaje de estado sobre el resultado de la operación.
+    """
+    with PostgresManager(DB_CONFIG) as db:
+        if not db.conn:
+            return dmc.Alert("Error de conexión con la base de datos.", title="Error Crítico", color="red")
+        deleted = db.invalidate_product_match_cache()
+
+    if deleted is None:
+        return dmc.Alert("No se pudo invalidar la caché de matching.", color="red", withCloseButton=True)
+    return dmc.Alert(
+        f"Caché de matching invalidada ({deleted} coincidencias eliminadas). "
+        "El próximo entrenamiento recalculará todas las coincidencias.",
+        title="Caché Invalidada", color="green", withCloseButton=True
+    )
@@ -6,16 +6,35 @@ import joblib
 import os
 import re
 import unicodedata
+from functools import lru_cache
 from sqlalchemy import create_engine
-from thefuzz import fuzz
 import shap
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import r2_score, mean_absolute_error, mean_squared_error
 from data_processor.utils import UDMExtractor
-from config import DB_CONNECTION_URL, MARCAS_CONOCIDAS, SCORE_THRESHOLD, STOP_WORDS
+from .match_cache import ProductMatchCache
+from .tfidf_retrieval import TfidfCandidateRetriever
+from config import DB_CONNECTION_URL, MARCAS_CONOCIDAS, SCORE_THRESHOLD, STOP_WORDS, MATCHING_ENGINE, MATCHING_WORKERS
 
 logger = logging.getLogger(__name__)
 
+# Versión de la normalización usada en el matching (_normalize_name_advanced, _extract_brand y
+# extracción de cantidad/unidad). Incrementarla invalida las coincidencias guardadas.
+MATCH_NORMALIZER_VERSION = "1"
+
+@lru_cache(maxsize=8)
+def _compile_brand_matcher(normalized_brands: tuple):
+    """
+    Compila una única alternancia con las marcas en orden de prioridad, dentro de un
+    lookahead para que 'finditer' pruebe cada posición del texto (incluidas coincidencias
+    solapadas). Devuelve el patrón y el rango de prioridad de cada marca.
+    """
+    rank = {}
+    for i, brand in enumerate(normalized_brands):
+        rank.setdefault(brand, i)
+    pattern = re.compile(r'(?=\b(' + '|'.join(re.escape(brand) for brand in rank) + r')\b)')
+    return pattern, rank
+
 class Analyzer:
     def __init__(self, db_config):
         """
@@ -235,11 +254,19 @@ class Analyzer:
         return ' '.join(words)
 
     def _extract_brand(self, text: str, normalized_brands: list) -> str | None:
-        normalized_text = self._normalize_text(text)
-        for brand in normalized_brands:
-            if re.search(r'\b' + re.escape(brand) + r'\b', normalized_text):
-                return brand
-        return None
+        """
+        Devuelve la primera marca de 'normalized_brands' (ordenadas por prioridad) que aparece
+        como palabra completa en el texto, con un solo recorrido del patrón precompilado.
+        """
+        if not normalized_brands:
+            return None
+        pattern, rank = _compile_brand_matcher(tuple(normalized_brands))
+        best = None
+        for match in pattern.finditer(self._normalize_text(text)):
+            brand = match.group(1)
+            if best is None or rank[brand] < rank[best]:
+                best = brand
+        return best
     
     def _train_and_save_model(self, df: pd.DataFrame):
         
@@ -306,39 +333,22 @@ class Analyzer:
         
         market_products = market_products_df.to_dict('records')
         odoo_products = odoo_products_df.to_dict('records')
-        successful_matches = []
-        total_market = len(market_products)
-
-        for i, market_prod in enumerate(market_products, 1):
-            if i % 200 == 0:
-                logger.info(f"Procesando producto del mercado: {i}/{total_market}")
-                
-            best_match = None
-            best_score = -1
-
-            for odoo_prod in odoo_products:
-                if market_prod['brand'] and odoo_prod['brand'] and market_prod['brand'] != odoo_prod['brand']:
-                    continue
-
-                market_qty_unit = market_prod['quantity_unit']
-                odoo_qty_unit = odoo_prod['quantity_unit']
-                if market_qty_unit and odoo_qty_unit:
-                    if market_qty_unit[1] != odoo_qty_unit[1] or market_qty_unit[0] != odoo_qty_unit[0]:
-                        continue
-                current_score = fuzz.token_set_ratio(market_prod['normalized_name'], odoo_prod['normalized_name'])
-
-                if current_score > best_score:
-                    best_score = current_score
-                    best_match = odoo_prod
-            
-            if best_match and best_score >= SCORE_THRESHOLD:
-                successful_matches.append({
-                    'cluster_id': best_match['id'],
-                    'vendedor': market_prod['website_id'],
-                    'producto': market_prod['name']
-                })
-                
-        logger.info(f"Matching completado. Se encontraron {len(successful_matches)} coincidencias.")
+        retriever = TfidfCandidateRetriever.load_or_build([p['normalized_name'] for p in odoo_products])
+
+        from database_manager import PostgresManager
+        with PostgresManager(self.db_config) as db_manager:
+            if not db_manager.conn:
+                logger.warning("Analyzer: Sin conexión a la BD. El matching se ejecutará sin caché.")
+            match_cache = ProductMatchCache(db_manager, normalizer_version=MATCH_NORMALIZER_VERSION)
+            successful_matches, stats = match_cache.match(market_products, odoo_products, SCORE_THRESHOLD,
+                                                          engine=MATCHING_ENGINE, retriever=retriever,
+                                                          workers=MATCHING_WORKERS)
+
+        saved = stats['exhaustive_comparisons'] - stats['comparisons']
+        saved_pct = 100 * saved / stats['exhaustive_comparisons'] if stats['exhaustive_comparisons'] else 0
+        logger.info(f"Matching completado en {stats['elapsed_seconds']:.2f}s. Se encontraron {len(successful_matches)} coincidencias. "
+                    f"Comparaciones: {stats['comparisons']} de {stats['exhaustive_comparisons']} posibles "
+                    f"({saved} ahorradas, {saved_pct:.1f}%).")
         return pd.DataFrame(successful_matches)
 
     def _train_and_save_model(self, df: pd.DataFrame):
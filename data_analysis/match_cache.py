@@ -0,0 +1,113 @@
+import logging
+import time
+from config import MATCHING_ENGINE, MATCHING_WORKERS
+from .product_matching import build_match, find_best_matches
+
+logger = logging.getLogger(__name__)
+
+
+class ProductMatchCache:
+    """
+    Matching incremental respaldado por las tablas 'product_match_cache' y
+    'product_match_catalogue'.
+
+    Para cada producto del mercado (nombre, website_id) se guarda su mejor candidato
+    interno y su puntaje, supere o no el umbral, por lo que cambiar SCORE_THRESHOLD no
+    requiere recalcular nada. En cada entrenamiento:
+
+    - Los productos del mercado nuevos (o cuyo nombre cambió) se emparejan contra todo el catálogo.
+    - Los productos cuyo mejor candidato fue eliminado o cambió de nombre también.
+    - El resto sólo se compara contra los SKU internos nuevos o modificados, y se
+      reemplaza su candidato si alguno obtiene un puntaje estrictamente mayor.
+
+    Sin 'db_manager' (o sin conexión) se comporta como un matching completo sin caché.
+    Al cambiar el normalizador hay que incrementar 'normalizer_version' o invalidar la
+    caché desde el panel de administración.
+    """
+    def __init__(self, db_manager=None, normalizer_version="1"):
+        self.db_manager = db_manager if db_manager is not None and db_manager.conn else None
+        self.normalizer_version = normalizer_version
+
+    def match(self, market_products, internal_products, score_threshold, engine=MATCHING_ENGINE, retriever=None,
+              workers=MATCHING_WORKERS):
+        """
+        Mismo contrato que product_matching.match_products. Las estadísticas incluyen
+        además 'reused', 'full_rematched' e 'incremental_rematched'.
+        """
+        start = time.perf_counter()
+        catalogue = {str(p['id']): p['normalized_name'] for p in internal_products}
+        internal_by_id = {str(p['id']): p for p in internal_products}
+
+        cached, known_catalogue = {}, {}
+        if self.db_manager is not None:
+            cached = self.db_manager.get_product_match_cache(self.normalizer_version)
+            known_catalogue = self.db_manager.get_match_catalogue(self.normalizer_version)
+
+        changed_ids = {internal_id for internal_id, name in catalogue.items() if known_catalogue.get(internal_id) != name}
+        stale_ids = changed_ids | (known_catalogue.keys() - catalogue.keys())
+
+        full, incremental, reused = [], [], 0
+        for market_prod in market_products:
+            entry = cached.get(self._key(market_prod))
+            if entry is None or entry[0] in stale_ids:
+                full.append(market_prod)
+            elif changed_ids:
+                incremental.append(market_prod)
+            else:
+                reused += 1
+
+        updates = {}
+        comparisons = 0
+        if full:
+            best, full_comparisons = find_best_matches(full, internal_products, engine=engine, retriever=retriever,
+                                                      workers=workers)
+            comparisons += full_comparisons
+            for market_prod, found in zip(full, best):
+                updates[self._key(market_prod)] = self._entry(internal_products, found)
+
+        if incremental:
+            changed_products = [p for p in internal_products if str(p['id']) in changed_ids]
+            best, incremental_comparisons = find_best_matches(incremental, changed_products, engine=engine,
+                                                             workers=workers)
+            comparisons += incremental_comparisons
+            for market_prod, found in zip(incremental, best):
+                key = self._key(market_prod)
+                cached_score = cached[key][1] if cached[key][1] is not None else -1
+                if found is not None and found[1] > cached_score:
+                    updates[key] = self._entry(changed_products, found)
+
+        if self.db_manager is not None:
+            # Candidatos y catálogo en una transacción: si fallan, el próximo entrenamiento vuelve a compararlos.
+            if not self.db_manager.save_product_matches(updates, self.normalizer_version,
+                                                        catalogue if stale_ids else None):
+                logger.warning("No se pudo guardar la caché de matching; se recalculará en el próximo entrenamiento.")
+
+        successful_matches = []
+        for market_prod in market_products:
+            key = self._key(market_prod)
+            internal_id, score = updates.get(key) or cached.get(key) or (None, None)
+            if internal_id in internal_by_id and score is not None and score >= score_threshold:
+                successful_matches.append(build_match(market_prod, internal_by_id[internal_id]))
+
+        stats = {
+            'comparisons': comparisons,
+            'exhaustive_comparisons': len(market_products) * len(internal_products),
+            'elapsed_seconds': time.perf_counter() - start,
+            'reused': reused,
+            'full_rematched': len(full),
+            'incremental_rematched': len(incremental),
+        }
+        logger.info(f"Caché de matching: {reused} reutilizados, {len(full)} emparejados desde cero, "
+                    f"{len(incremental)} comparados sólo contra {len(changed_ids)} SKU nuevos o modificados.")
+        return successful_matches, stats
+
+    @staticmethod
+    def _key(market_prod):
+        return (market_prod['name'], int(market_prod['website_id']))
+
+    @staticmethod
+    def _entry(products, found):
+        if found is None:
+            return (None, None)
+        idx, score = found
+        return (str(products[idx]['id']), int(score))
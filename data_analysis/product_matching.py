@@ -0,0 +1,324 @@
+import logging
+import multiprocessing
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from rapidfuzz import fuzz as rf_fuzz, process as rf_process
+from thefuzz import fuzz
+from thefuzz import utils as fuzz_utils
+from config import MATCHING_TOKEN_PREFIX_LENGTH, MATCHING_ENGINE, MATCHING_CDIST_WORKERS, MATCHING_WORKERS
+
+logger = logging.getLogger(__name__)
+
+# Por debajo de este número de productos del mercado el pool de procesos no compensa.
+PARALLEL_MIN_MARKET_PRODUCTS = 1000
+# Particiones por worker: más de una equilibra la carga entre bloques de distinto tamaño.
+PARTITIONS_PER_WORKER = 4
+# Campos de cada producto que usan los workers; el resto no se serializa hacia los procesos.
+WORKER_PRODUCT_FIELDS = ('id', 'normalized_name', 'brand', 'quantity_unit')
+
+
+class BlockingIndex:
+    """
+    Índice de bloqueo sobre los productos internos para el matching.
+
+    El algoritmo exhaustivo descarta un par si ambas marcas existen y difieren, o si
+    las tuplas (cantidad, unidad) difieren. Por eso los candidatos de un producto del
+    mercado se limitan a su cubeta (cantidad, unidad) y, dentro de ella, a los productos
+    de su misma marca más los que no tienen marca. En ese caso el resultado es idéntico
+    a la búsqueda exhaustiva. Para productos del mercado sin marca se bloquea además
+    por prefijos de tokens del nombre normalizado o, si se pasa un 'retriever', por los
+    'top_k' vecinos TF-IDF dentro de la misma cubeta (cantidad, unidad).
+
+    Los candidatos se devuelven siempre en el orden original de 'internal_products',
+    para que los empates se resuelvan igual que en el bucle exhaustivo.
+    """
+    def __init__(self, internal_products, prefix_length=MATCHING_TOKEN_PREFIX_LENGTH, retriever=None):
+        self.prefix_length = prefix_length
+        self.retriever = retriever
+        self._retrieved = {}
+        self._by_qty_unit = defaultdict(list)
+        self._by_qty_unit_brand = defaultdict(list)
+        self._by_qty_unit_prefix = defaultdict(set)
+        self._branded_cache = {}
+
+        for idx, product in enumerate(internal_products):
+            qty_key = product['quantity_unit']
+            self._by_qty_unit[qty_key].append(idx)
+            self._by_qty_unit_brand[(qty_key, product['brand'] or None)].append(idx)
+            for prefix in self._token_prefixes(product['normalized_name']):
+                self._by_qty_unit_prefix[(qty_key, prefix)].add(idx)
+
+    def _token_prefixes(self, normalized_name):
+        return {token[:self.prefix_length] for token in normalized_name.split()}
+
+    def block_key(self, market_product):
+        """
+        Clave hashable tal que dos productos del mercado con la misma clave
+        tienen exactamente los mismos candidatos.
+        """
+        qty_key = market_product['quantity_unit']
+        brand = market_product['brand'] or None
+        if brand is not None:
+            return ('brand', qty_key, brand)
+        if self.retriever is not None:
+            return ('tfidf', qty_key, market_product['normalized_name'])
+        return ('prefix', qty_key, frozenset(self._token_prefixes(market_product['normalized_name'])))
+
+    def prefetch(self, market_products):
+        """
+        Recupera en lote los vecinos TF-IDF de los productos del mercado sin marca,
+        agrupados por cubeta (cantidad, unidad). Sin 'retriever' no hace nada.
+        """
+        if self.retriever is None:
+            return
+        pending = defaultdict(set)
+        for market_prod in market_products:
+            if market_prod['brand']:
+                continue
+            key = (market_prod['quantity_unit'], market_prod['normalized_name'])
+            if key not in self._retrieved:
+                pending[key[0]].add(key[1])
+
+        for qty_key, names in pending.items():
+            names = sorted(names)
+            bucket = self._by_qty_unit.get(qty_key, [])
+            for name, found in zip(names, self.retriever.top_k(names, restrict_to=bucket)):
+                self._retrieved[(qty_key, name)] = found
+
+    def candidates(self, market_product):
+        """Devuelve los índices de productos internos a comparar con 'market_product'."""
+        qty_key = market_product['quantity_unit']
+        brand = market_product['brand'] or None
+
+        if brand is not None:
+            cache_key = (qty_key, brand)
+            cached = self._branded_cache.get(cache_key)
+            if cached is None:
+                cached = sorted(self._by_qty_unit_brand.get((qty_key, brand), []) +
+                                self._by_qty_unit_brand.get((qty_key, None), []))
+                self._branded_cache[cache_key] = cached
+            return cached
+
+        if self.retriever is not None:
+            key = (qty_key, market_product['normalized_name'])
+            if key not in self._retrieved:
+                self._retrieved[key] = self.retriever.top_k([key[1]], restrict_to=self._by_qty_unit.get(qty_key, []))[0]
+            return self._retrieved[key]
+
+        prefixes = self._token_prefixes(market_product['normalized_name'])
+        if not prefixes:
+            return self._by_qty_unit.get(qty_key, [])
+        matched = set()
+        for prefix in prefixes:
+            matched |= self._by_qty_unit_prefix.get((qty_key, prefix), set())
+        return sorted(matched)
+
+
+def match_products(market_products, internal_products, score_threshold, engine=MATCHING_ENGINE, retriever=None,
+                   workers=MATCHING_WORKERS):
+    """
+    Empareja cada producto del mercado con el producto interno de mayor puntaje
+    'token_set_ratio' dentro de sus candidatos de bloqueo.
+
+    Args:
+        market_products (list): Registros con 'name', 'website_id', 'normalized_name',
+                                'brand' y 'quantity_unit'.
+        internal_products (list): Registros con 'id', 'normalized_name', 'brand' y 'quantity_unit'.
+        score_threshold (int): Puntaje mínimo para aceptar una coincidencia.
+        engine (str): 'thefuzz' puntúa par a par; 'rapidfuzz' puntúa cada bloque como
+                      una matriz con rapidfuzz.process.cdist. Ambos dan el mismo resultado.
+        retriever (TfidfCandidateRetriever, optional): Índice ajustado sobre los
+                      'normalized_name' de 'internal_products' (mismo orden) para
+                      preseleccionar candidatos de productos sin marca.
+        workers (int): Procesos para repartir los productos del mercado (<= 0 usa todos
+                      los núcleos, 1 ejecuta en el proceso actual).
+
+    Returns:
+        tuple: (lista de coincidencias, dict de estadísticas con 'comparisons',
+               'exhaustive_comparisons' y 'elapsed_seconds').
+    """
+    start = time.perf_counter()
+    best, comparisons = find_best_matches(market_products, internal_products, engine=engine, retriever=retriever,
+                                          workers=workers)
+    successful_matches = [
+        build_match(market_prod, internal_products[found[0]])
+        for market_prod, found in zip(market_products, best)
+        if found is not None and found[1] >= score_threshold
+    ]
+    stats = {
+        'comparisons': comparisons,
+        'exhaustive_comparisons': len(market_products) * len(internal_products),
+        'elapsed_seconds': time.perf_counter() - start
+    }
+    return successful_matches, stats
+
+
+def find_best_matches(market_products, internal_products, engine=MATCHING_ENGINE, retriever=None,
+                      workers=MATCHING_WORKERS):
+    """
+    Calcula, sin aplicar umbral, el mejor candidato de cada producto del mercado.
+
+    Con más de un worker los productos del mercado se parten en rangos contiguos que
+    se procesan en un pool de procesos; el resultado es idéntico al secuencial.
+
+    Returns:
+        tuple: (lista alineada con 'market_products' con (índice en 'internal_products', puntaje)
+               o None si el producto no tiene candidatos, número de comparaciones).
+    """
+    if engine not in _ENGINES:
+        raise ValueError(f"Motor de matching desconocido: '{engine}'. Opciones: {sorted(_ENGINES)}")
+
+    workers = resolve_worker_count(workers)
+    if workers > 1 and len(market_products) >= PARALLEL_MIN_MARKET_PRODUCTS:
+        return _find_best_matches_parallel(market_products, internal_products, engine, retriever, workers)
+
+    index = BlockingIndex(internal_products, retriever=retriever)
+    index.prefetch(market_products)
+    return _ENGINES[engine](market_products, internal_products, index)
+
+
+def resolve_worker_count(workers):
+    """Traduce el valor configurado (<= 0 significa todos los núcleos) a un número de procesos."""
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+# Estado de cada proceso worker: catálogo interno e índice de bloqueo, recibidos una sola vez.
+_worker_state = {}
+
+
+def _init_matching_worker(internal_products, engine, retriever):
+    _worker_state['internal_products'] = internal_products
+    _worker_state['engine'] = engine
+    _worker_state['index'] = BlockingIndex(internal_products, retriever=retriever)
+
+
+def _match_partition(start, market_products):
+    index = _worker_state['index']
+    index.prefetch(market_products)
+    best, comparisons = _ENGINES[_worker_state['engine']](
+        market_products, _worker_state['internal_products'], index, cdist_workers=1
+    )
+    return start, best, comparisons
+
+
+def _worker_products(products):
+    return [{field: product.get(field) for field in WORKER_PRODUCT_FIELDS} for product in products]
+
+
+def _worker_context():
+    """
+    Los workers no se crean con 'fork': el matching corre dentro de procesos con hilos (Dash,
+    scheduler) y con conexiones a la BD abiertas, que un hijo por 'fork' heredaría junto con
+    locks tomados por otros hilos.
+    """
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+def _find_best_matches_parallel(market_products, internal_products, engine, retriever, workers):
+    market_products = _worker_products(market_products)
+    partition_size = -(-len(market_products) // (workers * PARTITIONS_PER_WORKER))
+    logger.info(f"Matching en paralelo: {len(market_products)} productos del mercado en {workers} procesos "
+                f"(particiones de {partition_size}).")
+
+    best = [None] * len(market_products)
+    comparisons = 0
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_worker_context(), initializer=_init_matching_worker,
+                             initargs=(_worker_products(internal_products), engine, retriever)) as executor:
+        futures = [
+            executor.submit(_match_partition, start, market_products[start:start + partition_size])
+            for start in range(0, len(market_products), partition_size)
+        ]
+        for future in futures:
+            start, partition_best, partition_comparisons = future.result()
+            best[start:start + len(partition_best)] = partition_best
+            comparisons += partition_comparisons
+    return best, comparisons
+
+
+def build_match(market_prod, internal_prod):
+    return {
+        'cluster_id': internal_prod['id'],
+        'vendedor': market_prod['website_id'],
+        'producto': market_prod['name']
+    }
+
+
+def _best_with_thefuzz(market_products, internal_products, index, cdist_workers=None):
+    """Puntúa cada par (mercado, candidato) con thefuzz, uno a uno."""
+    best = []
+    comparisons = 0
+    total_market = len(market_products)
+
+    for i, market_prod in enumerate(market_products, 1):
+        if i % 200 == 0:
+            logger.info(f"Procesando producto del mercado: {i}/{total_market}")
+
+        best_idx = None
+        best_score = -1
+        candidate_indices = index.candidates(market_prod)
+        comparisons += len(candidate_indices)
+
+        for idx in candidate_indices:
+            current_score = fuzz.token_set_ratio(market_prod['normalized_name'], internal_products[idx]['normalized_name'])
+            if current_score > best_score:
+                best_score = current_score
+                best_idx = idx
+
+        best.append((best_idx, best_score) if best_idx is not None else None)
+
+    return best, comparisons
+
+
+def _process_for_scoring(name):
+    """Mismo preprocesamiento que aplica thefuzz.fuzz.token_set_ratio a sus argumentos."""
+    return fuzz_utils.full_process(name, force_ascii=True)
+
+
+def _best_with_rapidfuzz(market_products, internal_products, index, cdist_workers=MATCHING_CDIST_WORKERS):
+    """
+    Agrupa los productos del mercado por bloque y puntúa cada bloque completo con
+    rapidfuzz.process.cdist. Los puntajes se redondean a enteros como en thefuzz y
+    'argmax' devuelve el primer máximo, igual que la comparación estricta del bucle.
+    """
+    internal_names = [_process_for_scoring(p['normalized_name']) for p in internal_products]
+
+    blocks = defaultdict(list)
+    for market_idx, market_prod in enumerate(market_products):
+        blocks[index.block_key(market_prod)].append(market_idx)
+
+    best = [None] * len(market_products)
+    comparisons = 0
+    for processed_blocks, market_indices in enumerate(blocks.values(), 1):
+        if processed_blocks % 200 == 0:
+            logger.info(f"Procesando bloque de matching: {processed_blocks}/{len(blocks)}")
+
+        candidate_indices = index.candidates(market_products[market_indices[0]])
+        if not candidate_indices:
+            continue
+        comparisons += len(market_indices) * len(candidate_indices)
+
+        scores = rf_process.cdist(
+            [_process_for_scoring(market_products[i]['normalized_name']) for i in market_indices],
+            [internal_names[idx] for idx in candidate_indices],
+            scorer=rf_fuzz.token_set_ratio,
+            dtype=np.float64,
+            workers=cdist_workers
+        )
+        scores = np.round(scores)
+        best_positions = scores.argmax(axis=1)
+        best_scores = scores[np.arange(len(market_indices)), best_positions]
+
+        for market_idx, best_position, best_score in zip(market_indices, best_positions, best_scores):
+            best[market_idx] = (candidate_indices[best_position], int(best_score))
+
+    return best, comparisons
+
+
+_ENGINES = {
+    'thefuzz': _best_with_thefuzz,
+    'rapidfuzz': _best_with_rapidfuzz,
+}
@@ -0,0 +1,104 @@
+import hashlib
+import logging
+import os
+import joblib
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from config import MATCHING_TFIDF_INDEX_PATH, MATCHING_TFIDF_TOP_K
+
+logger = logging.getLogger(__name__)
+
+TFIDF_PARAMS = {'analyzer': 'char_wb', 'ngram_range': (2, 4), 'sublinear_tf': True, 'dtype': np.float32}
+# Filas de consulta por bloque al calcular similitudes (acota la memoria de la matriz densa).
+QUERY_CHUNK_SIZE = 512
+
+
+class TfidfCandidateRetriever:
+    """
+    Recuperación de candidatos por similitud coseno sobre n-gramas de caracteres.
+
+    Se ajusta una vez sobre los 'normalized_name' del catálogo interno; para cada
+    producto del mercado devuelve los 'top_k' productos internos más similares, que
+    luego se vuelven a puntuar con el scorer difuso. El índice se guarda junto a los
+    artefactos del modelo y se reutiliza mientras el catálogo no cambie.
+    """
+    def __init__(self, vectorizer, matrix, fingerprint):
+        self.vectorizer = vectorizer
+        self.matrix = matrix
+        self.fingerprint = fingerprint
+
+    @staticmethod
+    def fingerprint_for(names):
+        """Huella del catálogo y de los parámetros del vectorizador."""
+        digest = hashlib.sha1(repr(sorted(TFIDF_PARAMS.items())).encode('utf-8'))
+        for name in names:
+            digest.update(b'\x00')
+            digest.update((name or '').encode('utf-8'))
+        return digest.hexdigest()
+
+    @classmethod
+    def build(cls, names):
+        """Ajusta el vectorizador sobre 'names'. El orden de filas es el de 'names'."""
+        vectorizer = TfidfVectorizer(**TFIDF_PARAMS)
+        matrix = vectorizer.fit_transform([name or '' for name in names]).tocsr()
+        return cls(vectorizer, matrix, cls.fingerprint_for(names))
+
+    @classmethod
+    def load_or_build(cls, names, path=MATCHING_TFIDF_INDEX_PATH):
+        """
+        Carga el índice persistido si corresponde al mismo catálogo; si no existe,
+        está corrupto o el catálogo cambió, lo reconstruye y lo guarda.
+        """
+        fingerprint = cls.fingerprint_for(names)
+        if os.path.exists(path):
+            try:
+                stored = joblib.load(path)
+                if stored.get('fingerprint') == fingerprint:
+                    logger.info(f"Índice TF-IDF de matching cargado desde '{path}'.")
+                    return cls(stored['vectorizer'], stored['matrix'], fingerprint)
+                logger.info("El catálogo interno cambió. Reconstruyendo el índice TF-IDF de matching...")
+            except Exception as e:
+                logger.warning(f"No se pudo cargar el índice TF-IDF desde '{path}': {e}. Se reconstruirá.")
+
+        retriever = cls.build(names)
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            joblib.dump({'fingerprint': fingerprint, 'vectorizer': retriever.vectorizer,
+                         'matrix': retriever.matrix}, tmp_path)
+            os.replace(tmp_path, path)
+            logger.info(f"Índice TF-IDF de matching ({retriever.matrix.shape[0]} productos) guardado en '{path}'.")
+        except OSError as e:
+            logger.warning(f"No se pudo guardar el índice TF-IDF en '{path}': {e}")
+        return retriever
+
+    def top_k(self, query_names, restrict_to=None, k=MATCHING_TFIDF_TOP_K):
+        """
+        Devuelve, para cada nombre de 'query_names', la lista de índices de fila del
+        catálogo con mayor similitud (como máximo 'k', sólo similitudes > 0),
+        ordenada de forma ascendente para conservar el orden del catálogo.
+
+        Args:
+            query_names (list): Nombres normalizados de los productos del mercado.
+            restrict_to (list, optional): Índices de fila a los que limitar la búsqueda.
+            k (int): Número máximo de candidatos por consulta.
+        """
+        rows = np.arange(self.matrix.shape[0]) if restrict_to is None else np.asarray(restrict_to, dtype=np.int64)
+        if not len(query_names):
+            return []
+        if not len(rows):
+            return [[] for _ in query_names]
+
+        sub_matrix = self.matrix[rows].T.tocsc()
+        queries = self.vectorizer.transform([name or '' for name in query_names])
+        results = []
+        for start in range(0, queries.shape[0], QUERY_CHUNK_SIZE):
+            sims = (queries[start:start + QUERY_CHUNK_SIZE] @ sub_matrix).toarray()
+            if sims.shape[1] > k:
+                top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+            else:
+                top = np.broadcast_to(np.arange(sims.shape[1]), sims.shape)
+            for row_sims, cols in zip(sims, top):
+                cols = cols[row_sims[cols] > 0]
+                results.append(sorted(rows[cols].tolist()))
+        return results
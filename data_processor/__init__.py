@@ -1,2 +1,3 @@
 from .data_preprocessor import ProductDataPreprocessor
-from .utils import get_product_type
\ No newline at end of file
+from .utils import get_product_type
+from .feature_cache import ProductFeatureCache
\ No newline at end of file
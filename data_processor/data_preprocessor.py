@@ -2,17 +2,26 @@ import pandas as pd
 import nltk
 import logging
 from .utils import UDMExtractor, get_product_type
+from .feature_cache import ProductFeatureCache
 
 logger = logging.getLogger(__name__)
 
+FEATURE_COLUMNS = ['extracted_quantity', 'unit_raw', 'normalized_unit', 'product_type']
+
 class ProductDataPreprocessor:
-    def __init__(self, lang='spanish'):
+    def __init__(self, lang='spanish', feature_cache=None):
         """
         Inicializa el preprocesador de datos de productos.
         Enfocado en limpieza, normalización y extracción de UDM.
+
+        Args:
+            lang (str): Idioma de los nombres de producto.
+            feature_cache (ProductFeatureCache): Caché de tipo/UDM por nombre. Si no se
+                                                 indica, se usa solo el LRU en memoria.
         """
         self.lang = lang
         self.df = None
+        self.feature_cache = feature_cache if feature_cache is not None else ProductFeatureCache()
 
     def _extract_and_normalize_udm(self, product_name_series):
         """
@@ -28,6 +37,24 @@ class ProductDataPreprocessor:
             Obtiene el tipo de producto a partir del nombre.
         """
         return get_product_type(name) if isinstance(name, str) else ''
+
+    def _compute_name_features(self, names):
+        """
+        Calcula tipo de producto y UDM para nombres que no estaban en caché.
+        Devuelve un diccionario nombre -> características.
+        """
+        df_udm = self._extract_and_normalize_udm(pd.Series(names))
+        features = {}
+        for name, quantity, unit_raw, normalized_unit in zip(
+            names, df_udm['extracted_quantity'], df_udm['unit_raw'], df_udm['normalized_unit']
+        ):
+            features[name] = {
+                'product_type': self._get_product_type(name),
+                'extracted_quantity': None if pd.isna(quantity) else float(quantity),
+                'unit_raw': unit_raw,
+                'normalized_unit': normalized_unit
+            }
+        return features
     
 
     def load_data(self, data_source):
@@ -56,11 +83,20 @@ class ProductDataPreprocessor:
         logger.info("Iniciando preprocesamiento de datos...")
 
         if 'name' in self.df.columns:
-            df_udm_extracted = self._extract_and_normalize_udm(self.df['name'])
             self.df = self.df.reset_index(drop=True)
-            df_udm_extracted = df_udm_extracted.reset_index(drop=True)
-            self.df = pd.concat([self.df, df_udm_extracted], axis=1)
-            self.df['product_type'] = self.df['name'].apply(self._get_product_type)
+            unique_names = [name for name in self.df['name'].drop_duplicates() if isinstance(name, str)]
+
+            features = self.feature_cache.get_many(unique_names)
+            missing_names = [name for name in unique_names if name not in features]
+            if missing_names:
+                logger.info(f"Calculando tipo y UDM para {len(missing_names)} nombres nuevos "
+                            f"({len(unique_names) - len(missing_names)} obtenidos de caché).")
+                new_features = self._compute_name_features(missing_names)
+                self.feature_cache.put_many(new_features)
+                features.update(new_features)
+
+            df_features = pd.DataFrame.from_dict(features, orient='index', columns=FEATURE_COLUMNS)
+            self.df = self.df.join(df_features, on='name')
             logger.info("Extracción y normalización de UDM completada.")
         else:
             
@@ -0,0 +1,93 @@
+import logging
+import threading
+from collections import OrderedDict
+from config import PRODUCT_FEATURE_LRU_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class _LRUCache:
+    """LRU thread-safe compartido por todas las instancias de ProductFeatureCache del proceso."""
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_process_lru = _LRUCache(PRODUCT_FEATURE_LRU_SIZE)
+
+
+class ProductFeatureCache:
+    """
+    Caché nombre de producto -> (product_type, extracted_quantity, unit_raw, normalized_unit).
+
+    Consulta primero un LRU en memoria compartido por el proceso y después, si se
+    proporciona un PostgresManager, la tabla 'product_name_features'. Solo los nombres
+    que no están en ninguno de los dos niveles deben pasar por el etiquetador.
+    """
+    def __init__(self, db_manager=None, extractor_version=None):
+        if extractor_version is None:
+            from .utils import feature_extractor_version
+            extractor_version = feature_extractor_version()
+        self.db_manager = db_manager
+        self.extractor_version = extractor_version
+        self.lru_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def _lru_key(self, name):
+        return (self.extractor_version, name)
+
+    def get_many(self, names):
+        """
+        Devuelve un diccionario nombre -> características para los nombres cacheados.
+        Los nombres ausentes del resultado son fallos de caché.
+        """
+        found = {}
+        pending = []
+        for name in names:
+            features = _process_lru.get(self._lru_key(name))
+            if features is not None:
+                found[name] = features
+            else:
+                pending.append(name)
+        self.lru_hits += len(found)
+
+        if pending and self.db_manager is not None and self.db_manager.conn:
+            from_db = self.db_manager.get_product_name_features(pending, self.extractor_version)
+            for name, features in from_db.items():
+                _process_lru.put(self._lru_key(name), features)
+            found.update(from_db)
+            self.db_hits += len(from_db)
+
+        self.misses += len(names) - len(found)
+        return found
+
+    def put_many(self, features_by_name):
+        """Guarda características recién calculadas en el LRU y, si hay BD, en la tabla persistente."""
+        for name, features in features_by_name.items():
+            _process_lru.put(self._lru_key(name), features)
+        if self.db_manager is not None and self.db_manager.conn:
+            self.db_manager.upsert_product_name_features(features_by_name, self.extractor_version)
+
+    def stats(self):
+        """Contadores de aciertos (LRU y BD) y fallos desde la creación de la instancia."""
+        return {'lru_hits': self.lru_hits, 'db_hits': self.db_hits, 'misses': self.misses}
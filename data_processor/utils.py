@@ -1,20 +1,94 @@
 import nltk
 from nltk.corpus import cess_esp
 from nltk.tag import UnigramTagger, BigramTagger, TrigramTagger
+import hashlib
+import logging
+import os
+import pickle
 import re
+import threading
 import pandas as pd
+from config import POS_TAGGER_CACHE_DIR
 
-cess_tagged_sents = cess_esp.tagged_sents()
-tagger = TrigramTagger(
-    train=cess_tagged_sents,
-    backoff=BigramTagger(
+logger = logging.getLogger(__name__)
+
+# Versión de la lógica de extracción de tipo/UDM por nombre. Incrementar al cambiar
+# get_product_type o UDMExtractor para invalidar las características cacheadas.
+FEATURE_EXTRACTOR_VERSION = "1"
+
+# Configuración del etiquetador; cualquier cambio aquí invalida el artefacto en disco.
+TAGGER_CONFIG = {
+    'corpus': 'cess_esp',
+    'chain': ('TrigramTagger', 'BigramTagger', 'UnigramTagger'),
+    'default_tag': 'NC',
+}
+
+_tagger = None
+_tagger_lock = threading.Lock()
+
+
+def _train_tagger():
+    """Entrena el etiquetador Trigram -> Bigram -> Unigram -> Default sobre cess_esp."""
+    cess_tagged_sents = cess_esp.tagged_sents()
+    return TrigramTagger(
         train=cess_tagged_sents,
-        backoff=UnigramTagger(
+        backoff=BigramTagger(
             train=cess_tagged_sents,
-            backoff=nltk.DefaultTagger('NC')
+            backoff=UnigramTagger(
+                train=cess_tagged_sents,
+                backoff=nltk.DefaultTagger(TAGGER_CONFIG['default_tag'])
+            )
         )
     )
-)
+
+
+def _tagger_version_key():
+    """Clave de versión ligada a la versión de NLTK, a los archivos del corpus y a TAGGER_CONFIG."""
+    fingerprint = repr((nltk.__version__, tuple(cess_esp.fileids()), sorted(TAGGER_CONFIG.items())))
+    return hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()[:16]
+
+
+def feature_extractor_version():
+    """Versión combinada de la lógica de extracción y del etiquetador POS."""
+    return f"{FEATURE_EXTRACTOR_VERSION}-{_tagger_version_key()}"
+
+
+def get_tagger():
+    """
+    Devuelve el etiquetador POS, cargándolo perezosamente en el primer uso.
+    Si existe un artefacto en disco para la versión actual se deserializa;
+    si no, se entrena una vez y se guarda para los siguientes procesos.
+    """
+    global _tagger
+    if _tagger is not None:
+        return _tagger
+    with _tagger_lock:
+        if _tagger is not None:
+            return _tagger
+
+        artifact_path = os.path.join(POS_TAGGER_CACHE_DIR, f"pos_tagger_{_tagger_version_key()}.pickle")
+        if os.path.exists(artifact_path):
+            try:
+                with open(artifact_path, 'rb') as f:
+                    _tagger = pickle.load(f)
+                logger.info(f"Etiquetador POS cargado desde '{artifact_path}'.")
+                return _tagger
+            except (OSError, pickle.UnpicklingError, EOFError, AttributeError) as e:
+                logger.warning(f"No se pudo cargar el etiquetador POS desde '{artifact_path}': {e}. Se reentrenará.")
+
+        logger.info("Entrenando etiquetador POS sobre el corpus cess_esp...")
+        tagger = _train_tagger()
+        try:
+            os.makedirs(POS_TAGGER_CACHE_DIR, exist_ok=True)
+            tmp_path = f"{artifact_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(tagger, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, artifact_path)
+            logger.info(f"Etiquetador POS guardado en '{artifact_path}'.")
+        except OSError as e:
+            logger.warning(f"No se pudo guardar el etiquetador POS en '{artifact_path}': {e}")
+        _tagger = tagger
+        return _tagger
 
 def tokenize_spanish_desc(desc):
     """Tokenización especial para descripciones con abreviaturas"""
@@ -30,7 +104,7 @@ def get_product_type(desc):
     if not tokens:
         return ""
     
-    tagged = tagger.tag(tokens)
+    tagged = get_tagger().tag(tokens)
     
     unidades = {'gr', 'kg', 'lt', 'ml', 'g', 'und', 'u', 'hj', 'h', 'rll', 'r', 's', 'cc', 'x', 'xl'}
     preposiciones = {'de', 'con', 'para', 'y'}
@@ -79,11 +153,19 @@ def get_product_type(desc):
     return " ".join(phrase_tokens)
 
 class UDMExtractor:
+    # Caso común "<número><unidad>": se usa tanto fila a fila como con Series.str.extract.
+    NUMERIC_PATTERN = re.compile(r'(\d+[\.,]?\d*)\s*([a-zA-Z]{1,5})\b')
+
     def __init__(self):
         self.unit_priority_list = self._build_unit_priority_list()
         self.all_unit_variants = set()
         for _, variants in self.unit_priority_list:
             self.all_unit_variants.update(variants)
+        # Variante -> unidad normalizada; ante variantes repetidas gana la de mayor prioridad.
+        self.unit_normalization_map = {}
+        for normalized, variants in self.unit_priority_list:
+            for variant in variants:
+                self.unit_normalization_map.setdefault(variant, normalized)
         
     def _build_unit_priority_list(self):
         return [
@@ -117,16 +199,11 @@ class UDMExtractor:
     
     def _is_count_unit(self, unit):
         """Determina si la unidad es de conteo (puede ser implícita)"""
-        unit_lower = unit.lower()
-        for normalized, variants in self.unit_priority_list:
-            if normalized == "unidades" and unit_lower in variants:
-                return True
-        return False
+        return self.unit_normalization_map.get(unit.lower()) == "unidades"
     
     def _extract_quantity_unit_pair(self, name):
 
-        numeric_pattern = r'(\d+[\.,]?\d*)\s*([a-zA-Z]{1,5})\b'
-        match = re.search(numeric_pattern, name)
+        match = self.NUMERIC_PATTERN.search(name)
         if match:
             quantity_str = match.group(1).replace(',', '.')
             unit_raw = match.group(2).lower()
@@ -141,7 +218,7 @@ class UDMExtractor:
         if not tokens:
             return None, None
         
-        tagged = tagger.tag(tokens)
+        tagged = get_tagger().tag(tokens)
         
         for i, (word, tag) in enumerate(tagged):
             if tag == 'Z':  # Número
@@ -156,6 +233,12 @@ class UDMExtractor:
                         except ValueError:
                             pass
         
+        # El primer token de conteo no depende de la posición que se está revisando,
+        # así que se calcula una sola vez en lugar de en cada iteración del bucle.
+        first_count_unit = next(
+            (word.lower() for word, _ in tagged if self._is_count_unit(word.lower())), None
+        )
+
         for i in range(len(tagged)-1, -1, -1):
             word, tag = tagged[i]
             word_lower = word.lower()
@@ -170,10 +253,8 @@ class UDMExtractor:
                             return quantity, word_lower
                         except ValueError:
                             pass
-            for i, (word, tag) in enumerate(tagged):
-                word_lower = word.lower()
-                if self._is_count_unit(word_lower):
-                    return 1, word_lower
+            if first_count_unit is not None:
+                return 1, first_count_unit
         
         return 1, 'unidades'
 
@@ -182,19 +263,28 @@ class UDMExtractor:
         if unit_raw is None:
             return None
         
-        unit_lower = unit_raw.lower()
-        
-        for normalized_unit, variants in self.unit_priority_list:
-            if unit_lower in variants:
-                return normalized_unit
-        
-        return unit_raw
+        return self.unit_normalization_map.get(unit_raw.lower(), unit_raw)
     
-    def extract_and_normalize_udm(self, product_name_series):
-        """Procesa una serie de nombres de producto"""
+    def extract_and_normalize_udm(self, product_name_series, engine='vectorized'):
+        """
+        Procesa una serie de nombres de producto.
+
+        Args:
+            product_name_series (pd.Series): Nombres de producto.
+            engine (str): 'vectorized' resuelve en bloque el caso "<número><unidad>"
+                          y solo envía al etiquetador los nombres no resueltos;
+                          'python' procesa fila a fila (implementación de referencia).
+        """
         if not isinstance(product_name_series, pd.Series):
             product_name_series = pd.Series(product_name_series)
-        
+
+        if engine == 'python':
+            return self._extract_and_normalize_udm_python(product_name_series)
+        if engine != 'vectorized':
+            raise ValueError(f"Motor de extracción de UDM desconocido: '{engine}'")
+        return self._extract_and_normalize_udm_vectorized(product_name_series)
+
+    def _extract_and_normalize_udm_python(self, product_name_series):
         results = []
         for name in product_name_series:
             quantity, unit_raw = self._extract_quantity_unit_pair(name)
@@ -205,4 +295,32 @@ class UDMExtractor:
                 'normalized_unit': normalized_unit
             })
         
-        return pd.DataFrame(results)
\ No newline at end of file
+        return pd.DataFrame(results)
+
+    def _extract_and_normalize_udm_vectorized(self, product_name_series):
+        names = product_name_series.reset_index(drop=True)
+        if names.empty:
+            return pd.DataFrame(columns=['extracted_quantity', 'unit_raw', 'normalized_unit'])
+
+        extracted = names.str.extract(self.NUMERIC_PATTERN)
+        units = extracted[1].str.lower()
+        resolved = units.isin(self.all_unit_variants)
+
+        quantities = pd.Series(None, index=names.index, dtype=object)
+        unit_raw = pd.Series(None, index=names.index, dtype=object)
+        quantities[resolved] = extracted.loc[resolved, 0].str.replace(',', '.', regex=False).astype(float)
+        unit_raw[resolved] = units[resolved]
+
+        unresolved_idx = names.index[~resolved]
+        if len(unresolved_idx):
+            fallback = [self._extract_quantity_unit_pair(name) for name in names[unresolved_idx]]
+            quantities[unresolved_idx] = [quantity for quantity, _ in fallback]
+            unit_raw[unresolved_idx] = [unit for _, unit in fallback]
+
+        normalized_unit = unit_raw.str.lower().map(self.unit_normalization_map)
+        normalized_unit = normalized_unit.where(normalized_unit.notna(), unit_raw)
+        return pd.DataFrame({
+            'extracted_quantity': pd.to_numeric(quantities),
+            'unit_raw': unit_raw,
+            'normalized_unit': normalized_unit
+        })
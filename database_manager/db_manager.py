@@ -1,18 +1,71 @@
 import psycopg2
 from psycopg2 import sql
-from psycopg2.extras import execute_values, DictCursor
+from psycopg2.extras import execute_values, DictCursor, Json
+from psycopg2.pool import ThreadedConnectionPool, PoolError
 from werkzeug.security import generate_password_hash, check_password_hash
+import io
 import logging
+import pandas as pd
+import threading
 from datetime import datetime, date
 from urllib.parse import urlparse
+from config import DB_POOL_MIN_CONN, DB_POOL_MAX_CONN, DB_POOL_ACQUIRE_TIMEOUT
 
 logger = logging.getLogger(__name__)
 
+
+class _BlockingConnectionPool(ThreadedConnectionPool):
+    """
+    Pool thread-safe que, en lugar de lanzar PoolError cuando se agotan las
+    conexiones, bloquea al hilo solicitante hasta que otra conexión sea devuelta.
+    Si no se libera ninguna en 'acquire_timeout' segundos lanza PoolError (None espera
+    indefinidamente).
+    """
+    def __init__(self, minconn, maxconn, *args, acquire_timeout=None, **kwargs):
+        self._semaphore = threading.BoundedSemaphore(maxconn)
+        self.acquire_timeout = acquire_timeout
+        super().__init__(minconn, maxconn, *args, **kwargs)
+
+    def getconn(self, key=None, timeout=None):
+        if timeout is None:
+            timeout = self.acquire_timeout
+        if not self._semaphore.acquire(timeout=timeout):
+            raise PoolError("Tiempo de espera agotado esperando una conexión libre del pool.")
+        try:
+            return super().getconn(key)
+        except Exception:
+            self._semaphore.release()
+            raise
+
+    def putconn(self, conn, key=None, close=False):
+        try:
+            super().putconn(conn, key, close)
+        finally:
+            self._semaphore.release()
+
+
 class PostgresManager:
+    # Pools de conexiones compartidos por todo el proceso, uno por configuración de BD.
+    _pools = {}
+    _pools_lock = threading.Lock()
+    # Configuraciones para las que ya se ejecutó el bootstrap de esquema y datos iniciales.
+    _bootstrapped_configs = set()
+    _bootstrap_lock = threading.Lock()
+
+    # Columnas de la tabla de hechos 'preprocessed_products' que escriben los cargadores.
+    FACT_COLUMNS = [
+        'product_id', 'website_id', 'price', 'currency',
+        'scrape_timestamp', 'extracted_quantity', 'udm_id'
+    ]
+
     def __init__(self, db_config):
         """
         Inicializa el manejador de PostgreSQL.
 
+        Toma una conexión del pool compartido del proceso. La creación de tablas,
+        del administrador inicial y la carga inicial de productos solo se ejecutan
+        la primera vez que se usa una configuración (ver 'initialize_database').
+
         Args:
             db_config (dict): Diccionario con los parámetros de conexión
                               (host, port, dbname, user, password).
@@ -22,27 +75,92 @@ class PostgresManager:
         self.cursor = None
         self._connect()
         if self.conn:
-            self._create_tables_if_not_exist()
-            self._create_initial_admin_if_not_exists()
-            self.perform_initial_product_load()
+            self._bootstrap_once()
+
+    @staticmethod
+    def _config_key(db_config):
+        return frozenset((k, str(v)) for k, v in db_config.items())
+
+    @classmethod
+    def _get_pool(cls, db_config):
+        """Devuelve (creándolo si hace falta) el pool de conexiones para 'db_config'."""
+        key = cls._config_key(db_config)
+        pool = cls._pools.get(key)
+        if pool is None:
+            with cls._pools_lock:
+                pool = cls._pools.get(key)
+                if pool is None:
+                    pool = _BlockingConnectionPool(DB_POOL_MIN_CONN, DB_POOL_MAX_CONN,
+                                                   acquire_timeout=DB_POOL_ACQUIRE_TIMEOUT, **db_config)
+                    cls._pools[key] = pool
+                    logger.info(f"Pool de conexiones creado para DB '{db_config.get('dbname')}' "
+                                f"(min={DB_POOL_MIN_CONN}, max={DB_POOL_MAX_CONN}).")
+        return pool
+
+    @classmethod
+    def initialize_database(cls, db_config):
+        """
+        Crea el pool y ejecuta una única vez el bootstrap de esquema y datos iniciales.
+        Pensado para llamarse al arrancar la aplicación.
+        Devuelve True si se pudo conectar a la base de datos.
+        """
+        with cls(db_config) as db_manager:
+            return db_manager.conn is not None
+
+    @classmethod
+    def close_all_pools(cls):
+        """Cierra todas las conexiones de todos los pools del proceso."""
+        with cls._pools_lock:
+            for pool in cls._pools.values():
+                pool.closeall()
+            cls._pools.clear()
+        logger.info("Pools de conexiones a PostgreSQL cerrados.")
+
+    def _bootstrap_once(self):
+        """
+        Crea tablas, admin inicial y carga inicial de productos una sola vez por proceso.
+        Si algún paso falla la configuración no se marca y se reintenta en la próxima conexión.
+        """
+        key = self._config_key(self.db_config)
+        if key in self._bootstrapped_configs:
+            return
+        with self._bootstrap_lock:
+            if key in self._bootstrapped_configs:
+                return
+            tables_ready = self._create_tables_if_not_exist()
+            if tables_ready:
+                self._create_initial_admin_if_not_exists()
+            if tables_ready and self.perform_initial_product_load():
+                self._bootstrapped_configs.add(key)
+            else:
+                logger.warning("El bootstrap de la base de datos no se completó. Se reintentará en la próxima conexión.")
 
     def _connect(self):
-        """Establece la conexión con la base de datos."""
+        """Obtiene una conexión del pool compartido y verifica que siga viva."""
         try:
-            self.conn = psycopg2.connect(**self.db_config)
+            pool = self._get_pool(self.db_config)
+            self.conn = pool.getconn()
+            try:
+                with self.conn.cursor() as ping_cursor:
+                    ping_cursor.execute("SELECT 1")
+                self.conn.rollback()
+            except psycopg2.Error:
+                logger.warning("Conexión del pool inválida. Descartándola y solicitando una nueva.")
+                pool.putconn(self.conn, close=True)
+                self.conn = pool.getconn()
             self.conn.autocommit = False # Controlar transacciones manualmente
             self.cursor = self.conn.cursor(cursor_factory=DictCursor) # Usar DictCursor para obtener resultados como diccionarios
-            logger.info(f"Conectado exitosamente a PostgreSQL (DB: {self.db_config.get('dbname')})")
+            logger.debug(f"Conexión obtenida del pool de PostgreSQL (DB: {self.db_config.get('dbname')})")
         except psycopg2.Error as e:
             logger.error(f"Error al conectar a PostgreSQL: {e}")
             self.conn = None
             self.cursor = None
 
     def _create_tables_if_not_exist(self):
-        """Crea las tablas 'websites' y 'preprocessed_products' si no existen."""
+        """Crea las tablas 'websites' y 'preprocessed_products' si no existen. Devuelve True si lo logra."""
         if not self.conn:
             logger.error("No hay conexión a la base de datos para crear tablas.")
-            return
+            return False
 
         commands = (
             """
@@ -94,6 +212,53 @@ class PostgresManager:
             );
             """,
             """
+            CREATE TABLE IF NOT EXISTS product_name_features (
+                name TEXT PRIMARY KEY,
+                product_type TEXT,
+                extracted_quantity FLOAT,
+                unit_raw VARCHAR(50),
+                normalized_unit VARCHAR(255),
+                extractor_version VARCHAR(64) NOT NULL,
+                updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+            );
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS product_match_cache (
+                market_name TEXT NOT NULL,
+                website_id INTEGER NOT NULL,
+                internal_id TEXT,
+                score FLOAT,
+                normalizer_version VARCHAR(64) NOT NULL,
+                matched_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (market_name, website_id)
+            );
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS product_match_catalogue (
+                internal_id TEXT PRIMARY KEY,
+                normalized_name TEXT NOT NULL,
+                normalizer_version VARCHAR(64) NOT NULL,
+                updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+            );
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS scrape_page_fingerprints (
+                site VARCHAR(255) NOT NULL,
+                page_key TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash VARCHAR(64) NOT NULL,
+                item_names TEXT[] NOT NULL DEFAULT '{}',
+                checked_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+                changed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (site, page_key)
+            );
+            """,
+            # Hechos copiados de la ejecución anterior porque la página de origen no cambió.
+            """ALTER TABLE preprocessed_products ADD COLUMN IF NOT EXISTS carried_forward BOOLEAN NOT NULL DEFAULT FALSE;""",
+            # Productos crudos (nombre, precio, moneda, URL) de cada página, para archivar las páginas sin cambios.
+            """ALTER TABLE scrape_page_fingerprints ADD COLUMN IF NOT EXISTS items JSONB NOT NULL DEFAULT '[]';""",
+            """
             CREATE TABLE IF NOT EXISTS users (
                 id SERIAL PRIMARY KEY,
                 username VARCHAR(80) UNIQUE NOT NULL,
@@ -113,10 +278,12 @@ class PostgresManager:
                 self.cursor.execute(command)
             self.conn.commit()
             logger.info("Tablas 'websites' y 'preprocessed_products' aseguradas/creadas exitosamente.")
+            return True
         except psycopg2.Error as e:
             logger.error(f"Error al crear/asegurar tablas: {e}")
             if self.conn:
                 self.conn.rollback() # Revertir si algo falla
+            return False
 
     def _create_initial_admin_if_not_exists(self):
         """
@@ -150,12 +317,28 @@ class PostgresManager:
             )
 
     def close_connection(self):
-        """Cierra la conexión a la base de datos."""
+        """
+        Devuelve la conexión al pool. Cualquier transacción pendiente se revierte
+        para que la siguiente persona que la use la reciba limpia.
+        """
         if self.cursor:
-            self.cursor.close()
+            if not self.cursor.closed:
+                self.cursor.close()
+            self.cursor = None
         if self.conn:
-            self.conn.close()
-        logger.info("Conexión a PostgreSQL cerrada.")
+            pool = self._pools.get(self._config_key(self.db_config))
+            broken = bool(self.conn.closed)
+            if not broken:
+                try:
+                    self.conn.rollback()
+                except psycopg2.Error:
+                    broken = True
+            if pool is not None:
+                pool.putconn(self.conn, close=broken)
+            elif not broken:
+                self.conn.close()
+            self.conn = None
+            logger.debug("Conexión a PostgreSQL devuelta al pool.")
 
     def __enter__(self):
         if not self.conn or self.conn.closed:
@@ -390,24 +573,24 @@ class PostgresManager:
         """
         Realiza una carga masiva inicial de productos a partir de una lista predefinida.
         Esta operación se ejecuta UNA SOLA VEZ, controlada por un flag en la tabla 'config_parameters'.
+        Devuelve False si la carga falló (se reintenta en el próximo bootstrap).
         """
         if not self.conn:
-            return
+            return False
 
         config_key = 'initial_product_load_completed'
         
         if self.get_config_parameter(config_key) == 'true':
             logger.info("La carga inicial de productos base ya se ha realizado anteriormente. Omitiendo.")
-            return
+            return True
 
         logger.info("No se encontró registro de carga inicial. Procediendo a cargar productos base...")
 
         try:
-            import pandas as pd
             initial_products_data = pd.read_parquet('initial_data.parquet')
             if initial_products_data.empty:
                 logger.warning("No se encontraron datos en 'initial_data.parquet'. Abortando carga inicial.")
-                return
+                return True
             
             count = 0
             for item in initial_products_data.to_dict('records'):
@@ -426,10 +609,12 @@ class PostgresManager:
             self.upsert_config_parameter(config_key, 'true', description)
             
             logger.info("Carga inicial de productos completada y bandera de configuración establecida.")
+            return True
 
         except Exception as e:
             logger.error(f"Ocurrió un error crítico durante la carga inicial de productos: {e}")
             self.conn.rollback()
+            return False
 
     def get_product_id_by_name(self, name):
         """Obtiene el ID de un producto por su nombre."""
@@ -443,64 +628,621 @@ class PostgresManager:
             logger.error(f"Error en get_product_id_by_name para '{name}': {e}")
             return None
 
+    def _load_name_id_map(self, table_name):
+        """Devuelve un diccionario nombre -> id con todas las filas de una tabla de dimensión."""
+        query = sql.SQL("SELECT name, id FROM {};").format(sql.Identifier(table_name))
+        self.cursor.execute(query)
+        return {row[0]: row[1] for row in self.cursor.fetchall()}
+
+    def _bulk_upsert_by_name(self, table_name, columns, rows):
+        """
+        Inserta en una sola sentencia las filas de una tabla de dimensión con clave única 'name'.
+        Si otra transacción ya insertó el nombre, se devuelve igualmente su ID.
+        No hace commit: la transacción la controla quien llama.
+        Devuelve un diccionario nombre -> id de las filas afectadas.
+        """
+        if not rows:
+            return {}
+        query = sql.SQL("""
+            INSERT INTO {table} ({cols}) VALUES %s
+            ON CONFLICT (name) DO UPDATE SET name = EXCLUDED.name
+            RETURNING name, id;
+        """).format(
+            table=sql.Identifier(table_name),
+            cols=sql.SQL(', ').join(map(sql.Identifier, columns))
+        )
+        returned = execute_values(self.cursor, query, rows, page_size=1000, fetch=True)
+        return {row[0]: row[1] for row in returned}
+
+    @staticmethod
+    def _is_null(value):
+        """True para None y NaN (valores nulos que llegan desde un DataFrame)."""
+        return value is None or (isinstance(value, float) and value != value)
+
+    def _ensure_dimensions(self, websites, product_types, products, units):
+        """
+        Garantiza que existan las filas de dimensión necesarias para un lote de hechos.
+
+        Precarga en memoria los mapas nombre -> id de 'websites', 'product_type',
+        'products' y 'udm' e inserta solo los nombres que faltan, con una sentencia
+        por tabla. No hace commit: la transacción la controla quien llama.
+
+        Args:
+            websites (dict): nombre del sitio -> URL de algún producto del sitio.
+            product_types (iterable): nombres de tipos de producto.
+            products (dict): nombre del producto -> nombre de su tipo.
+            units (iterable): nombres de UDM normalizadas.
+
+        Returns:
+            tuple: (mapas, conteos). 'mapas' tiene las claves 'websites', 'product_type',
+                   'products' y 'udm'; 'conteos' las claves 'new_websites',
+                   'new_product_types', 'new_products' y 'new_udms'.
+        """
+        id_maps = {table: self._load_name_id_map(table) for table in ('websites', 'product_type', 'products', 'udm')}
+        logger.info(f"Dimensiones precargadas: {len(id_maps['websites'])} sitios, {len(id_maps['product_type'])} tipos, "
+                    f"{len(id_maps['products'])} productos, {len(id_maps['udm'])} UDMs.")
+
+        now = datetime.now()
+        new_ids = self._bulk_upsert_by_name(
+            'websites', ['name', 'url', 'last_scraped_at'],
+            [(name, urlparse(url).netloc, now) for name, url in websites.items() if name not in id_maps['websites']]
+        )
+        id_maps['websites'].update(new_ids)
+        counts = {'new_websites': len(new_ids)}
+
+        new_ids = self._bulk_upsert_by_name(
+            'product_type', ['name'],
+            [(name,) for name in set(product_types)
+             if not self._is_null(name) and name != '' and name not in id_maps['product_type']]
+        )
+        id_maps['product_type'].update(new_ids)
+        counts['new_product_types'] = len(new_ids)
+
+        # Un producto sin tipo no cumple la restricción NOT NULL de products.product_type_id:
+        # su hecho se registra sin product_id, igual que en la inserción fila a fila.
+        product_rows = []
+        for name, product_type in products.items():
+            if name in id_maps['products']:
+                continue
+            product_type_id = None if self._is_null(product_type) else id_maps['product_type'].get(product_type)
+            if product_type_id is None:
+                logger.warning(f"Producto '{name}' sin tipo de producto válido. Se omite su alta en 'products'.")
+                continue
+            product_rows.append((name, product_type_id))
+        new_ids = self._bulk_upsert_by_name('products', ['name', 'product_type_id'], product_rows)
+        id_maps['products'].update(new_ids)
+        counts['new_products'] = len(new_ids)
+
+        new_ids = self._bulk_upsert_by_name(
+            'udm', ['name'],
+            [(name,) for name in set(units) if not self._is_null(name) and name not in id_maps['udm']]
+        )
+        id_maps['udm'].update(new_ids)
+        counts['new_udms'] = len(new_ids)
+        return id_maps, counts
+
+    def bulk_ingest_preprocessed_products(self, products_data_list, date_time):
+        """
+        Ingesta masiva de productos preprocesados en una única transacción.
+
+        Resuelve las dimensiones con '_ensure_dimensions' (una sentencia por tabla
+        para los nombres nuevos) y luego escribe todos los hechos en
+        'preprocessed_products'.
+
+        Returns:
+            dict: Conteos con las claves 'new_websites', 'new_product_types',
+                  'new_products', 'new_udms' y 'facts_written'.
+        """
+        counts = {
+            'new_websites': 0,
+            'new_product_types': 0,
+            'new_products': 0,
+            'new_udms': 0,
+            'facts_written': 0
+        }
+        if not self.conn or not products_data_list:
+            logger.warning("No hay conexión o no hay datos de productos para insertar.")
+            return counts
+
+        try:
+            counts.update(self._insert_facts(products_data_list, date_time))
+            self.conn.commit()
+            logger.info(f"Ingesta masiva completada: {counts}")
+            return counts
+        except psycopg2.Error as e:
+            logger.error(f"Error en bulk_ingest_preprocessed_products: {e}")
+            self.conn.rollback()
+            return {key: 0 for key in counts}
+
+    def _insert_facts(self, products_data_list, date_time):
+        """
+        Resuelve las dimensiones de un lote de productos preprocesados y escribe sus hechos.
+        No hace commit: la transacción la controla quien llama. Devuelve los conteos de
+        dimensiones nuevas y 'facts_written'.
+        """
+        websites = {}
+        products = {}
+        for product_dict in products_data_list:
+            websites.setdefault(product_dict['site'], product_dict['url'])
+            products.setdefault(product_dict.get('name', ''), product_dict.get('product_type'))
+
+        id_maps, counts = self._ensure_dimensions(
+            websites,
+            (product_dict.get('product_type') for product_dict in products_data_list),
+            products,
+            (product_dict.get('normalized_unit', '') for product_dict in products_data_list)
+        )
+        website_ids, product_ids, udm_ids = id_maps['websites'], id_maps['products'], id_maps['udm']
+
+        values_to_insert = []
+        for product_dict in products_data_list:
+            product_dict['product_id'] = product_ids.get(product_dict.get('name', ''))
+            product_dict['website_id'] = website_ids.get(product_dict['site'])
+            product_dict['scrape_timestamp'] = date_time
+            unit = product_dict.get('normalized_unit', '')
+            product_dict['udm_id'] = None if self._is_null(unit) else udm_ids.get(unit)
+            values_to_insert.append(tuple(product_dict.get(col) for col in self.FACT_COLUMNS))
+
+        query = sql.SQL("INSERT INTO preprocessed_products ({}) VALUES %s").format(
+            sql.SQL(', ').join(map(sql.Identifier, self.FACT_COLUMNS))
+        )
+        execute_values(self.cursor, query, values_to_insert, page_size=1000)
+        counts['facts_written'] = len(values_to_insert)
+        return counts
+
+    def replace_run_facts(self, products_data_list, unchanged_pairs, date_time, sites):
+        """
+        Reemplaza en una única transacción los hechos de una ejecución repetida desde el archivo
+        crudo: borra los hechos de 'sites' con marca de tiempo 'date_time', escribe los de
+        'products_data_list' y arrastra los pares (nombre, sitio) de 'unchanged_pairs'. Si algo
+        falla no se modifica nada, de modo que repetir una ejecución no duplica sus hechos.
+
+        Returns:
+            dict: Conteos de 'bulk_ingest_preprocessed_products' más 'facts_deleted' y 'facts_carried'.
+        """
+        counts = {
+            'new_websites': 0,
+            'new_product_types': 0,
+            'new_products': 0,
+            'new_udms': 0,
+            'facts_written': 0,
+            'facts_deleted': 0,
+            'facts_carried': 0
+        }
+        if not self.conn or not sites:
+            return counts
+
+        try:
+            self.cursor.execute("""
+                DELETE FROM preprocessed_products pp
+                USING websites w
+                WHERE pp.website_id = w.id AND w.name = ANY(%s) AND pp.scrape_timestamp = %s;
+            """, (list(sites), date_time))
+            counts['facts_deleted'] = self.cursor.rowcount
+            if products_data_list:
+                counts.update(self._insert_facts(products_data_list, date_time))
+            counts['facts_carried'] = self._carry_forward_facts(unchanged_pairs, date_time)
+            self.conn.commit()
+            logger.info(f"Hechos de la ejecución del {date_time} reemplazados: {counts}")
+            return counts
+        except psycopg2.Error as e:
+            logger.error(f"Error en replace_run_facts: {e}")
+            self.conn.rollback()
+            return {key: 0 for key in counts}
+
     def insert_preprocessed_products_batch(self, products_data_list, date_time):
         """
         Inserta una lista de diccionarios de productos preprocesados.
         'products_data_list' debe ser una lista de diccionarios donde cada dict
         tiene claves que coinciden con las columnas de 'preprocessed_products'.
-        Se espera que 'website_id' ya esté presente en los diccionarios.
+        Delega en 'bulk_ingest_preprocessed_products' y devuelve el número de
+        hechos insertados.
         """
-        if not self.conn or not products_data_list:
-            logger.warning("No hay conexión o no hay datos de productos para insertar.")
-            return 0
+        return self.bulk_ingest_preprocessed_products(products_data_list, date_time)['facts_written']
+
+    def copy_preprocessed_products_from_df(self, df, date_time, chunk_size=50000, start_row=0):
+        """
+        Carga masiva de hechos con 'COPY preprocessed_products FROM STDIN' (formato CSV).
+
+        Pensado para backfills y re-importaciones históricas de millones de filas:
+        las dimensiones se resuelven una sola vez a partir de los valores únicos
+        del DataFrame, los IDs se asignan con operaciones vectorizadas de pandas
+        y cada bloque de 'chunk_size' filas se serializa a un buffer CSV en
+        memoria. Las dimensiones se confirman primero y luego cada bloque en su
+        propia transacción: si un bloque falla se revierte sólo ese bloque y la
+        carga se detiene. 'next_row' indica la fila desde la que reanudarla.
+
+        Args:
+            df (pd.DataFrame): DataFrame preprocesado (columnas 'name', 'site', 'url',
+                               'price', 'currency', 'extracted_quantity',
+                               'normalized_unit' y 'product_type').
+            date_time (datetime): Marca de tiempo del scrapeo. Si el DataFrame ya trae
+                                  una columna 'scrape_timestamp', se respeta esa.
+            chunk_size (int): Número de filas por bloque (y por transacción) enviado con COPY.
+            start_row (int): Primera fila del DataFrame a cargar, para reanudar una carga
+                             interrumpida con el 'next_row' devuelto.
+
+        Returns:
+            dict: Conteos con las mismas claves que 'bulk_ingest_preprocessed_products'
+                  ('facts_written' son las filas confirmadas) más 'next_row'.
+        """
+        counts = {
+            'new_websites': 0,
+            'new_product_types': 0,
+            'new_products': 0,
+            'new_udms': 0,
+            'facts_written': 0,
+            'next_row': start_row
+        }
+        if not self.conn or df is None or df.empty:
+            logger.warning("No hay conexión o no hay datos de productos para cargar con COPY.")
+            return counts
+
+        copy_query = sql.SQL("COPY preprocessed_products ({}) FROM STDIN WITH (FORMAT csv)").format(
+            sql.SQL(', ').join(map(sql.Identifier, self.FACT_COLUMNS))
+        ).as_string(self.conn)
+
+        try:
+            df = df.iloc[start_row:]
+            sites = df.drop_duplicates('site')
+            names = df.drop_duplicates('name')
+            id_maps, dimension_counts = self._ensure_dimensions(
+                dict(zip(sites['site'], sites['url'])),
+                df['product_type'].dropna().unique(),
+                dict(zip(names['name'], names['product_type'])),
+                df['normalized_unit'].dropna().unique()
+            )
+
+            facts = pd.DataFrame({
+                'product_id': df['name'].map(id_maps['products']).astype('Int64'),
+                'website_id': df['site'].map(id_maps['websites']).astype('Int64'),
+                'price': df['price'],
+                'currency': df['currency'],
+                'scrape_timestamp': df['scrape_timestamp'] if 'scrape_timestamp' in df.columns else date_time,
+                'extracted_quantity': df['extracted_quantity'],
+                'udm_id': df['normalized_unit'].map(id_maps['udm']).astype('Int64'),
+            }, columns=self.FACT_COLUMNS)
+            self.conn.commit()
+            counts.update(dimension_counts)
+        except psycopg2.Error as e:
+            logger.error(f"Error al resolver las dimensiones para la carga con COPY: {e}")
+            self.conn.rollback()
+            return counts
+
+        for start in range(0, len(facts), chunk_size):
+            chunk = facts.iloc[start:start + chunk_size]
+            buffer = io.StringIO()
+            chunk.to_csv(buffer, index=False, header=False)
+            buffer.seek(0)
+            try:
+                self.cursor.copy_expert(copy_query, buffer)
+                self.conn.commit()
+            except psycopg2.Error as e:
+                logger.error(f"Error en el bloque COPY que empieza en la fila {counts['next_row']}; se revierte ese "
+                             f"bloque y se detiene la carga: {e}")
+                self.conn.rollback()
+                return counts
+            counts['facts_written'] += len(chunk)
+            counts['next_row'] += len(chunk)
+            logger.info(f"COPY: bloque de {len(chunk)} filas confirmado ({start + len(chunk)}/{len(facts)}).")
 
-        cols = [
-            'product_id', 'website_id', 'price', 'currency',
-            'scrape_timestamp', 'extracted_quantity', 'udm_id'
+        logger.info(f"Carga con COPY completada: {counts}")
+        return counts
+
+    def get_product_name_features(self, names, extractor_version):
+        """
+        Obtiene las características (tipo, cantidad, unidad) ya calculadas para una lista
+        de nombres de producto con la versión de extractor indicada.
+        Devuelve un diccionario nombre -> dict de características.
+        """
+        if not self.conn or not names: return {}
+        query = sql.SQL("""
+            SELECT name, product_type, extracted_quantity, unit_raw, normalized_unit
+            FROM product_name_features
+            WHERE extractor_version = %s AND name = ANY(%s);
+        """)
+        try:
+            self.cursor.execute(query, (extractor_version, list(names)))
+            return {row['name']: {
+                        'product_type': row['product_type'],
+                        'extracted_quantity': row['extracted_quantity'],
+                        'unit_raw': row['unit_raw'],
+                        'normalized_unit': row['normalized_unit']
+                    } for row in self.cursor.fetchall()}
+        except psycopg2.Error as e:
+            logger.error(f"Error en get_product_name_features: {e}")
+            self.conn.rollback()
+            return {}
+
+    def upsert_product_name_features(self, features_by_name, extractor_version):
+        """
+        Inserta o actualiza en bloque las características calculadas por nombre de producto.
+        Devuelve el número de filas escritas.
+        """
+        if not self.conn or not features_by_name: return 0
+        query = sql.SQL("""
+            INSERT INTO product_name_features
+                (name, product_type, extracted_quantity, unit_raw, normalized_unit, extractor_version, updated_at)
+            VALUES %s
+            ON CONFLICT (name) DO UPDATE SET
+                product_type = EXCLUDED.product_type,
+                extracted_quantity = EXCLUDED.extracted_quantity,
+                unit_raw = EXCLUDED.unit_raw,
+                normalized_unit = EXCLUDED.normalized_unit,
+                extractor_version = EXCLUDED.extractor_version,
+                updated_at = EXCLUDED.updated_at;
+        """)
+        now = datetime.now()
+        rows = [
+            (name, f['product_type'], f['extracted_quantity'], f['unit_raw'], f['normalized_unit'], extractor_version, now)
+            for name, f in features_by_name.items()
         ]
-        
-        values_to_insert = []
-        for product_dict in products_data_list:
-            website_id = self.get_website_id_by_name(product_dict['site'])
-            if not website_id:
-                url = product_dict['url']
-                website_root = urlparse(url).netloc
-                website_id = self.upsert_website(product_dict['site'], website_root)
+        try:
+            execute_values(self.cursor, query, rows, page_size=1000)
+            self.conn.commit()
+            return len(rows)
+        except psycopg2.Error as e:
+            logger.error(f"Error en upsert_product_name_features: {e}")
+            self.conn.rollback()
+            return 0
 
-            product_id = self.get_product_id_by_name(product_dict.get('name', ''))
-            if not product_id:
-                product_id = self.upsert_product(product_dict.get('name', ''), product_dict.get('product_type'))
-            
-            udm_id = self.get_udm_id_by_name(product_dict.get('normalized_unit', ''))
-            if not udm_id:
-                udm_id = self.upsert_udm(product_dict.get('normalized_unit', ''))
+    def get_product_match_cache(self, normalizer_version):
+        """
+        Obtiene el mejor candidato guardado para cada producto del mercado con la versión
+        de normalizador indicada.
+        Devuelve un diccionario (market_name, website_id) -> (internal_id, score).
+        """
+        if not self.conn: return {}
+        query = sql.SQL("""
+            SELECT market_name, website_id, internal_id, score
+            FROM product_match_cache
+            WHERE normalizer_version = %s;
+        """)
+        try:
+            self.cursor.execute(query, (normalizer_version,))
+            return {(row['market_name'], row['website_id']): (row['internal_id'], row['score'])
+                    for row in self.cursor.fetchall()}
+        except psycopg2.Error as e:
+            logger.error(f"Error en get_product_match_cache: {e}")
+            self.conn.rollback()
+            return {}
 
-            product_dict['product_id'] = product_id
-            product_dict['website_id'] = website_id
-            product_dict['scrape_timestamp'] = date_time
-            product_dict['udm_id'] = udm_id
+    def upsert_product_match_cache(self, matches, normalizer_version):
+        """
+        Inserta o actualiza en bloque el mejor candidato de productos del mercado.
+        'matches' es un diccionario (market_name, website_id) -> (internal_id, score).
+        Devuelve el número de filas escritas.
+        """
+        if not self.conn or not matches: return 0
+        try:
+            written = self._upsert_match_rows(matches, normalizer_version)
+            self.conn.commit()
+            return written
+        except psycopg2.Error as e:
+            logger.error(f"Error en upsert_product_match_cache: {e}")
+            self.conn.rollback()
+            return 0
+
+    def _upsert_match_rows(self, matches, normalizer_version):
+        """Escritura de 'upsert_product_match_cache' sin commit. Devuelve las filas escritas."""
+        if not matches: return 0
+        query = sql.SQL("""
+            INSERT INTO product_match_cache
+                (market_name, website_id, internal_id, score, normalizer_version, matched_at)
+            VALUES %s
+            ON CONFLICT (market_name, website_id) DO UPDATE SET
+                internal_id = EXCLUDED.internal_id,
+                score = EXCLUDED.score,
+                normalizer_version = EXCLUDED.normalizer_version,
+                matched_at = EXCLUDED.matched_at;
+        """)
+        now = datetime.now()
+        rows = [(name, website_id, internal_id, score, normalizer_version, now)
+                for (name, website_id), (internal_id, score) in matches.items()]
+        execute_values(self.cursor, query, rows, page_size=1000)
+        return len(rows)
 
-            values_to_insert.append(tuple(product_dict.get(col) for col in cols))
+    def get_match_catalogue(self, normalizer_version):
+        """
+        Obtiene el catálogo interno contra el que se calcularon las coincidencias guardadas.
+        Devuelve un diccionario internal_id -> normalized_name.
+        """
+        if not self.conn: return {}
+        query = sql.SQL("""
+            SELECT internal_id, normalized_name FROM product_match_catalogue
+            WHERE normalizer_version = %s;
+        """)
+        try:
+            self.cursor.execute(query, (normalizer_version,))
+            return {row['internal_id']: row['normalized_name'] for row in self.cursor.fetchall()}
+        except psycopg2.Error as e:
+            logger.error(f"Error en get_match_catalogue: {e}")
+            self.conn.rollback()
+            return {}
 
-        if not values_to_insert:
-            logger.info("No hay valores válidos para insertar en preprocessed_products.")
+    def replace_match_catalogue(self, catalogue, normalizer_version):
+        """
+        Reemplaza el catálogo interno registrado por 'catalogue' (internal_id -> normalized_name)
+        en una sola transacción. Devuelve True si tuvo éxito.
+        """
+        if not self.conn: return False
+        try:
+            self._replace_catalogue_rows(catalogue, normalizer_version)
+            self.conn.commit()
+            return True
+        except psycopg2.Error as e:
+            logger.error(f"Error en replace_match_catalogue: {e}")
+            self.conn.rollback()
+            return False
+
+    def _replace_catalogue_rows(self, catalogue, normalizer_version):
+        """Reemplazo de 'replace_match_catalogue' sin commit."""
+        insert_query = sql.SQL("""
+            INSERT INTO product_match_catalogue (internal_id, normalized_name, normalizer_version, updated_at)
+            VALUES %s;
+        """)
+        now = datetime.now()
+        rows = [(internal_id, name, normalizer_version, now) for internal_id, name in catalogue.items()]
+        self.cursor.execute("DELETE FROM product_match_catalogue;")
+        if rows:
+            execute_values(self.cursor, insert_query, rows, page_size=1000)
+
+    def save_product_matches(self, matches, normalizer_version, catalogue=None):
+        """
+        Guarda en una única transacción los candidatos de 'matches' (ver upsert_product_match_cache)
+        y, si se indica, el catálogo 'catalogue' contra el que se calcularon (ver
+        replace_match_catalogue). Si algo falla no se guarda nada, de modo que el catálogo
+        registrado nunca avanza sin los candidatos que le corresponden. Devuelve True si tuvo éxito.
+        """
+        if not self.conn: return False
+        try:
+            self._upsert_match_rows(matches, normalizer_version)
+            if catalogue is not None:
+                self._replace_catalogue_rows(catalogue, normalizer_version)
+            self.conn.commit()
+            return True
+        except psycopg2.Error as e:
+            logger.error(f"Error en save_product_matches: {e}")
+            self.conn.rollback()
+            return False
+
+    def invalidate_product_match_cache(self):
+        """
+        Vacía la caché de coincidencias y el catálogo registrado, forzando un matching
+        completo en el próximo entrenamiento. Devuelve el número de coincidencias eliminadas
+        o None si falla.
+        """
+        if not self.conn: return None
+        try:
+            self.cursor.execute("DELETE FROM product_match_cache;")
+            deleted = self.cursor.rowcount
+            self.cursor.execute("DELETE FROM product_match_catalogue;")
+            self.conn.commit()
+            logger.info(f"Caché de matching invalidada: {deleted} coincidencias eliminadas.")
+            return deleted
+        except psycopg2.Error as e:
+            logger.error(f"Error al invalidar la caché de matching: {e}")
+            self.conn.rollback()
+            return None
+
+    def get_page_fingerprints(self, site):
+        """
+        Obtiene las huellas de cambio guardadas para las páginas de un sitio.
+        Devuelve un diccionario page_key -> dict con 'etag', 'last_modified',
+        'content_hash', 'item_names' e 'items'.
+        """
+        if not self.conn: return {}
+        query = sql.SQL("""
+            SELECT page_key, etag, last_modified, content_hash, item_names, items
+            FROM scrape_page_fingerprints
+            WHERE site = %s;
+        """)
+        try:
+            self.cursor.execute(query, (site,))
+            return {row['page_key']: {
+                        'etag': row['etag'],
+                        'last_modified': row['last_modified'],
+                        'content_hash': row['content_hash'],
+                        'item_names': list(row['item_names'] or []),
+                        'items': list(row['items'] or [])
+                    } for row in self.cursor.fetchall()}
+        except psycopg2.Error as e:
+            logger.error(f"Error en get_page_fingerprints: {e}")
+            self.conn.rollback()
+            return {}
+
+    def upsert_page_fingerprints(self, site, fingerprints):
+        """
+        Inserta o actualiza en bloque las huellas de las páginas revisadas de un sitio.
+        'fingerprints' es un diccionario page_key -> dict con 'etag', 'last_modified',
+        'content_hash', 'item_names', 'items' y 'changed' (si es False se conserva 'changed_at').
+        Devuelve el número de filas escritas.
+        """
+        if not self.conn or not fingerprints: return 0
+        query = sql.SQL("""
+            INSERT INTO scrape_page_fingerprints
+                (site, page_key, etag, last_modified, content_hash, item_names, items, checked_at, changed_at)
+            VALUES %s
+            ON CONFLICT (site, page_key) DO UPDATE SET
+                etag = EXCLUDED.etag,
+                last_modified = EXCLUDED.last_modified,
+                content_hash = EXCLUDED.content_hash,
+                item_names = EXCLUDED.item_names,
+                items = EXCLUDED.items,
+                checked_at = EXCLUDED.checked_at,
+                changed_at = COALESCE(EXCLUDED.changed_at, scrape_page_fingerprints.changed_at);
+        """)
+        now = datetime.now()
+        rows = [(site, page_key, f.get('etag'), f.get('last_modified'), f['content_hash'], list(f['item_names']),
+                 Json(f.get('items', [])), now, now if f.get('changed', True) else None)
+                for page_key, f in fingerprints.items()]
+        try:
+            execute_values(self.cursor, query, rows, page_size=1000)
+            self.conn.commit()
+            return len(rows)
+        except psycopg2.Error as e:
+            logger.error(f"Error en upsert_page_fingerprints: {e}")
+            self.conn.rollback()
             return 0
-        
-        query = sql.SQL("INSERT INTO preprocessed_products ({}) VALUES %s").format(
-            sql.SQL(', ').join(map(sql.Identifier, cols))
-        )
-        
+
+    def invalidate_page_fingerprints(self, site=None):
+        """
+        Borra las huellas de cambio (de un sitio o de todos) para que la próxima ejecución
+        vuelva a parsear todas las páginas. Devuelve el número de filas eliminadas o None si falla.
+        """
+        if not self.conn: return None
+        try:
+            if site is None:
+                self.cursor.execute("DELETE FROM scrape_page_fingerprints;")
+            else:
+                self.cursor.execute("DELETE FROM scrape_page_fingerprints WHERE site = %s;", (site,))
+            deleted = self.cursor.rowcount
+            self.conn.commit()
+            logger.info(f"Huellas de cambio invalidadas: {deleted} páginas.")
+            return deleted
+        except psycopg2.Error as e:
+            logger.error(f"Error al invalidar las huellas de cambio: {e}")
+            self.conn.rollback()
+            return None
+
+    def carry_forward_preprocessed_products(self, name_site_pairs, date_time):
+        """
+        Copia con la marca de tiempo 'date_time' el último hecho anterior a esa fecha de cada
+        par (nombre de producto, sitio), marcándolo con carried_forward = TRUE. Se usa para los productos
+        de páginas que no cambiaron desde la ejecución anterior, sin volver a preprocesarlos.
+        Devuelve el número de hechos escritos.
+        """
+        if not self.conn or not name_site_pairs: return 0
         try:
-            execute_values(self.cursor, query, values_to_insert)
+            written = self._carry_forward_facts(name_site_pairs, date_time)
             self.conn.commit()
-            count = len(values_to_insert)
-            logger.info(f"{count} productos preprocesados insertados exitosamente.")
-            return count
+            logger.info(f"Hechos arrastrados de la ejecución anterior: {written} de {len(name_site_pairs)} productos sin cambios.")
+            return written
         except psycopg2.Error as e:
-            logger.error(f"Error en insert_preprocessed_products_batch: {e}")
+            logger.error(f"Error en carry_forward_preprocessed_products: {e}")
             self.conn.rollback()
             return 0
 
+    def _carry_forward_facts(self, name_site_pairs, date_time):
+        """Arrastre de 'carry_forward_preprocessed_products' sin commit. Devuelve los hechos escritos."""
+        if not name_site_pairs: return 0
+        query = sql.SQL("""
+            INSERT INTO preprocessed_products
+                (product_id, website_id, price, currency, scrape_timestamp, extracted_quantity, udm_id, carried_forward)
+            SELECT DISTINCT ON (pp.product_id, pp.website_id)
+                pp.product_id, pp.website_id, pp.price, pp.currency, keep.ts::timestamptz,
+                pp.extracted_quantity, pp.udm_id, TRUE
+            FROM (VALUES %s) AS keep(name, site, ts)
+            JOIN products p ON p.name = keep.name
+            JOIN websites w ON w.name = keep.site
+            JOIN preprocessed_products pp ON pp.product_id = p.id AND pp.website_id = w.id
+                                            AND pp.scrape_timestamp < keep.ts::timestamptz
+            ORDER BY pp.product_id, pp.website_id, pp.scrape_timestamp DESC;
+        """)
+        rows = [(name, site, date_time) for name, site in name_site_pairs]
+        execute_values(self.cursor, query, rows, page_size=len(rows))
+        return self.cursor.rowcount
+
     def get_preprocessed_products(self, start_date=None, end_date=None, product_types=None, search_term=None, retailers=None):
         """
         Obtiene productos preprocesados, filtrados directamente en la base de datos.
@@ -93,6 +93,11 @@ def run_scheduler():
 if __name__ == '__main__':
 
     logger.info("APLICACIÓN: Iniciando aplicación principal...")
+    if PostgresManager.initialize_database(DB_CONFIG):
+        logger.info("APLICACIÓN: Esquema de base de datos y datos iniciales verificados.")
+    else:
+        logger.error("APLICACIÓN: No se pudo inicializar la base de datos al arrancar.")
+
     scheduler_thread = threading.Thread(target=run_scheduler, name="SchedulerThread", daemon=True)
     scheduler_thread.start()
 
@@ -104,5 +109,6 @@ if __name__ == '__main__':
     logger.info("APLICACIÓN: Iniciando servidor Dash...")
     dash_app.run(debug=False, host='0.0.0.0', port=8050, use_reloader=False)
 
+    PostgresManager.close_all_pools()
     logger.info("APLICACIÓN: Servidor Dash detenido.")
 
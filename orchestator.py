@@ -1,10 +1,18 @@
-import pandas as pd
+import argparse
+import itertools
 import logging
 import os
-from datetime import datetime
+import queue
+import threading
+import time
+from datetime import date, datetime
 
 from scraper import scraper
-from data_processor import ProductDataPreprocessor
+from scraper.raw_archive import RawScrapeArchive
+from config import (DB_CONFIG, SCRAPE_ARCHIVE_ENABLED, ORCHESTRATOR_PIPELINE_MODE, ORCHESTRATOR_QUEUE_SIZE,
+                    ORCHESTRATOR_BATCH_SIZE, ORCHESTRATOR_STAGE_JOIN_TIMEOUT)
+from database_manager import PostgresManager
+from data_processor import ProductDataPreprocessor, ProductFeatureCache
 
 
 
@@ -32,10 +40,292 @@ def setup_logging(log_level=logging.INFO, log_file="orchestrator.log"): # Cambia
     logging.info("Logging configurado. Logs se guardarán en: %s", log_file_path)
 
 
+def _preprocess_products(products, feature_cache):
+    """Preprocesa una lista de productos crudos. Devuelve los registros listos para ingerir."""
+    preprocessor = ProductDataPreprocessor(lang='spanish', feature_cache=feature_cache)
+    preprocessor.load_data(products)
+    df_preprocessed_for_db = preprocessor.preprocess_data()
+    if df_preprocessed_for_db.empty:
+        logging.warning("DataFrame preprocesado está vacío después del preprocesamiento. No se insertará en BD.")
+        return []
+    return df_preprocessed_for_db.to_dict('records')
+
+
+def _ingest_products(db_manager, products_to_insert_db_list, ingest_time):
+    """Ingesta registros preprocesados con la marca de tiempo 'ingest_time'. Devuelve los hechos escritos."""
+    ingest_counts = db_manager.bulk_ingest_preprocessed_products(products_to_insert_db_list, ingest_time)
+    logging.info(f"Se intentó insertar {len(products_to_insert_db_list)} productos preprocesados en BD, insertados exitosamente: {ingest_counts['facts_written']}")
+    logging.info(f"Nuevas dimensiones: {ingest_counts['new_products']} productos, {ingest_counts['new_udms']} UDMs, "
+                 f"{ingest_counts['new_product_types']} tipos de producto, {ingest_counts['new_websites']} sitios web.")
+    return ingest_counts['facts_written']
+
+
+def _log_feature_cache_stats(feature_cache):
+    cache_stats = feature_cache.stats()
+    logging.info(f"Caché de tipo/UDM por nombre: {cache_stats['lru_hits']} aciertos en memoria, "
+                 f"{cache_stats['db_hits']} aciertos en BD, {cache_stats['misses']} fallos.")
+
+
+def _carry_forward_unchanged(db_manager, unchanged_pairs, ingest_time):
+    if unchanged_pairs:
+        logging.info(f"{len(unchanged_pairs)} productos provienen de páginas sin cambios. Arrastrando sus precios...")
+        db_manager.carry_forward_preprocessed_products(unchanged_pairs, ingest_time)
+
+
+def _sites_without_records(changed_products, products_to_insert_db_list):
+    """Sitios con productos modificados que no produjeron ningún registro preprocesado."""
+    return {p['site'] for p in changed_products} - {p['site'] for p in products_to_insert_db_list}
+
+
+def _settle_change_trackers(db_manager, change_trackers, failed_sites):
+    """
+    Guarda las huellas de cambio de los sitios cuyos hechos quedaron confirmados en la BD e
+    invalida las de los sitios con algún lote fallido (o cuyo scraper falló), para que la
+    próxima ejecución los vuelva a parsear en lugar de arrastrar precios que no se guardaron.
+    """
+    for tracker in change_trackers:
+        if tracker.scrape_failed or tracker.site_name in failed_sites:
+            logging.warning(f"Ejecución incompleta para {tracker.site_name}: se invalidan sus huellas de cambio.")
+            db_manager.invalidate_page_fingerprints(tracker.site_name)
+        else:
+            tracker.flush()
+
+
+def _preprocess_and_ingest(db_manager, raw_products, ingest_time):
+    """
+    Preprocesa los productos crudos de una ejecución y los ingesta con la marca de tiempo
+    'ingest_time'. Los marcadores de páginas sin cambios (ver scraper/change_tracker.py) no
+    se preprocesan: se arrastra su último precio guardado.
+
+    Returns:
+        tuple: (hechos escritos para los productos modificados, o None si no había productos
+                modificados que ingerir; sitios con productos modificados sin hechos escritos).
+    """
+    unchanged_products = [p for p in raw_products if p.get('unchanged')]
+    changed_products = [p for p in raw_products if not p.get('unchanged')]
+    facts_written = None
+    products_to_insert_db_list = []
+
+    if changed_products:
+        logging.info(f"--- Iniciando Fase de Preprocesamiento para {len(changed_products)} productos ---")
+        feature_cache = ProductFeatureCache(db_manager)
+        products_to_insert_db_list = _preprocess_products(changed_products, feature_cache)
+        _log_feature_cache_stats(feature_cache)
+        if products_to_insert_db_list:
+            logging.info("Preprocesamiento completado.")
+            facts_written = _ingest_products(db_manager, products_to_insert_db_list, ingest_time)
+
+    _carry_forward_unchanged(db_manager, {(p['name'], p['site']) for p in unchanged_products}, ingest_time)
+    if changed_products and not facts_written:
+        return facts_written, {p['site'] for p in changed_products}
+    return facts_written, _sites_without_records(changed_products, products_to_insert_db_list)
+
+
+_END_OF_STREAM = None
+
+
+def _coalesced_batches(batch_queue, batch_size):
+    """
+    Produce los lotes de 'batch_queue' hasta el fin del flujo, uniendo en uno los lotes que ya
+    esperan en la cola hasta juntar 'batch_size' productos (no espera a que lleguen más).
+    """
+    while True:
+        batch = batch_queue.get()
+        if batch is _END_OF_STREAM:
+            return
+        pending = list(batch)
+        while len(pending) < batch_size:
+            try:
+                batch = batch_queue.get_nowait()
+            except queue.Empty:
+                break
+            if batch is _END_OF_STREAM:
+                yield pending
+                return
+            pending.extend(batch)
+        yield pending
+
+
+def _run_streaming_pipeline(db_manager, ingest_time, change_trackers, queue_size=ORCHESTRATOR_QUEUE_SIZE,
+                            batch_size=ORCHESTRATOR_BATCH_SIZE, join_timeout=ORCHESTRATOR_STAGE_JOIN_TIMEOUT):
+    """
+    Scraping, preprocesamiento e ingesta como etapas concurrentes unidas por colas acotadas.
+
+    Los scrapers entregan lotes (ver BaseScraper.emit_batch) a una cola; un hilo los agrupa
+    hasta 'batch_size' productos, descarta los repetidos (nombre, sitio), los archiva y los
+    preprocesa; el hilo actual ingesta cada lote preprocesado en cuanto llega. Si una cola se
+    llena la etapa anterior espera, por lo que la memoria queda acotada por 'queue_size' lotes
+    y no por el total de productos. Los marcadores de páginas sin cambios sólo se acumulan
+    (no se preprocesan) y se arrastran al final.
+
+    Si la etapa de preprocesamiento muere, los lotes que siguen entregando los scrapers se
+    descartan en lugar de bloquearlos sobre la cola llena. Al terminar se espera a cada etapa
+    como máximo 'join_timeout' segundos.
+
+    Al terminar se guardan las huellas de cambio de 'change_trackers' de los sitios cuyos
+    lotes quedaron todos en la BD; las de los sitios con algún lote fallido se invalidan.
+
+    Returns:
+        tuple: (productos modificados procesados, hechos escritos).
+    """
+    raw_queue = queue.Queue(maxsize=queue_size)
+    ingest_queue = queue.Queue(maxsize=queue_size)
+    archive = RawScrapeArchive() if SCRAPE_ARCHIVE_ENABLED else None
+    archive_parts = itertools.count()
+    fresh_keys = set()
+    unchanged_markers = {}
+    # Sitios con algún lote que no llegó a la BD (preprocesamiento o ingesta fallida).
+    failed_sites = set()
+    preprocess_failed = threading.Event()
+
+    def put_raw(batch):
+        # Sin etapa de preprocesamiento nadie vacía la cola: el lote se descarta.
+        while not preprocess_failed.is_set():
+            try:
+                raw_queue.put(batch, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def scrape_stage():
+        try:
+            scraper.execute_scrapers(batch_sink=put_raw, change_trackers=change_trackers)
+        except Exception as e:
+            logging.error(f"Error en la etapa de scraping del pipeline: {e}", exc_info=True)
+        finally:
+            put_raw(_END_OF_STREAM)
+
+    def preprocess_stage():
+        try:
+            # Conexión propia: la del orquestador la usa la etapa de ingesta en otro hilo.
+            with PostgresManager(DB_CONFIG) as cache_db_manager:
+                feature_cache = ProductFeatureCache(cache_db_manager)
+                for raw_batch in _coalesced_batches(raw_queue, batch_size):
+                    changed_products = []
+                    for product in raw_batch:
+                        key = (product['name'], product['site'])
+                        if product.get('unchanged'):
+                            unchanged_markers.setdefault(key, product)
+                        elif key not in fresh_keys:
+                            fresh_keys.add(key)
+                            changed_products.append(product)
+                    if not changed_products:
+                        continue
+                    if archive is not None:
+                        try:
+                            archive.write_run(changed_products, ingest_time, next(archive_parts))
+                        except (OSError, ValueError) as e:
+                            logging.error(f"No se pudo archivar un lote crudo: {e}")
+                    try:
+                        products_to_insert_db_list = _preprocess_products(changed_products, feature_cache)
+                    except Exception as e:
+                        logging.error(f"Error preprocesando un lote de {len(changed_products)} productos: {e}", exc_info=True)
+                        failed_sites.update(p['site'] for p in changed_products)
+                        continue
+                    failed_sites.update(_sites_without_records(changed_products, products_to_insert_db_list))
+                    if products_to_insert_db_list:
+                        ingest_queue.put(products_to_insert_db_list)
+                _log_feature_cache_stats(feature_cache)
+        except Exception as e:
+            logging.error(f"Error en la etapa de preprocesamiento del pipeline: {e}", exc_info=True)
+            preprocess_failed.set()
+        finally:
+            ingest_queue.put(_END_OF_STREAM)
+
+    stages = [threading.Thread(target=scrape_stage, name="pipeline-scrape", daemon=True),
+              threading.Thread(target=preprocess_stage, name="pipeline-preprocess", daemon=True)]
+    for stage in stages:
+        stage.start()
+
+    facts_written = 0
+    start = time.perf_counter()
+    while True:
+        products_to_insert_db_list = ingest_queue.get()
+        if products_to_insert_db_list is _END_OF_STREAM:
+            break
+        try:
+            batch_facts = _ingest_products(db_manager, products_to_insert_db_list, ingest_time)
+        except Exception as e:
+            logging.error(f"Error ingiriendo un lote de {len(products_to_insert_db_list)} productos: {e}", exc_info=True)
+            batch_facts = 0
+        if not batch_facts:
+            failed_sites.update(p['site'] for p in products_to_insert_db_list)
+            continue
+        if batch_facts and not facts_written:
+            logging.info(f"Primer lote en BD a los {time.perf_counter() - start:.1f}s de iniciado el pipeline.")
+        facts_written += batch_facts
+    for stage in stages:
+        stage.join(timeout=join_timeout)
+        if stage.is_alive():
+            logging.error(f"La etapa {stage.name} del pipeline sigue activa después de {join_timeout}s. "
+                          f"Se continúa sin esperarla.")
+
+    # Un producto visto como modificado en otro lote (p. ej. otro fragmento de Kalea) conserva el precio nuevo.
+    unchanged_pairs = set(unchanged_markers) - fresh_keys
+    if archive is not None and unchanged_pairs:
+        try:
+            archive.write_run([unchanged_markers[key] for key in unchanged_pairs], ingest_time, next(archive_parts))
+        except (OSError, ValueError) as e:
+            logging.error(f"No se pudieron archivar los marcadores sin cambios: {e}")
+    _carry_forward_unchanged(db_manager, unchanged_pairs, ingest_time)
+    if preprocess_failed.is_set():
+        failed_sites.update(tracker.site_name for tracker in change_trackers)
+    _settle_change_trackers(db_manager, change_trackers, failed_sites)
+    logging.info(f"Pipeline finalizado en {time.perf_counter() - start:.1f}s: {len(fresh_keys)} productos "
+                 f"modificados, {facts_written} hechos escritos, {len(unchanged_pairs)} productos sin cambios.")
+    return len(fresh_keys), facts_written
+
+
+def _replay_run(db_manager, raw_products, scraped_at):
+    """
+    Preprocesa una ejecución archivada y reemplaza sus hechos en la BD (ver
+    PostgresManager.replace_run_facts), para que repetirla no los duplique.
+    """
+    unchanged_pairs = {(p['name'], p['site']) for p in raw_products if p.get('unchanged')}
+    changed_products = [p for p in raw_products if not p.get('unchanged')]
+    products_to_insert_db_list = []
+    if changed_products:
+        feature_cache = ProductFeatureCache(db_manager)
+        products_to_insert_db_list = _preprocess_products(changed_products, feature_cache)
+        _log_feature_cache_stats(feature_cache)
+    if not products_to_insert_db_list and not unchanged_pairs:
+        logging.warning(f"La ejecución del {scraped_at:%Y-%m-%d %H:%M:%S} no produjo registros. Se conservan sus hechos.")
+        return
+    counts = db_manager.replace_run_facts(products_to_insert_db_list, unchanged_pairs, scraped_at,
+                                          {p['site'] for p in raw_products})
+    logging.info(f"Hechos reemplazados: {counts['facts_deleted']} borrados, {counts['facts_written']} escritos, "
+                 f"{counts['facts_carried']} arrastrados.")
+
+
+def replay_archived_runs(db_manager, start_date=None, end_date=None, sites=None, archive=None):
+    """
+    Repite el preprocesamiento y la ingesta de las ejecuciones guardadas en el archivo crudo
+    (ver scraper/raw_archive.py), en orden cronológico y con su marca de tiempo original,
+    sin acceder a la red. Los hechos que ya tenía cada ejecución se reemplazan. Devuelve el
+    número de ejecuciones repetidas.
+    """
+    archive = archive or RawScrapeArchive()
+    replayed = 0
+    for scraped_at, raw_products in archive.iter_runs(start_date, end_date, sites):
+        logging.info(f"--- Repitiendo ejecución archivada del {scraped_at:%Y-%m-%d %H:%M:%S} ({len(raw_products)} productos) ---")
+        _replay_run(db_manager, raw_products, scraped_at)
+        replayed += 1
+    logging.info(f"Ejecuciones archivadas repetidas: {replayed}.")
+    return replayed
+
+
 def execute_orchestrator(db_manager=None, run_scrapers_flag=True, 
-                         run_preprocessing_flag=True):
+                         run_preprocessing_flag=True, replay_from_archive=False,
+                         replay_start=None, replay_end=None, replay_sites=None):
     """
     Orquesta el proceso completo de scraping, preprocesamiento y análisis.
+
+    Con ORCHESTRATOR_PIPELINE_MODE = 'streaming' (y ambas fases habilitadas) las fases corren
+    en paralelo por lotes (ver _run_streaming_pipeline).
+
+    Con 'replay_from_archive' no se ejecutan los scrapers: se repiten el preprocesamiento y
+    la ingesta de las ejecuciones archivadas entre 'replay_start' y 'replay_end' (fechas,
+    inclusive) para los sitios 'replay_sites' (todos si es None).
     """
     setup_logging(log_level=logging.INFO)
     
@@ -44,40 +334,70 @@ def execute_orchestrator(db_manager=None, run_scrapers_flag=True,
         logging.critical("Abortando orquestador debido a fallo de conexión a la BD.")
         return 
 
+    if replay_from_archive:
+        logging.info("--- Modo de repetición desde el archivo crudo (sin scraping) ---")
+        replay_archived_runs(db_manager, replay_start, replay_end, replay_sites)
+        db_manager.close_connection()
+        logging.info("Orquestador finalizado.")
+        return
+
+    if run_scrapers_flag and run_preprocessing_flag and ORCHESTRATOR_PIPELINE_MODE == 'streaming':
+        logging.info("--- Iniciando pipeline de streaming (scraping -> preprocesamiento -> ingesta) ---")
+        _run_streaming_pipeline(db_manager, datetime.now(), change_trackers=[])
+        db_manager.close_connection()
+        logging.info("Orquestador finalizado.")
+        return
+
     all_scraped_data_for_preprocessing = []
+    # Sus huellas se guardan sólo si los hechos de su sitio quedan en BD (ver _settle_change_trackers).
+    change_trackers = []
 
     if run_scrapers_flag:
         logging.info("--- Iniciando Fase de Scraping ---")
-        all_scraped_data_for_preprocessing = scraper.execute_scrapers()
+        all_scraped_data_for_preprocessing = scraper.execute_scrapers(change_trackers=change_trackers)
+        ingest_time = datetime.now()
         
         if all_scraped_data_for_preprocessing:
             logging.info(f"Scraping completado. Total productos crudos obtenidos: {len(all_scraped_data_for_preprocessing)}")
+            if SCRAPE_ARCHIVE_ENABLED:
+                try:
+                    RawScrapeArchive().write_run(all_scraped_data_for_preprocessing, ingest_time)
+                except (OSError, ValueError) as e:
+                    logging.error(f"No se pudo guardar el archivo crudo de la ejecución: {e}")
         else:
             logging.info("No se obtuvieron datos de los scrapers.")
     else:
         logging.info("Fase de Scraping omitida por configuración.")
 
 
-    df_preprocessed_for_db = pd.DataFrame()
     if run_preprocessing_flag and all_scraped_data_for_preprocessing:
-        logging.info(f"--- Iniciando Fase de Preprocesamiento para {len(all_scraped_data_for_preprocessing)} productos ---")
-        preprocessor = ProductDataPreprocessor(lang='spanish')
-        preprocessor.load_data(all_scraped_data_for_preprocessing)
-        df_preprocessed_for_db = preprocessor.preprocess_data()
-        
-        if not df_preprocessed_for_db.empty:
-            logging.info("Preprocesamiento completado.")
-
-            products_to_insert_db_list = df_preprocessed_for_db.to_dict('records')
-            inserted_count = db_manager.insert_preprocessed_products_batch(products_to_insert_db_list,datetime.now())
-            logging.info(f"Se intentó insertar {len(products_to_insert_db_list)} productos preprocesados en BD, insertados exitosamente: {inserted_count}")
-        else:
-            logging.warning("DataFrame preprocesado está vacío después del preprocesamiento. No se insertará en BD.")
+        try:
+            _, failed_sites = _preprocess_and_ingest(db_manager, all_scraped_data_for_preprocessing, ingest_time)
+        except Exception as e:
+            logging.error(f"Error en la fase de preprocesamiento e ingesta: {e}", exc_info=True)
+            failed_sites = {tracker.site_name for tracker in change_trackers}
+        _settle_change_trackers(db_manager, change_trackers, failed_sites)
     elif not run_preprocessing_flag:
+        # Las huellas de esta ejecución no tienen hechos en BD que arrastrar: no se guardan.
         logging.info("Fase de Preprocesamiento omitida por configuración.")
     else:
          logging.info("No hay datos crudos para preprocesar.")
+         _settle_change_trackers(db_manager, change_trackers, set())
 
     db_manager.close_connection()
 
-    logging.info("Orquestador finalizado.")
\ No newline at end of file
+    logging.info("Orquestador finalizado.")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Ejecuta el orquestador una vez (o repite ejecuciones archivadas).")
+    parser.add_argument('--replay', action='store_true',
+                        help="Repetir preprocesamiento e ingesta desde el archivo crudo, sin scraping.")
+    parser.add_argument('--start', type=date.fromisoformat, help="Primera fecha a repetir (AAAA-MM-DD).")
+    parser.add_argument('--end', type=date.fromisoformat, help="Última fecha a repetir (AAAA-MM-DD).")
+    parser.add_argument('--site', action='append', dest='sites', help="Sitio a repetir (repetible).")
+    args = parser.parse_args()
+
+    with PostgresManager(DB_CONFIG) as db_manager:
+        execute_orchestrator(db_manager=db_manager, replay_from_archive=args.replay,
+                             replay_start=args.start, replay_end=args.end, replay_sites=args.sites)
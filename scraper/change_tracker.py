@@ -0,0 +1,135 @@
+import hashlib
+import json
+import logging
+import threading
+from config import DB_CONFIG, SCRAPER_CHANGE_DETECTION
+from database_manager import PostgresManager
+
+logger = logging.getLogger(__name__)
+
+# Campos de cada producto crudo que se guardan con la huella de su página.
+ITEM_PAYLOAD_KEYS = ('name', 'price', 'currency', 'url')
+
+
+class PageChangeTracker:
+    """
+    Detección de cambios por página (o respuesta de API) respaldada por la tabla
+    'scrape_page_fingerprints'.
+
+    Para cada página se guarda el hash del contenido crudo (antes de parsear), los
+    validadores HTTP (ETag / Last-Modified) si el servidor los envía y los productos
+    crudos que produjo. Si en la ejecución siguiente la página no cambió, se omite el
+    parseo y se devuelven esos productos marcados con 'unchanged': True; el orquestador
+    los resuelve copiando el último precio guardado de cada producto, sin volver a
+    preprocesarlos, y el archivo crudo los guarda completos.
+
+    Es seguro usarlo desde varios hilos (p. ej. los fragmentos de Kalea). Sin conexión
+    a la base de datos todas las páginas se consideran modificadas.
+    """
+    def __init__(self, site_name, db_config=DB_CONFIG, enabled=SCRAPER_CHANGE_DETECTION):
+        self.site_name = site_name
+        self.db_config = db_config
+        self.enabled = enabled
+        self.changed_pages = 0
+        self.unchanged_pages = 0
+        # True si el scraper del sitio terminó con error (ver scraper._tracking_changes).
+        self.scrape_failed = False
+        self._previous = {}
+        self._updates = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Lee las huellas guardadas del sitio. Devuelve self."""
+        if not self.enabled:
+            return self
+        with PostgresManager(self.db_config) as db_manager:
+            if not db_manager.conn:
+                logger.warning(f"Sin conexión a la BD: detección de cambios deshabilitada para {self.site_name}.")
+                self.enabled = False
+                return self
+            self._previous = db_manager.get_page_fingerprints(self.site_name)
+        logger.info(f"Huellas de cambio cargadas para {self.site_name}: {len(self._previous)} páginas.")
+        return self
+
+    @staticmethod
+    def content_hash(content):
+        """Hash estable (SHA-256) de un contenido serializable a JSON."""
+        serialized = json.dumps(content, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str)
+        return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+    def conditional_headers(self, page_key):
+        """Cabeceras If-None-Match / If-Modified-Since para una petición condicional de la página."""
+        previous = self._previous.get(page_key) if self.enabled else None
+        headers = {}
+        if previous and previous.get('etag'):
+            headers['If-None-Match'] = previous['etag']
+        if previous and previous.get('last_modified'):
+            headers['If-Modified-Since'] = previous['last_modified']
+        return headers
+
+    def previous_item_count(self, page_key):
+        previous = self._previous.get(page_key)
+        return len(previous['item_names']) if previous else 0
+
+    def track(self, page_key, content, parse, etag=None, last_modified=None):
+        """
+        Si el contenido crudo de la página coincide con el de la ejecución anterior devuelve
+        los marcadores de productos sin cambios; si no, llama a 'parse()' y registra la nueva huella.
+        """
+        if not self.enabled:
+            return parse()
+        content_hash = self.content_hash(content)
+        previous = self._previous.get(page_key)
+        if previous and previous['content_hash'] == content_hash:
+            return self.carry_forward(page_key, etag, last_modified)
+
+        items = parse()
+        with self._lock:
+            self.changed_pages += 1
+            self._updates[page_key] = {
+                'etag': etag,
+                'last_modified': last_modified,
+                'content_hash': content_hash,
+                'item_names': [item['name'] for item in items],
+                'items': [self._item_payload(item) for item in items],
+                'changed': True,
+            }
+        return items
+
+    @staticmethod
+    def _item_payload(item):
+        payload = {key: item.get(key) for key in ITEM_PAYLOAD_KEYS}
+        if payload['price'] is not None:
+            payload['price'] = float(payload['price'])
+        return payload
+
+    def carry_forward(self, page_key, etag=None, last_modified=None):
+        """Marca la página como sin cambios y devuelve los marcadores de sus productos."""
+        previous = self._previous[page_key]
+        with self._lock:
+            self.unchanged_pages += 1
+            self._updates[page_key] = {
+                **previous,
+                'etag': etag or previous.get('etag'),
+                'last_modified': last_modified or previous.get('last_modified'),
+                'changed': False,
+            }
+        logger.debug(f"{self.site_name}: página sin cambios, se omite el parseo ({page_key}).")
+        if previous.get('items'):
+            return [{**item, 'site': self.site_name, 'unchanged': True} for item in previous['items']]
+        # Huellas guardadas antes de conservar los productos crudos: sólo se conocen los nombres.
+        return [{'name': name, 'site': self.site_name, 'url': page_key, 'unchanged': True}
+                for name in previous['item_names']]
+
+    def flush(self):
+        """
+        Guarda las huellas de las páginas revisadas en esta ejecución. Se llama sólo después
+        de confirmar en la BD los hechos del sitio, para no arrastrar precios que no se guardaron.
+        """
+        if not self.enabled or not self._updates:
+            return 0
+        with PostgresManager(self.db_config) as db_manager:
+            written = db_manager.upsert_page_fingerprints(self.site_name, self._updates)
+        logger.info(f"{self.site_name}: {self.changed_pages} páginas modificadas, "
+                    f"{self.unchanged_pages} sin cambios (parseo omitido).")
+        return written
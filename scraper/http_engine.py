@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Limitador de tasa tipo token bucket para corrutinas.
+    Permite ráfagas de hasta 'capacity' peticiones y un promedio de 'rate' peticiones por segundo.
+    """
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    async def acquire(self):
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+
+class AsyncHttpFetcher:
+    """
+    Cliente HTTP asíncrono sobre una única requests.Session con pool de conexiones keep-alive.
+
+    Las peticiones bloqueantes se ejecutan en un pool de hilos del tamaño del límite de
+    concurrencia; un semáforo acota las peticiones en curso y un token bucket reemplaza
+    las pausas fijas entre peticiones. Los errores 5xx, timeouts y errores de conexión se
+    reintentan con backoff exponencial con jitter completo.
+
+    Debe usarse como context manager asíncrono dentro de un event loop.
+    """
+    RETRYABLE_EXCEPTIONS = (requests.exceptions.Timeout, requests.exceptions.ConnectionError)
+
+    def __init__(self, headers=None, max_concurrency=8, rate_per_second=5.0, burst=None,
+                 max_retries=3, backoff_base=0.5, backoff_max=8.0, timeout=15):
+        self.headers = headers or {}
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.requests_sent = 0
+        self.retries = 0
+        self._session = None
+        self._executor = None
+        self._semaphore = None
+        self._bucket = None
+
+    async def __aenter__(self):
+        self._session = requests.Session()
+        self._session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="http")
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._bucket = TokenBucket(self.rate_per_second, self.burst)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self._executor.shutdown(wait=True)
+        self._session.close()
+
+    def _backoff_delay(self, attempt):
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def fetch_json(self, url):
+        """
+        Descarga y decodifica la respuesta JSON de 'url'.
+        Devuelve None si la petición falla tras agotar los reintentos o si el cuerpo no es JSON.
+        """
+        _, _, payload = await self.fetch(url)
+        return payload
+
+    async def fetch(self, url, headers=None):
+        """
+        Como fetch_json, pero admite cabeceras adicionales (p. ej. If-None-Match) y devuelve
+        (status, cabeceras de la respuesta, JSON). Una respuesta 304 devuelve (304, cabeceras, None);
+        un fallo devuelve (None, {}, None).
+        """
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.max_retries + 1):
+            async with self._semaphore:
+                await self._bucket.acquire()
+                self.requests_sent += 1
+                try:
+                    response = await loop.run_in_executor(
+                        self._executor, lambda: self._session.get(url, headers=headers, timeout=self.timeout)
+                    )
+                except self.RETRYABLE_EXCEPTIONS as e:
+                    error = f"{type(e).__name__}: {e}"
+                else:
+                    if response.status_code == 304:
+                        return 304, response.headers, None
+                    if response.status_code < 500:
+                        try:
+                            response.raise_for_status()
+                            return response.status_code, response.headers, response.json()
+                        except requests.exceptions.HTTPError as e:
+                            logger.error(f"Error HTTP en {url}: {e}")
+                            return None, {}, None
+                        except ValueError as e:
+                            logger.error(f"Error decodificando JSON en {url}: {e}. Respuesta: {response.text[:200]}...")
+                            return None, {}, None
+                    error = f"HTTP {response.status_code}"
+
+            if attempt < self.max_retries:
+                delay = self._backoff_delay(attempt)
+                self.retries += 1
+                logger.warning(f"{error} en {url}. Reintento {attempt + 1}/{self.max_retries} en {delay:.2f}s.")
+                await asyncio.sleep(delay)
+            else:
+                logger.error(f"{error} en {url}. Se agotaron los {self.max_retries} reintentos.")
+        return None, {}, None
@@ -0,0 +1,164 @@
+import base64
+import json
+import logging
+import re
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Cabeceras de la petición original que no deben reenviarse al repetirla fuera del navegador.
+SKIPPED_REPLAY_HEADERS = {'content-length', 'host', 'connection', 'accept-encoding', 'cookie'}
+
+
+class NetworkCapture:
+    """
+    Recolecta por Chrome DevTools Protocol las respuestas JSON (XHR/fetch) de la página.
+
+    Lee los eventos 'Network.*' del registro 'performance' del driver, por lo que éste debe
+    iniciarse con WebDriverManager(capture_network=True). El cuerpo de cada respuesta se
+    obtiene con 'Network.getResponseBody' una vez que terminó de cargarse.
+
+    Args:
+        url_pattern (str, optional): Expresión regular que deben cumplir las URL capturadas.
+    """
+    def __init__(self, driver, url_pattern=None):
+        self.driver = driver
+        self.url_pattern = re.compile(url_pattern) if url_pattern else None
+        self._requests = {}
+        self._responses = {}
+        self._finished = set()
+        self._collected = set()
+
+    def start(self):
+        """Habilita el dominio Network y descarta los eventos anteriores."""
+        self.driver.execute_cdp_cmd('Network.enable', {})
+        self.driver.get_log('performance')
+        return self
+
+    def _drain_events(self):
+        for entry in self.driver.get_log('performance'):
+            try:
+                message = json.loads(entry['message'])['message']
+            except (KeyError, TypeError, ValueError):
+                continue
+            method = message.get('method')
+            params = message.get('params', {})
+            request_id = params.get('requestId')
+            if method == 'Network.requestWillBeSent':
+                request = params.get('request', {})
+                self._requests[request_id] = {
+                    'method': request.get('method', 'GET'),
+                    'headers': request.get('headers', {}),
+                    'post_data': request.get('postData'),
+                }
+            elif method == 'Network.responseReceived':
+                response = params.get('response', {})
+                url = response.get('url', '')
+                if 'json' not in (response.get('mimeType') or ''):
+                    continue
+                if self.url_pattern is not None and not self.url_pattern.search(url):
+                    continue
+                self._responses[request_id] = {'url': url, 'status': response.get('status')}
+            elif method == 'Network.loadingFinished':
+                self._finished.add(request_id)
+
+    def collect(self):
+        """
+        Devuelve las respuestas JSON completas aún no recolectadas, en orden de llegada, como
+        diccionarios con 'url', 'status', 'method', 'headers', 'post_data' y 'payload'.
+        """
+        self._drain_events()
+        captured = []
+        for request_id, response in self._responses.items():
+            if request_id in self._collected or request_id not in self._finished:
+                continue
+            self._collected.add(request_id)
+            try:
+                body = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+            except Exception as e:
+                logger.debug(f"No se pudo obtener el cuerpo de {response['url']}: {e}")
+                continue
+            text = body.get('body', '')
+            if body.get('base64Encoded'):
+                text = base64.b64decode(text).decode('utf-8', errors='replace')
+            try:
+                payload = json.loads(text)
+            except ValueError:
+                logger.debug(f"Respuesta no JSON en {response['url']}. Se ignora.")
+                continue
+            request = self._requests.get(request_id, {'method': 'GET', 'headers': {}, 'post_data': None})
+            captured.append({**request, **response, 'payload': payload})
+        logger.info(f"Respuestas JSON capturadas: {len(captured)}.")
+        return captured
+
+
+class CapturedRequestReplayer:
+    """
+    Repite por HTTP, sin renderizar, una petición capturada cambiando su número de página.
+
+    El parámetro de página se busca entre 'page_params' en la query string de la URL y,
+    para peticiones con cuerpo JSON, en las claves de primer nivel del cuerpo. Si no se
+    encuentra, 'paginated' es False y la petición no puede repetirse para otras páginas.
+    """
+    def __init__(self, captured, page_params, cookies=None, timeout=15):
+        self.captured = captured
+        self.timeout = timeout
+        self.location, self.param, self.current_page = self._find_page_param(captured, page_params)
+        self.session = requests.Session()
+        self.session.headers.update({
+            name: value for name, value in captured.get('headers', {}).items()
+            if not name.startswith(':') and name.lower() not in SKIPPED_REPLAY_HEADERS
+        })
+        for cookie in cookies or []:
+            self.session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain'), path=cookie.get('path', '/'))
+
+    @property
+    def paginated(self):
+        return self.location is not None
+
+    @staticmethod
+    def _find_page_param(captured, page_params):
+        query = dict(parse_qsl(urlparse(captured['url']).query))
+        for param in page_params:
+            if str(query.get(param, '')).isdigit():
+                return 'query', param, int(query[param])
+        try:
+            body = json.loads(captured.get('post_data') or 'null')
+        except ValueError:
+            body = None
+        if isinstance(body, dict):
+            for param in page_params:
+                if isinstance(body.get(param), int):
+                    return 'json', param, body[param]
+        return None, None, None
+
+    def fetch(self, page):
+        """Descarga la página 'page'. Devuelve el JSON decodificado o None si falla."""
+        url = self.captured['url']
+        data = self.captured.get('post_data')
+        if self.location == 'query':
+            parts = urlparse(url)
+            query = dict(parse_qsl(parts.query))
+            query[self.param] = str(page)
+            url = urlunparse(parts._replace(query=urlencode(query)))
+        elif self.location == 'json':
+            body = json.loads(data)
+            body[self.param] = page
+            data = json.dumps(body)
+        try:
+            response = self.session.request(self.captured.get('method', 'GET'), url, data=data, timeout=self.timeout)
+            response.raise_for_status()
+            return response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.warning(f"No se pudo repetir la petición de la página {page} ({url}): {e}")
+            return None
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,125 @@
+import logging
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from config import SCRAPE_ARCHIVE_DIR, SCRAPE_ARCHIVE_COMPRESSION
+
+logger = logging.getLogger(__name__)
+
+# Esquema fijo de los productos crudos. 'site' y 'date' son las columnas de partición
+# (directorios site=<sitio>/date=<AAAA-MM-DD>) y no se guardan dentro de los archivos.
+RAW_ITEM_SCHEMA = pa.schema([
+    pa.field('scraped_at', pa.timestamp('us')),
+    pa.field('name', pa.string()),
+    pa.field('price', pa.float64()),
+    pa.field('currency', pa.string()),
+    pa.field('url', pa.string()),
+    pa.field('unchanged', pa.bool_()),
+    pa.field('site', pa.string()),
+    pa.field('date', pa.date32()),
+])
+PARTITIONING = ds.partitioning(pa.schema([RAW_ITEM_SCHEMA.field('site'), RAW_ITEM_SCHEMA.field('date')]),
+                               flavor='hive')
+ITEM_KEYS = ('name', 'price', 'currency', 'site', 'url')
+
+
+class RawScrapeArchive:
+    """
+    Archivo en Parquet comprimido de los productos crudos devueltos por los scrapers.
+
+    Cada ejecución escribe archivos 'run-<marca de tiempo>-<parte>-<n>.parquet' por sitio y
+    fecha bajo 'base_dir' (una parte por lote si la ejecución se archiva por lotes). Los
+    productos de páginas sin cambios (ver PageChangeTracker) se guardan completos, con
+    'unchanged' = True, de modo que al repetir una ejecución se vuelven a preprocesar. Los
+    marcadores sin precio de archivos anteriores se repiten como marcadores y se arrastran.
+
+    Args:
+        base_dir (str): Directorio raíz del archivo.
+        compression (str): Códec de Parquet ('zstd', 'snappy', 'gzip', ...).
+    """
+    def __init__(self, base_dir=SCRAPE_ARCHIVE_DIR, compression=SCRAPE_ARCHIVE_COMPRESSION):
+        self.base_dir = base_dir
+        self.compression = compression
+
+    @staticmethod
+    def _to_table(items, scraped_at):
+        columns = {key: [item.get(key) for item in items] for key in ITEM_KEYS}
+        columns['price'] = [None if price is None else float(price) for price in columns['price']]
+        columns['unchanged'] = [bool(item.get('unchanged')) for item in items]
+        columns['scraped_at'] = [scraped_at] * len(items)
+        columns['date'] = [scraped_at.date()] * len(items)
+        return pa.Table.from_pydict(columns, schema=RAW_ITEM_SCHEMA)
+
+    def write_run(self, items, scraped_at, part=0):
+        """
+        Guarda los productos crudos de una ejecución con la marca de tiempo 'scraped_at'. Los
+        lotes de una misma ejecución se guardan con 'part' distintos. Devuelve las filas escritas.
+        """
+        if not items:
+            return 0
+        table = self._to_table(items, scraped_at)
+        ds.write_dataset(
+            table, self.base_dir, format='parquet', partitioning=PARTITIONING,
+            basename_template=f"run-{scraped_at:%Y%m%dT%H%M%S%f}-{part:05d}-{{i}}.parquet",
+            existing_data_behavior='overwrite_or_ignore',
+            file_options=ds.ParquetFileFormat().make_write_options(compression=self.compression),
+        )
+        logger.info(f"Archivo crudo: {table.num_rows} productos guardados en {self.base_dir} "
+                    f"({scraped_at:%Y-%m-%d %H:%M:%S}).")
+        return table.num_rows
+
+    def _dataset(self):
+        return ds.dataset(self.base_dir, format='parquet', partitioning=PARTITIONING, schema=RAW_ITEM_SCHEMA)
+
+    def _filter(self, start_date=None, end_date=None, sites=None):
+        conditions = []
+        if start_date is not None:
+            conditions.append(ds.field('date') >= pa.scalar(start_date, pa.date32()))
+        if end_date is not None:
+            conditions.append(ds.field('date') <= pa.scalar(end_date, pa.date32()))
+        if sites:
+            conditions.append(ds.field('site').isin(list(sites)))
+        expression = None
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+        return expression
+
+    def iter_runs(self, start_date=None, end_date=None, sites=None):
+        """
+        Recorre las ejecuciones archivadas en orden cronológico, opcionalmente acotadas por
+        fecha (inclusive) y sitio. Produce tuplas (scraped_at, items) con los productos en el
+        mismo formato que devuelven los scrapers.
+
+        Se lee una partición de fecha a la vez (cada ejecución cae entera en la fecha de su
+        'scraped_at'), de modo que la memoria queda acotada por el día más grande y no por el
+        rango completo.
+        """
+        try:
+            dataset = self._dataset()
+        except (FileNotFoundError, pa.ArrowInvalid) as e:
+            logger.warning(f"No hay archivo de scraping legible en {self.base_dir}: {e}")
+            return
+        expression = self._filter(start_date, end_date, sites)
+        dates = sorted({ds.get_partition_keys(fragment.partition_expression)['date']
+                        for fragment in dataset.get_fragments(filter=expression)})
+        if not dates:
+            logger.info("No hay ejecuciones archivadas para los filtros indicados.")
+            return
+
+        for day in dates:
+            day_filter = ds.field('date') == pa.scalar(day, pa.date32())
+            table = dataset.to_table(filter=day_filter if expression is None else expression & day_filter)
+            # Orden estable: dentro de cada ejecución se conserva el orden de lectura.
+            table = table.take(pc.sort_indices(table, sort_keys=[('scraped_at', 'ascending')]))
+            offset = 0
+            for run in pc.value_counts(table['scraped_at']).to_pylist():
+                run_rows = table.slice(offset, run['counts'])
+                offset += run['counts']
+                yield run['values'], [self._to_item(row) for row in run_rows.to_pylist()]
+
+    @staticmethod
+    def _to_item(row):
+        if row['unchanged'] and row['price'] is None:
+            return {'name': row['name'], 'site': row['site'], 'url': row['url'], 'unchanged': True}
+        return {key: row[key] for key in ITEM_KEYS}
+
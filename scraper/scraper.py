@@ -2,46 +2,177 @@ import time
 import logging
 import os
 import csv
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from datetime import datetime
 from .webdriver_manager import WebDriverManager
+from .webdriver_pool import get_shared_pool
+from .change_tracker import PageChangeTracker
 from .scrapers import KromiScraper, KaleaMarketScraper, TuzonaMarketScraper
 
-from config import URL_KROMI_VIVERES, URL_KALEA_MARKET_CAT
+from config import (URL_KROMI_VIVERES, URL_KALEA_MARKET_CAT, SCRAPERS_CONCURRENT, SCRAPER_CAPTURE_MODE,
+                    KALEA_CRAWL_MODE)
 
-def execute_scrapers():
+# (nombre para logs, clase del scraper, URL). Sin URL el scraper no usa WebDriver.
+SCRAPER_JOBS = [
+    ("Kromi Market (Víveres)", KromiScraper, URL_KROMI_VIVERES),
+    ("Kalea Market", KaleaMarketScraper, URL_KALEA_MARKET_CAT),
+    ("Tu zona Market", TuzonaMarketScraper, None),
+]
+
+def execute_scrapers(concurrent=SCRAPERS_CONCURRENT, batch_sink=None, change_trackers=None):
+    """
+    Ejecuta los scrapers de todos los sitios.
+
+    Args:
+        concurrent (bool): Si es True cada sitio corre en su propio hilo con su propio
+                           WebDriver del pool (Tu zona Market sin WebDriver), y el tiempo total se
+                           acerca al del sitio más lento. Si es False se ejecutan uno tras
+                           otro compartiendo un único WebDriver.
+        batch_sink (callable, optional): Recibe los productos por lotes a medida que cada
+                           scraper los obtiene (ver BaseScraper.emit_batch). En ese caso
+                           se devuelve una lista vacía. Puede llamarse desde varios hilos.
+        change_trackers (list, optional): Recibe el PageChangeTracker de cada sitio. El llamador
+                           guarda sus huellas (flush) sólo después de confirmar en la BD los
+                           hechos del sitio; sin lista las huellas no se guardan.
+    """
+    if concurrent:
+        return _execute_scrapers_concurrent(batch_sink, change_trackers)
+    return _execute_scrapers_sequential(batch_sink, change_trackers)
+
+@contextmanager
+def _borrow_driver():
+    """
+    Presta un driver del pool compartido (ver WebDriverPool) o, si el pool está
+    deshabilitado, abre un WebDriver propio que se cierra al salir. Produce None si
+    no hay driver disponible. Las páginas que el scraper informa con
+    BaseScraper._page_loaded se descuentan del préstamo al devolver el driver.
+    """
+    capture_network = SCRAPER_CAPTURE_MODE == 'network'
+    pool = get_shared_pool(capture_network=capture_network)
+    if pool is None:
+        with WebDriverManager(capture_network=capture_network) as driver:
+            yield driver
+        return
+    with pool.driver() as driver:
+        yield driver
+
+@contextmanager
+def _tracking_changes(scraper, batch_sink=None, change_trackers=None):
+    """
+    Asigna al scraper un PageChangeTracker (y el sink de lotes, si lo hay) y lo agrega a
+    'change_trackers' para que el orquestador guarde sus huellas una vez confirmados los
+    hechos del sitio. Si el scraper falla el tracker queda marcado con 'scrape_failed'.
+    """
+    scraper.batch_sink = batch_sink
+    try:
+        scraper.change_tracker = PageChangeTracker(scraper.site_name).load()
+    except Exception as e:
+        logging.error(f"No se pudieron cargar las huellas de cambio de {scraper.site_name}: {e}")
+        scraper.change_tracker = None
+    if scraper.change_tracker is not None and change_trackers is not None:
+        change_trackers.append(scraper.change_tracker)
+    try:
+        yield scraper
+    except BaseException:
+        if scraper.change_tracker is not None:
+            scraper.change_tracker.scrape_failed = True
+        raise
+
+def _run_scraper_job(label, scraper_class, url, batch_sink=None, change_trackers=None):
+    """
+    Ejecuta un scraper en el hilo actual, tomando prestado un WebDriver si lo necesita.
+    Con 'batch_sink' los productos se entregan por lotes y se devuelve una lista vacía.
+    """
+    logging.info(f"--- Iniciando Scraper para {label} ---")
+    with _tracking_changes(scraper_class(), batch_sink, change_trackers) as scraper:
+        site_data = _scrape_site(label, scraper, url)
+        # Los scrapers que no entregan por lotes (p. ej. Kromi) lo hacen al terminar.
+        if scraper.emit_batch(site_data):
+            return []
+        return site_data
+
+def _scrape_site(label, scraper, url):
+    if url is None:
+        return scraper.scrape()
+    if isinstance(scraper, KaleaMarketScraper) and KALEA_CRAWL_MODE == 'sharded':
+        return scraper.scrape_sharded(url, _borrow_driver)
+
+    with _borrow_driver() as driver:
+        if not driver:
+            logging.critical(f"No se pudo iniciar el WebDriver para {label}. Se omite el sitio.")
+            return []
+        return scraper.scrape(driver, url)
+
+def _execute_scrapers_concurrent(batch_sink=None, change_trackers=None):
+    """
+    Lanza un hilo por sitio y une los resultados a medida que terminan. Un error en un
+    sitio se registra y no afecta a los demás.
+    """
+    all_scraped_data = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(SCRAPER_JOBS), thread_name_prefix="scraper") as executor:
+        futures = {
+            executor.submit(_run_scraper_job, label, scraper_class, url, batch_sink, change_trackers): (label, time.perf_counter())
+            for label, scraper_class, url in SCRAPER_JOBS
+        }
+        for future in as_completed(futures):
+            label, job_start = futures[future]
+            try:
+                site_data = future.result()
+            except Exception as e:
+                logging.error(f"Error al ejecutar el scraper de {label}: {e}", exc_info=True)
+                continue
+            elapsed = time.perf_counter() - job_start
+            if batch_sink is not None:
+                logging.info(f"Scraper de {label} finalizado en {elapsed:.1f}s.")
+            elif site_data:
+                logging.info(f"Datos de {label} obtenidos: {len(site_data)} productos en {elapsed:.1f}s.")
+                all_scraped_data.extend(site_data)
+            else:
+                logging.info(f"No se obtuvieron datos de {label} ({elapsed:.1f}s).")
+
+    logging.info(f"Proceso de scraping concurrente finalizado en {time.perf_counter() - start:.1f}s.")
+    return all_scraped_data
+
+def _execute_scrapers_sequential(batch_sink=None, change_trackers=None):
     """ Ejecuta los scrapers para Kromi Market y Kalea Market.
     """
-    manager = WebDriverManager()
     all_scraped_data = []
-    with manager as driver:
+    with _borrow_driver() as driver:
         if driver:
             logging.info("--- Iniciando Scraper para Kromi Market (Víveres) ---")
-            scraper_kromi = KromiScraper()
-            datos_kromi = scraper_kromi.scrape(driver, URL_KROMI_VIVERES)
+            with _tracking_changes(KromiScraper(), batch_sink, change_trackers) as scraper_kromi:
+                datos_kromi = scraper_kromi.scrape(driver, URL_KROMI_VIVERES)
             if datos_kromi:
                 logging.info(f"Datos de Kromi Market obtenidos: {len(datos_kromi)} productos.")
                 
-                all_scraped_data.extend(datos_kromi)
+                if not scraper_kromi.emit_batch(datos_kromi):
+                    all_scraped_data.extend(datos_kromi)
             else:
                 logging.info("No se obtuvieron datos de Kromi Market")
             logging.info("--- Iniciando Scraper para Kalea Market ---")
             try:
-                scraper_kalea = KaleaMarketScraper()
-                datos_kalea = scraper_kalea.scrape(driver, URL_KALEA_MARKET_CAT)
+                with _tracking_changes(KaleaMarketScraper(), batch_sink, change_trackers) as scraper_kalea:
+                    datos_kalea = scraper_kalea.scrape(driver, URL_KALEA_MARKET_CAT)
                 if datos_kalea:
                     logging.info(f"Datos de Kalea Market obtenidos: {len(datos_kalea)} productos.")
-                    all_scraped_data.extend(datos_kalea)
+                    if not scraper_kalea.emit_batch(datos_kalea):
+                        all_scraped_data.extend(datos_kalea)
                 else:
                     logging.info("No se obtuvieron datos de Kalea Market")
             except Exception as e:
                 logging.error(f"Error al ejecutar el scraper de Kalea Market: {e}")
 
             logging.info("--- Iniciando Scraper para Tu zona Market ---")
-            scraper_tuzonamarket = TuzonaMarketScraper()
-            datos_tuzonamarket = scraper_tuzonamarket.scrape()
+            with _tracking_changes(TuzonaMarketScraper(), batch_sink, change_trackers) as scraper_tuzonamarket:
+                datos_tuzonamarket = scraper_tuzonamarket.scrape()
             if datos_tuzonamarket:
                 logging.info(f"Datos de tuzonamarket Market obtenidos: {len(datos_tuzonamarket)} productos.")
-                all_scraped_data.extend(datos_tuzonamarket)
+                if not scraper_tuzonamarket.emit_batch(datos_tuzonamarket):
+                    all_scraped_data.extend(datos_tuzonamarket)
+            elif scraper_tuzonamarket.items_emitted:
+                logging.info(f"Datos de Tu zona Market entregados por lotes: {scraper_tuzonamarket.items_emitted} productos.")
             else:
                 logging.info("No se obtuvieron datos de Tu zona Market")
         else:
@@ -2,11 +2,73 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
+import re
 import time
+import logging
+from ..network_capture import NetworkCapture, CapturedRequestReplayer
+from ..webdriver_pool import record_page_load
+from config import SCRAPER_NETWORK_MAX_REPLAY_PAGES
+
+logger = logging.getLogger(__name__)
 
 class BaseScraper:
+    # Modo de captura de red (ver scrape_via_network). Las subclases ajustan estos valores.
+    NETWORK_URL_PATTERN = None
+    NETWORK_NAME_KEYS = ('nombre', 'name', 'title', 'descripcion')
+    NETWORK_PRICE_KEYS = ('precio', 'price', 'pvp')
+    NETWORK_PAGE_PARAMS = ('page', 'pag', 'pagina', 'p')
+    NETWORK_CURRENCY = "USD"
+
+    # Salta al final de la página y espera dentro del navegador (MutationObserver) a que
+    # aumente el número de elementos o desaparezca el indicador de carga. Sólo se observan las
+    # altas/bajas de nodos en el contenedor de productos (no atributos), para que carruseles y
+    # animaciones del resto de la página no reinicien la espera. Resuelve con
+    # {count, initial, timed_out} en una única llamada a WebDriver.
+    SCROLL_AND_WAIT_SCRIPT = """
+        var itemSelector = arguments[0], loaderSelector = arguments[1], sentinelSelector = arguments[2];
+        var timeoutMs = arguments[3], settleMs = arguments[4], idleMs = arguments[5];
+        var containerSelector = arguments[6];
+        var done = arguments[arguments.length - 1];
+        var countItems = function () { return document.querySelectorAll(itemSelector).length; };
+        var loaderVisible = function () {
+            if (!loaderSelector) return false;
+            var loader = document.querySelector(loaderSelector);
+            return !!loader && loader.getClientRects().length > 0 && getComputedStyle(loader).visibility !== 'hidden';
+        };
+        var initial = countItems(), finished = false, quietTimer = null, observer = null, deadline = null;
+        function finish(timedOut) {
+            if (finished) return;
+            finished = true;
+            if (observer) observer.disconnect();
+            clearTimeout(quietTimer);
+            clearTimeout(deadline);
+            done({count: countItems(), initial: initial, timed_out: timedOut});
+        }
+        function scheduleCheck() {
+            clearTimeout(quietTimer);
+            quietTimer = setTimeout(function () {
+                if (loaderVisible()) scheduleCheck(); else finish(false);
+            }, countItems() > initial ? settleMs : idleMs);
+        }
+        var firstItem = document.querySelector(itemSelector);
+        var container = (containerSelector && document.querySelector(containerSelector))
+            || (firstItem && firstItem.parentElement) || document.body;
+        observer = new MutationObserver(scheduleCheck);
+        observer.observe(container, {childList: true, subtree: true});
+        deadline = setTimeout(function () { finish(true); }, timeoutMs);
+        var sentinel = sentinelSelector ? document.querySelector(sentinelSelector) : null;
+        if (sentinel) sentinel.scrollIntoView({block: 'end'});
+        window.scrollTo(0, document.body.scrollHeight);
+        scheduleCheck();
+    """
+
     def __init__(self, site_name):
         self.site_name = site_name
+        # PageChangeTracker opcional que asigna el ejecutor de scrapers (ver _track_page).
+        self.change_tracker = None
+        # Callable opcional que recibe lotes de productos a medida que se obtienen (ver emit_batch).
+        self.batch_sink = None
+        self.items_emitted = 0
         print(f"Scraper para '{self.site_name}' inicializado.")
 
     def scrape(self, driver, url):
@@ -41,6 +103,34 @@ class BaseScraper:
                 print(f"No se pudo hacer clic: Elemento {by}='{value}' no habilitado en {self.site_name}.")
             return False
         
+    def _page_loaded(self, driver, url=None):
+        """
+        Informa al pool de WebDriver una navegación a 'url' o un paso de carga (scroll,
+        "Cargar más") para que recicle la sesión según las páginas realmente cargadas.
+        """
+        record_page_load(driver, url)
+
+    def _track_page(self, page_key, content, parse, etag=None, last_modified=None):
+        """
+        Parsea una página con 'parse()' salvo que el tracker de cambios indique que su contenido
+        crudo no cambió; en ese caso devuelve marcadores {'unchanged': True} de sus productos.
+        """
+        if self.change_tracker is None:
+            return parse()
+        return self.change_tracker.track(page_key, content, parse, etag=etag, last_modified=last_modified)
+
+    def emit_batch(self, items):
+        """
+        Entrega un lote de productos al 'batch_sink' (el pipeline del orquestador) en cuanto
+        se obtiene. Devuelve False si no hay sink: el llamador debe conservar los productos.
+        """
+        if self.batch_sink is None:
+            return False
+        if items:
+            self.items_emitted += len(items)
+            self.batch_sink(items)
+        return True
+
     def scroll_down(self,driver):
         """A method for scrolling the page."""
 
@@ -48,6 +138,7 @@ class BaseScraper:
 
         while True:
             driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+            self._page_loaded(driver)
 
             time.sleep(2)
             new_height = driver.execute_script("return document.body.scrollHeight")
@@ -67,4 +158,140 @@ class BaseScraper:
             totalScrolledHeight = driver.execute_script("return window.pageYOffset + window.innerHeight")
             height = driver.execute_script("return document.body.scrollHeight")
 
-            
\ No newline at end of file
+    def scroll_to_bottom_and_wait(self, driver, item_selector, loader_selector=None, sentinel_selector=None,
+                                  timeout=15, settle=0.75, idle=2.0, container_selector=None):
+        """
+        Salta directamente al final de la página y espera dentro del navegador a que se carguen más elementos.
+
+        La espera termina cuando el DOM deja de cambiar durante 'settle' segundos después de que creció
+        el número de elementos, o durante 'idle' segundos si no creció, siempre que el indicador de
+        carga no esté visible; o al cumplirse 'timeout'.
+
+        Args:
+            item_selector (str): Selector CSS de los elementos a contar.
+            loader_selector (str, optional): Selector CSS del indicador de carga.
+            sentinel_selector (str, optional): Selector CSS del elemento al final de la lista.
+            container_selector (str, optional): Selector CSS del contenedor de los elementos a
+                                                observar. Por defecto, el padre del primer elemento.
+
+        El script timeout de la sesión se restaura al terminar (el driver puede ser de un pool).
+
+        Returns:
+            dict: {'count': elementos al terminar, 'initial': elementos antes del salto, 'timed_out': bool}
+        """
+        previous_script_timeout = driver.timeouts.script
+        driver.set_script_timeout(timeout + 5)
+        self._page_loaded(driver)
+        try:
+            return driver.execute_async_script(self.SCROLL_AND_WAIT_SCRIPT, item_selector, loader_selector,
+                                               sentinel_selector, int(timeout * 1000), int(settle * 1000),
+                                               int(idle * 1000), container_selector)
+        finally:
+            driver.set_script_timeout(previous_script_timeout)
+
+    def scrape_via_network(self, driver, url, navigate=None, trigger=None):
+        """
+        Obtiene los productos de las respuestas JSON que la página descarga en segundo plano
+        en lugar de leerlos del DOM renderizado.
+
+        Habilita la captura CDP, navega a 'url' (o ejecuta 'navigate(driver, url)'), ejecuta
+        'trigger(driver)' para provocar la petición de la página siguiente y extrae los
+        productos de las respuestas. Las páginas siguientes a la última respuesta con productos
+        se descargan directamente por HTTP hasta una página sin productos nuevos.
+
+        Requiere un driver iniciado con WebDriverManager(capture_network=True).
+        Devuelve una lista vacía si no se puede asegurar un catálogo completo (sin productos
+        capturados, petición sin parámetro de página reconocible, una descarga fallida o el
+        tope SCRAPER_NETWORK_MAX_REPLAY_PAGES), para que el llamador recurra al DOM.
+        """
+        capture = NetworkCapture(driver, self.NETWORK_URL_PATTERN).start()
+        if navigate is not None:
+            if not navigate(driver, url):
+                return []
+        else:
+            driver.get(url)
+            self._page_loaded(driver, url)
+        if trigger is not None:
+            trigger(driver)
+
+        scraped_data = []
+        seen_names = set()
+        last_paginated = None
+        for response in capture.collect():
+            new_items = self._collect_network_items(response['payload'], response['url'], seen_names, scraped_data)
+            if new_items and response.get('status', 200) < 400:
+                last_paginated = response
+
+        if last_paginated is None or not self._replay_network_pages(driver, last_paginated, seen_names, scraped_data):
+            logger.warning(f"Captura de red en {self.site_name} incompleta ({len(scraped_data)} productos). Se descarta.")
+            return []
+
+        logger.info(f"Captura de red en {self.site_name}: {len(scraped_data)} productos.")
+        return scraped_data
+
+    def _replay_network_pages(self, driver, captured, seen_names, scraped_data):
+        """
+        Descarga por HTTP las páginas siguientes a 'captured' hasta que una no aporte productos
+        nuevos. Devuelve True sólo si se llegó a ese final; False si la petición no es paginable,
+        si una descarga falla o si se alcanzó SCRAPER_NETWORK_MAX_REPLAY_PAGES.
+        """
+        with CapturedRequestReplayer(captured, self.NETWORK_PAGE_PARAMS, cookies=driver.get_cookies()) as replayer:
+            if not replayer.paginated:
+                logger.info(f"La petición {captured['url']} no tiene parámetro de página. No se repite por HTTP.")
+                return False
+            last_page = replayer.current_page + SCRAPER_NETWORK_MAX_REPLAY_PAGES
+            for page in range(replayer.current_page + 1, last_page + 1):
+                payload = replayer.fetch(page)
+                if payload is None:
+                    logger.warning(f"Falló la descarga por HTTP de la página {page} ({self.site_name}).")
+                    return False
+                if not self._collect_network_items(payload, captured['url'], seen_names, scraped_data):
+                    logger.info(f"Fin de la paginación por HTTP en la página {page} ({self.site_name}).")
+                    return True
+            logger.warning(f"Se alcanzó el tope de {SCRAPER_NETWORK_MAX_REPLAY_PAGES} páginas por HTTP ({self.site_name}).")
+            return False
+
+    def _collect_network_items(self, payload, source_url, seen_names, scraped_data):
+        """Agrega a 'scraped_data' los productos nuevos de 'payload'. Devuelve cuántos agregó."""
+        added = 0
+        for record in self.find_product_records(payload):
+            item = self.parse_network_record(record, source_url)
+            if item and item['name'] not in seen_names:
+                seen_names.add(item['name'])
+                scraped_data.append(item)
+                added += 1
+        return added
+
+    def find_product_records(self, payload):
+        """Recorre el JSON y devuelve los objetos que tienen una clave de nombre y una de precio."""
+        records = []
+        pending = [payload]
+        while pending:
+            node = pending.pop()
+            if isinstance(node, dict):
+                if any(key in node for key in self.NETWORK_NAME_KEYS) and any(key in node for key in self.NETWORK_PRICE_KEYS):
+                    records.append(node)
+                pending.extend(reversed(list(node.values())))
+            elif isinstance(node, list):
+                pending.extend(reversed(node))
+        return records
+
+    def parse_network_record(self, record, source_url):
+        """
+        Convierte un objeto JSON de producto en el diccionario de producto.
+        Devuelve None si el nombre o el precio no son válidos. Las subclases pueden
+        sobrescribirlo para payloads con estructuras de precio propias.
+        """
+        name = next((record[key] for key in self.NETWORK_NAME_KEYS if isinstance(record.get(key), str)), None)
+        raw_price = next((record[key] for key in self.NETWORK_PRICE_KEYS if key in record), None)
+        if isinstance(raw_price, str) and re.fullmatch(r"\d+(\.\d+)?", raw_price.strip()):
+            raw_price = float(raw_price)
+        if not name or isinstance(raw_price, bool) or not isinstance(raw_price, (int, float)):
+            return None
+        return {
+            "name": name.strip(),
+            "price": float(raw_price),
+            "currency": self.NETWORK_CURRENCY,
+            "site": self.site_name,
+            "url": source_url,
+        }
@@ -1,20 +1,93 @@
 import re
 import logging
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, ElementClickInterceptedException, StaleElementReferenceException
 
 from .base import BaseScraper
+from config import (KALEA_EXTRACTION_MODE, SCRAPER_CAPTURE_MODE, KALEA_SHARD_WORKERS, KALEA_SHARD_RETRIES,
+                    KALEA_CATEGORIES)
 
 logger = logging.getLogger(__name__)
 
-class KaleaMarketScraper(BaseScraper):
 
+def _xpath_literal(text):
+    """Literal XPath 1.0 para 'text', aunque contenga comillas simples y dobles."""
+    if "'" not in text:
+        return f"'{text}'"
+    if '"' not in text:
+        return f'"{text}"'
+    return "concat(" + ", \"'\", ".join(f"'{part}'" for part in text.split("'")) + ")"
+
+
+class KaleaMarketScraper(BaseScraper):
+    VER_TODO_XPATH = "//div[@class='category']/p/strong[normalize-space()='Ver todo']"
+    # Nombres de las entradas visibles del menú de categorías, sin "Ver todo".
+    CATEGORY_ENTRIES_SCRIPT = """
+        return Array.from(document.querySelectorAll('div.category > p')).filter(function (p) {
+            return p.getClientRects().length > 0 && !p.querySelector('strong');
+        }).map(function (p) { return p.textContent.replace(/\\s+/g, ' ').trim(); });
+    """
+
+
+    # Texto de un p.price sin ninguno de los importes tachados (<del>). La colección de
+    # getElementsByTagName es viva: se quita siempre el primero hasta vaciarla.
+    TEXT_WITHOUT_DEL_FUNCTION = """
+        function textWithoutDel(el) {
+            var clone = el.cloneNode(true);
+            var discounted = clone.getElementsByTagName('del');
+            while (discounted.length) discounted[0].parentNode.removeChild(discounted[0]);
+            return clone.textContent.trim();
+        }
+    """
+    PRICE_TEXT_SCRIPT = TEXT_WITHOUT_DEL_FUNCTION + "return textWithoutDel(arguments[0]);"
+
+    # Replica en el navegador la selección de la extracción por elemento: el contenedor de precio
+    # USD visible (sin ancestros 'hide'), el texto de su p.price sin los <del> de precios tachados.
+    BULK_EXTRACTION_SCRIPT = TEXT_WITHOUT_DEL_FUNCTION + """
+        function hasHiddenAncestor(el) {
+            for (var node = el.parentElement; node; node = node.parentElement) {
+                if (node.tagName === 'DIV' && (node.getAttribute('class') || '').indexOf('hide') >= 0) return true;
+            }
+            return false;
+        }
+        return Array.from(document.getElementsByClassName('global-product-card')).map(function (card) {
+            var nameEl = card.querySelector('h5.name');
+            if (!nameEl) return {name: null};
+            var result = {name: nameEl.innerText, price_text: null};
+            var candidates = Array.from(card.getElementsByTagName('div')).filter(function (div) {
+                return (div.getAttribute('class') || '').indexOf('price-container') >= 0 && !hasHiddenAncestor(div);
+            });
+            var priceEl = null;
+            if (candidates.length > 1) {
+                for (var i = 0; i < candidates.length && !priceEl; i++) {
+                    var p = candidates[i].querySelector('p.price');
+                    if (p && p.innerText.indexOf('$') >= 0) priceEl = p;
+                }
+                if (!priceEl) {
+                    priceEl = candidates[1].querySelector('p.price');
+                    if (!priceEl) { result.missing_price_element = true; return result; }
+                }
+            } else if (candidates.length === 1) {
+                priceEl = candidates[0].querySelector('p.price');
+            } else {
+                priceEl = Array.from(card.getElementsByTagName('p')).find(function (p) {
+                    return p.getAttribute('class') === 'price' && !hasHiddenAncestor(p) && p.textContent.indexOf('$') >= 0;
+                }) || null;
+                if (!priceEl) result.no_usd_price = true;
+            }
+            if (priceEl) result.price_text = textWithoutDel(priceEl);
+            return result;
+        });
+    """
 
     def __init__(self):
         super().__init__("Kalea Market")
+        # Sub-categorías que quedaron sin rastrear en el último scrape_sharded.
+        self.skipped_shards = []
     
 
     def _click_load_more_button(self, driver, timeout=10):
@@ -32,6 +105,7 @@ class KaleaMarketScraper(BaseScraper):
             time.sleep(0.5)
 
             load_more_button.click()
+            self._page_loaded(driver)
             logger.info("Botón 'Cargar más' clickeado.")
             return True
         except TimeoutException:
@@ -48,6 +122,7 @@ class KaleaMarketScraper(BaseScraper):
                 driver.execute_script("arguments[0].scrollIntoView(true);", load_more_button)
                 time.sleep(0.5)
                 load_more_button.click()
+                self._page_loaded(driver)
                 logger.info("Botón 'Cargar más' clickeado en el segundo intento.")
                 return True
             except Exception as e:
@@ -57,12 +132,13 @@ class KaleaMarketScraper(BaseScraper):
             logger.error(f"Error inesperado al intentar clickear 'Cargar más': {e}")
             return False
 
-    def _navigate_to_products_page(self, driver, base_url):
+    def _select_store(self, driver, base_url):
         """
-        Realiza los pasos de navegación para seleccionar tienda y categoría.
-        Devuelve True si la navegación fue exitosa, False en caso contrario.
+        Abre 'base_url' y selecciona la primera tienda de la lista.
+        Devuelve True si la selección fue exitosa, False en caso contrario.
         """
         driver.get(base_url)
+        self._page_loaded(driver, base_url)
         logger.info(f"Navegando a la página de selección de tienda/inicio: {base_url}")
 
 
@@ -111,11 +187,14 @@ class KaleaMarketScraper(BaseScraper):
                 return False
             time.sleep(3)
             logger.info(f"URL actual después de seleccionar tienda: {driver.current_url}")
+            return True
 
         except Exception as e:
             logger.error(f"Error durante la selección de tienda: {e}")
             return False
 
+    def _open_category_menu(self, driver):
+        """Abre el menú lateral de categorías. Devuelve True si quedó visible."""
         try:
             logger.info("Intentando abrir el menú de categorías...")
             menu_icon_selector = (By.CSS_SELECTOR, "img.menu[alt='menu']")
@@ -124,7 +203,42 @@ class KaleaMarketScraper(BaseScraper):
                 return False
             logger.info("Menú de categorías abierto.")
             WebDriverWait(driver, 10).until(
-                EC.visibility_of_element_located((By.XPATH, "//div[@class='category']/p[normalize-space()='despensa']"))
+                EC.visibility_of_element_located((By.CSS_SELECTOR, "div.category > p"))
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Error al abrir el menú de categorías: {e}")
+            return False
+
+    def _click_menu_entry(self, driver, entry_xpath, label):
+        """Hace scroll hasta una entrada del menú de categorías y la selecciona."""
+        entry_element = self._wait_for_element(driver, By.XPATH, entry_xpath)
+        if entry_element:
+             driver.execute_script("arguments[0].scrollIntoView(true);", entry_element)
+             time.sleep(0.3)
+        if not self._click_element(driver, By.XPATH, entry_xpath):
+            logger.error(f"No se pudo hacer clic en '{label}'.")
+            return False
+        logger.info(f"Entrada de menú '{label}' seleccionada.")
+        return True
+
+    @staticmethod
+    def _category_xpath(name):
+        return f"//div[@class='category']/p[normalize-space()={_xpath_literal(name)}]"
+
+    def _navigate_to_products_page(self, driver, base_url):
+        """
+        Realiza los pasos de navegación para seleccionar tienda y categoría.
+        Devuelve True si la navegación fue exitosa, False en caso contrario.
+        """
+        if not self._select_store(driver, base_url):
+            return False
+
+        if not self._open_category_menu(driver):
+            return False
+        try:
+            WebDriverWait(driver, 10).until(
+                EC.visibility_of_element_located((By.XPATH, self._category_xpath('despensa')))
             )
         except Exception as e:
             logger.error(f"Error al abrir el menú de categorías: {e}")
@@ -132,17 +246,10 @@ class KaleaMarketScraper(BaseScraper):
             
         try:
             logger.info("Intentando seleccionar la categoría 'despensa'...")
-            despensa_selector_xpath = "//div[@class='category']/p[normalize-space()='despensa']"
-            despensa_element = self._wait_for_element(driver, By.XPATH, despensa_selector_xpath)
-            if despensa_element:
-                 driver.execute_script("arguments[0].scrollIntoView(true);", despensa_element)
-                 time.sleep(0.3)
-            if not self._click_element(driver, By.XPATH, despensa_selector_xpath):
-                logger.error("No se pudo hacer clic en 'despensa'.")
+            if not self._click_menu_entry(driver, self._category_xpath('despensa'), 'despensa'):
                 return False
-            logger.info("Categoría 'despensa' seleccionada.")
             WebDriverWait(driver, 10).until(
-                EC.visibility_of_element_located((By.XPATH, "//div[@class='category']/p/strong[normalize-space()='Ver todo']"))
+                EC.visibility_of_element_located((By.XPATH, self.VER_TODO_XPATH))
             )
         except Exception as e:
             logger.error(f"Error al seleccionar 'despensa': {e}")
@@ -150,13 +257,7 @@ class KaleaMarketScraper(BaseScraper):
 
         try:
             logger.info("Intentando seleccionar 'Ver todo'...")
-            ver_todo_selector_xpath = "//div[@class='category']/p/strong[normalize-space()='Ver todo']"
-            ver_todo_element = self._wait_for_element(driver, By.XPATH, ver_todo_selector_xpath)
-            if ver_todo_element:
-                 driver.execute_script("arguments[0].scrollIntoView(true);", ver_todo_element)
-                 time.sleep(0.3)
-            if not self._click_element(driver, By.XPATH, ver_todo_selector_xpath):
-                logger.error("No se pudo hacer clic en 'Ver todo'.")
+            if not self._click_menu_entry(driver, self.VER_TODO_XPATH, 'Ver todo'):
                 return False
             logger.info("'Ver todo' seleccionado. Deberíamos estar en la página de productos.")
             WebDriverWait(driver, 20).until(
@@ -169,8 +270,21 @@ class KaleaMarketScraper(BaseScraper):
             logger.error(f"Error al seleccionar 'Ver todo': {e}")
             return False
 
-    def scrape(self, driver, url):
+    def scrape(self, driver, url, extraction_mode=KALEA_EXTRACTION_MODE, capture_mode=SCRAPER_CAPTURE_MODE):
+        """
+        Args:
+            extraction_mode (str): 'bulk' extrae todas las tarjetas con un único execute_script;
+                                   'element' consulta cada tarjeta por separado.
+            capture_mode (str): 'network' lee los productos de las respuestas JSON capturadas por CDP
+                                y recurre al DOM si no encuentra ninguno; 'dom' sólo usa el DOM.
+        """
         logger.info(f"Iniciando scraping para {self.site_name} en URL: {url}")
+        if capture_mode == 'network':
+            network_data = self.scrape_via_network(driver, url, navigate=self._navigate_to_products_page,
+                                                   trigger=self._click_load_more_button)
+            if network_data:
+                return network_data
+            logger.warning(f"La captura de red no devolvió un catálogo completo de {self.site_name}. Se usará el DOM.")
          
         if not self._navigate_to_products_page(driver, url):
             logger.error("Falló la navegación a la página de productos. Abortando scrape para Kalea.")
@@ -180,6 +294,202 @@ class KaleaMarketScraper(BaseScraper):
         
         category_product_url = driver.current_url 
 
+        if not self._load_all_products(driver, url):
+            return []
+
+        logger.info("Recolectando todos los productos después de los clics en 'Cargar más'...")
+        scraped_data, processed_product_names = self._extract_products(driver, category_product_url, extraction_mode)
+
+        logger.info(f"Scraping para {self.site_name} completado. Datos obtenidos: {len(scraped_data)} items de {len(processed_product_names)} nombres únicos.")
+        return scraped_data
+
+    def discover_category_shards(self, driver, url, categories=None):
+        """
+        Recorre una vez el árbol de categorías y devuelve cada sub-categoría como un fragmento
+        independiente: lista de {'category': 'categoría/sub-categoría', 'url': URL del listado}.
+        Una categoría sin sub-categorías produce un único fragmento con su 'Ver todo'.
+
+        Args:
+            categories (list, optional): Categorías de primer nivel a incluir (todas por defecto).
+        """
+        if not self._select_store(driver, url) or not self._open_category_menu(driver):
+            return []
+        top_level = driver.execute_script(self.CATEGORY_ENTRIES_SCRIPT) or []
+        if categories:
+            wanted = {c.strip().lower() for c in categories}
+            top_level = [c for c in top_level if c.lower() in wanted]
+        logger.info(f"Categorías de primer nivel en {self.site_name}: {top_level}")
+
+        shards, seen_urls = [], set()
+        menu_open = True
+        for top in top_level:
+            if not self._open_top_category(driver, top, menu_open):
+                menu_open = False
+                continue
+            sub_entries = [e for e in driver.execute_script(self.CATEGORY_ENTRIES_SCRIPT) or [] if e not in top_level]
+            targets = [(sub, self._category_xpath(sub)) for sub in sub_entries] or [('Ver todo', self.VER_TODO_XPATH)]
+            for i, (label, entry_xpath) in enumerate(targets):
+                if i > 0 and not self._open_top_category(driver, top, menu_open=False):
+                    break
+                shard_url = self._open_shard_listing(driver, entry_xpath, label)
+                if shard_url and shard_url not in seen_urls:
+                    seen_urls.add(shard_url)
+                    shards.append({'category': f"{top}/{label}", 'url': shard_url})
+            menu_open = False
+
+        logger.info(f"Se encontraron {len(shards)} sub-categorías para el rastreo por fragmentos en {self.site_name}.")
+        return shards
+
+    def _open_top_category(self, driver, top, menu_open):
+        """Abre (si hace falta) el menú y entra en la categoría de primer nivel 'top'."""
+        if not menu_open and not self._open_category_menu(driver):
+            return False
+        try:
+            if not self._click_menu_entry(driver, self._category_xpath(top), top):
+                return False
+            WebDriverWait(driver, 10).until(EC.visibility_of_element_located((By.XPATH, self.VER_TODO_XPATH)))
+            return True
+        except Exception as e:
+            logger.error(f"Error al seleccionar la categoría '{top}': {e}")
+            return False
+
+    def _open_shard_listing(self, driver, entry_xpath, label):
+        """Abre el listado de una entrada del menú y devuelve su URL, o None si no muestra productos."""
+        try:
+            if not self._click_menu_entry(driver, entry_xpath, label):
+                return None
+            WebDriverWait(driver, 20).until(
+                EC.presence_of_all_elements_located((By.CLASS_NAME, "global-product-card"))
+            )
+            return driver.current_url
+        except TimeoutException:
+            logger.warning(f"La entrada '{label}' no mostró productos. Se omite como fragmento.")
+            return None
+
+    def scrape_shard(self, driver, shard, extraction_mode=KALEA_EXTRACTION_MODE):
+        """
+        Rastrea un único fragmento: selecciona la tienda, abre directamente la URL de la
+        sub-categoría y extrae sus productos. El DOM queda acotado al tamaño de la sub-categoría.
+        Devuelve None si no se pudo seleccionar la tienda (el fragmento se puede reintentar).
+        """
+        logger.info(f"Rastreando fragmento '{shard['category']}' de {self.site_name}: {shard['url']}")
+        if not self._select_store(driver, shard['url']):
+            return None
+        if driver.current_url != shard['url']:
+            driver.get(shard['url'])
+            self._page_loaded(driver, shard['url'])
+        if not self._load_all_products(driver, shard['url']):
+            return []
+        scraped_data, _ = self._extract_products(driver, shard['url'], extraction_mode)
+        logger.info(f"Fragmento '{shard['category']}': {len(scraped_data)} productos.")
+        return scraped_data
+
+    def scrape_sharded(self, url, borrow_driver, max_workers=KALEA_SHARD_WORKERS, categories=KALEA_CATEGORIES,
+                       extraction_mode=KALEA_EXTRACTION_MODE, retries=KALEA_SHARD_RETRIES):
+        """
+        Rastrea Kalea por sub-categorías en paralelo, cada una con su propio driver.
+
+        Args:
+            borrow_driver: Callable sin argumentos que devuelve un context manager que produce
+                           un driver (o None), p. ej. un préstamo del WebDriverPool.
+            max_workers (int): Sub-categorías rastreadas a la vez.
+            categories (list, optional): Categorías de primer nivel a incluir (todas por defecto).
+            retries (int): Rondas extra para los fragmentos que fallaron o no obtuvieron driver.
+                           Cada ronda empieza cuando termina la anterior y los drivers quedan libres.
+
+        Si no se encuentran sub-categorías se recurre al rastreo de 'despensa' de scrape().
+        Los productos repetidos entre sub-categorías se conservan una sola vez, en el orden
+        de los fragmentos. Con 'batch_sink' cada fragmento se entrega en cuanto termina y se
+        devuelve una lista vacía. Los fragmentos que siguen fallando tras los reintentos se
+        informan en el log y quedan en 'self.skipped_shards'.
+        """
+        self.skipped_shards = []
+        with borrow_driver() as driver:
+            if not driver:
+                logger.critical(f"No se pudo obtener un WebDriver para enumerar las categorías de {self.site_name}.")
+                return []
+            shards = self.discover_category_shards(driver, url, categories)
+            if not shards:
+                logger.warning(f"No se pudieron enumerar sub-categorías de {self.site_name}. Se usa el rastreo único.")
+                return self.scrape(driver, url, extraction_mode=extraction_mode)
+
+        results = [[] for _ in shards]
+        pending = list(range(len(shards)))
+        for attempt in range(max(0, retries) + 1):
+            if attempt:
+                logger.warning(f"Reintentando {len(pending)} fragmentos de {self.site_name} "
+                               f"(ronda {attempt}/{retries}).")
+            pending = self._run_shard_round(borrow_driver, shards, pending, results, max_workers, extraction_mode)
+            if not pending:
+                break
+
+        self.skipped_shards = [shards[i]['category'] for i in pending]
+        if self.skipped_shards:
+            logger.error(f"{len(self.skipped_shards)} de {len(shards)} sub-categorías de {self.site_name} "
+                         f"quedaron sin rastrear: {', '.join(self.skipped_shards)}")
+
+        if self.batch_sink is not None:
+            logger.info(f"Rastreo por fragmentos de {self.site_name} completado: {self.items_emitted} productos "
+                        f"entregados en {len(shards) - len(pending)}/{len(shards)} sub-categorías.")
+            return []
+
+        # Un producto presente en un fragmento modificado y en otro sin cambios conserva el precio nuevo.
+        fresh_names = {item['name'] for shard_data in results for item in shard_data if not item.get('unchanged')}
+        scraped_data, seen_names = [], set()
+        for shard_data in results:
+            for item in shard_data:
+                if item.get('unchanged') and item['name'] in fresh_names:
+                    continue
+                if item['name'] not in seen_names:
+                    seen_names.add(item['name'])
+                    scraped_data.append(item)
+        logger.info(f"Rastreo por fragmentos de {self.site_name} completado: {len(scraped_data)} productos únicos "
+                    f"en {len(shards) - len(pending)}/{len(shards)} sub-categorías.")
+        return scraped_data
+
+    def _run_shard_round(self, borrow_driver, shards, indices, results, max_workers, extraction_mode):
+        """
+        Rastrea en paralelo los fragmentos 'indices' y guarda sus productos en 'results' (o los
+        entrega al sink). Devuelve los índices de los fragmentos que fallaron o no obtuvieron driver.
+        """
+        failed = []
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(indices))), thread_name_prefix="kalea-shard") as executor:
+            futures = {executor.submit(self._scrape_shard_task, borrow_driver, shards[i], extraction_mode): i
+                       for i in indices}
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    shard_data = future.result()
+                except Exception as e:
+                    logger.error(f"Error rastreando el fragmento '{shards[i]['category']}' de {self.site_name}: {e}", exc_info=True)
+                    failed.append(i)
+                    continue
+                if shard_data is None:
+                    failed.append(i)
+                    continue
+                # Con sink cada fragmento se entrega al terminar; el pipeline descarta los repetidos.
+                if not self.emit_batch(shard_data):
+                    results[i] = shard_data
+        return sorted(failed)
+
+    def _scrape_shard_task(self, borrow_driver, shard, extraction_mode):
+        """Rastrea un fragmento con un driver prestado. Devuelve None si no hubo driver o tienda."""
+        with borrow_driver() as driver:
+            if not driver:
+                logger.error(f"No se pudo obtener un WebDriver para el fragmento '{shard['category']}'.")
+                return None
+            return self.scrape_shard(driver, shard, extraction_mode)
+
+    def _extract_products(self, driver, category_product_url, extraction_mode):
+        if extraction_mode == 'bulk':
+            return self._extract_products_bulk(driver, category_product_url)
+        return self._extract_products_per_element(driver, category_product_url)
+
+    def _load_all_products(self, driver, url):
+        """
+        Espera los productos iniciales y hace clic en "Cargar más" hasta que no aparezcan nuevos.
+        Devuelve False si no se cargaron productos iniciales.
+        """
         initial_product_card_selector = (By.CLASS_NAME, "global-product-card")
         try:
             WebDriverWait(driver, 20).until(
@@ -188,10 +498,7 @@ class KaleaMarketScraper(BaseScraper):
             logger.info("Productos iniciales cargados en Kalea Market.")
         except TimeoutException:
             logger.warning(f"Timeout: No se encontraron productos iniciales en {url} para {self.site_name}")
-            return []
-
-        scraped_data = []
-        processed_product_names = set()
+            return False
 
         clicks_done = 0
         
@@ -227,15 +534,70 @@ class KaleaMarketScraper(BaseScraper):
                 break
             
             time.sleep(1)
+        return True
 
-        logger.info("Recolectando todos los productos después de los clics en 'Cargar más'...")
+    def _extract_products_bulk(self, driver, category_product_url):
+        """
+        Obtiene nombre y texto de precio USD de todas las tarjetas con un único execute_script
+        y aplica en Python la misma normalización que la extracción por elemento.
+        """
+        cards = driver.execute_script(self.BULK_EXTRACTION_SCRIPT) or []
+        if not cards:
+            logger.info(f"No se encontraron elementos de producto en {self.site_name} después de la carga.")
+            return [], set()
+
+        parsed_names = {}
+
+        def parse():
+            scraped_data, parsed_names['names'] = self._parse_bulk_cards(cards, category_product_url)
+            return scraped_data
+
+        scraped_data = self._track_page(category_product_url, cards, parse)
+        return scraped_data, parsed_names.get('names', {item['name'] for item in scraped_data})
+
+    def _parse_bulk_cards(self, cards, category_product_url):
+        """Convierte las tarjetas devueltas por BULK_EXTRACTION_SCRIPT en diccionarios de producto."""
+        logger.info(f"Procesando {len(cards)} productos en total de Kalea Market (extracción en bloque)...")
+        scraped_data = []
+        processed_product_names = set()
+        for i, card in enumerate(cards):
+            if card.get('name') is None:
+                logger.debug(f"KALEA: Elemento faltante para producto {i}. Omitido.")
+                continue
+            name = card['name'].strip()
+            if name in processed_product_names:
+                continue
+            processed_product_names.add(name)
+            if card.get('missing_price_element'):
+                logger.debug(f"KALEA: Elemento faltante para producto {i}. Omitido.")
+                continue
+
+            price_text = card.get('price_text')
+            if price_text is None:
+                if card.get('no_usd_price'):
+                    logger.warning(f"KALEA: No se pudo encontrar el elemento de precio USD para '{name}'.")
+                price_text = "Precio no encontrado"
+            else:
+                logger.debug(f"KALEA: Precio crudo extraído para '{name}': '{price_text}'")
+
+            numeric_price, currency = self._parse_price_text(name, price_text)
+            data_item = self._build_product_item(name, price_text, numeric_price, currency, category_product_url)
+            if data_item:
+                scraped_data.append(data_item)
+        return scraped_data, processed_product_names
+
+    def _extract_products_per_element(self, driver, category_product_url):
+        """Extrae los productos consultando cada tarjeta con find_element(s) y un execute_script por precio."""
+        initial_product_card_selector = (By.CLASS_NAME, "global-product-card")
         all_product_elements = driver.find_elements(*initial_product_card_selector)
         
         if not all_product_elements:
             logger.info(f"No se encontraron elementos de producto en {self.site_name} después de la carga.")
-            return []
+            return [], set()
 
         logger.info(f"Procesando {len(all_product_elements)} productos en total de Kalea Market...")
+        scraped_data = []
+        processed_product_names = set()
         
         for i, product_element in enumerate(all_product_elements):
             name = "Nombre no encontrado"
@@ -284,67 +646,13 @@ class KaleaMarketScraper(BaseScraper):
 
 
                 if p_price_element:
-                    price_text_raw = driver.execute_script("""
-                        var element = arguments[0];
-                        var clone = element.cloneNode(true);
-                        var discountedElements = clone.getElementsByTagName('del');
-                        for (var i = 0; i < discountedElements.length; i++) {
-                            discountedElements[i].parentNode.removeChild(discountedElements[i]);
-                        }
-                        return clone.textContent.trim();
-                    """, p_price_element)
+                    price_text_raw = driver.execute_script(self.PRICE_TEXT_SCRIPT, p_price_element)
                     logger.debug(f"KALEA: Precio crudo extraído para '{name}': '{price_text_raw}'")
                 else:
                     price_text_raw = "Precio no encontrado"
                 
                 price_text = price_text_raw
-
-
-                if price_text and price_text != "Precio no encontrado":
-
-                    match_currency = re.search(r"([$BsS/]+)", price_text)
-                    if match_currency:
-                        currency_symbol = match_currency.group(1).strip().replace('.', '')
-                        if currency_symbol == "$": currency = "USD"
-                        elif "Bs" in currency_symbol.upper(): currency = "VES"
-                        elif "S/" in currency_symbol: currency = "PEN"
-                        else: currency = currency_symbol.upper()
-                    
-                    price_str_for_conversion = re.sub(r'[^\d,.]', '', price_text)
-                    
-                    if currency == "USD":
-                        price_str_for_conversion = price_str_for_conversion.replace(',', '')
-                    elif currency == "VES":
-                        if '.' in price_str_for_conversion and ',' in price_str_for_conversion:
-                            if price_str_for_conversion.rfind(',') > price_str_for_conversion.rfind('.'):
-                                price_str_for_conversion = price_str_for_conversion.replace('.', '').replace(',', '.')
-                            else:
-                                price_str_for_conversion = price_str_for_conversion.replace(',', '')
-                        elif ',' in price_str_for_conversion:
-                             price_str_for_conversion = price_str_for_conversion.replace(',', '.')
-
-
-                    else: 
-                        if ',' in price_str_for_conversion and '.' in price_str_for_conversion:
-                            if price_str_for_conversion.rfind(',') > price_str_for_conversion.rfind('.'):
-                                price_str_for_conversion = price_str_for_conversion.replace('.', '').replace(',', '.')
-                            else:
-                                price_str_for_conversion = price_str_for_conversion.replace(',', '')
-                        elif ',' in price_str_for_conversion:
-                            if re.search(r',\d{1,2}$', price_str_for_conversion) and price_str_for_conversion.count(',') == 1 :
-                                 price_str_for_conversion = price_str_for_conversion.replace(',', '.')
-                            else: 
-                                 price_str_for_conversion = price_str_for_conversion.replace(',', '')
-                    
-                    try:
-                        numeric_price = float(price_str_for_conversion)
-                    except ValueError:
-                        logger.warning(f"KALEA: No se pudo convertir '{price_str_for_conversion}' (orig procesado: '{price_text}') a número para '{name}'")
-                        numeric_price = None
-                else:
-                    logger.debug(f"KALEA: Precio no encontrado o vacío para '{name}'.")
-                    numeric_price = None 
-
+                numeric_price, currency = self._parse_price_text(name, price_text)
 
             except NoSuchElementException: 
                 logger.debug(f"KALEA: Elemento faltante para producto {i}. Omitido.")
@@ -356,20 +664,79 @@ class KaleaMarketScraper(BaseScraper):
                 logger.error(f"KALEA: Error procesando producto {i} ({name}): {e}")
                 continue
 
-            if name != "Nombre no encontrado" and numeric_price is not None:
-                data_item = {
-                    "name": name,
-                    "price": numeric_price,
-                    "currency": currency,
-                    "site": self.site_name,
-                    "url": category_product_url 
-                }
+            data_item = self._build_product_item(name, price_text, numeric_price, currency, category_product_url)
+            if data_item:
                 scraped_data.append(data_item)
-            else:
-                if name == "Nombre no encontrado" and (price_text and price_text != "Precio no encontrado"):
-                    logger.warning(f"  - Producto Kalea omitido (nombre no encontrado). PrecioTexto='{price_text}'")
-                elif name != "Nombre no encontrado" and numeric_price is None and (price_text and price_text != "Precio no encontrado"):
-                     logger.warning(f"  - Producto Kalea omitido (precio no parseado): Nombre='{name}', PrecioTexto='{price_text}'")
 
-        logger.info(f"Scraping para {self.site_name} completado. Datos obtenidos: {len(scraped_data)} items de {len(processed_product_names)} nombres únicos.")
-        return scraped_data
\ No newline at end of file
+        return scraped_data, processed_product_names
+
+    def _parse_price_text(self, name, price_text):
+        """
+        Normaliza moneda y separadores decimales del texto de precio.
+        Devuelve (precio numérico o None, moneda).
+        """
+        numeric_price = None
+        currency = "Moneda no encontrada"
+
+        if price_text and price_text != "Precio no encontrado":
+
+            match_currency = re.search(r"([$BsS/]+)", price_text)
+            if match_currency:
+                currency_symbol = match_currency.group(1).strip().replace('.', '')
+                if currency_symbol == "$": currency = "USD"
+                elif "Bs" in currency_symbol.upper(): currency = "VES"
+                elif "S/" in currency_symbol: currency = "PEN"
+                else: currency = currency_symbol.upper()
+            
+            price_str_for_conversion = re.sub(r'[^\d,.]', '', price_text)
+            
+            if currency == "USD":
+                price_str_for_conversion = price_str_for_conversion.replace(',', '')
+            elif currency == "VES":
+                if '.' in price_str_for_conversion and ',' in price_str_for_conversion:
+                    if price_str_for_conversion.rfind(',') > price_str_for_conversion.rfind('.'):
+                        price_str_for_conversion = price_str_for_conversion.replace('.', '').replace(',', '.')
+                    else:
+                        price_str_for_conversion = price_str_for_conversion.replace(',', '')
+                elif ',' in price_str_for_conversion:
+                     price_str_for_conversion = price_str_for_conversion.replace(',', '.')
+
+
+            else: 
+                if ',' in price_str_for_conversion and '.' in price_str_for_conversion:
+                    if price_str_for_conversion.rfind(',') > price_str_for_conversion.rfind('.'):
+                        price_str_for_conversion = price_str_for_conversion.replace('.', '').replace(',', '.')
+                    else:
+                        price_str_for_conversion = price_str_for_conversion.replace(',', '')
+                elif ',' in price_str_for_conversion:
+                    if re.search(r',\d{1,2}$', price_str_for_conversion) and price_str_for_conversion.count(',') == 1 :
+                         price_str_for_conversion = price_str_for_conversion.replace(',', '.')
+                    else: 
+                         price_str_for_conversion = price_str_for_conversion.replace(',', '')
+            
+            try:
+                numeric_price = float(price_str_for_conversion)
+            except ValueError:
+                logger.warning(f"KALEA: No se pudo convertir '{price_str_for_conversion}' (orig procesado: '{price_text}') a número para '{name}'")
+                numeric_price = None
+        else:
+            logger.debug(f"KALEA: Precio no encontrado o vacío para '{name}'.")
+            numeric_price = None 
+
+        return numeric_price, currency
+
+    def _build_product_item(self, name, price_text, numeric_price, currency, category_product_url):
+        """Arma el diccionario de producto o registra por qué se omite. Devuelve None si se omite."""
+        if name != "Nombre no encontrado" and numeric_price is not None:
+            return {
+                "name": name,
+                "price": numeric_price,
+                "currency": currency,
+                "site": self.site_name,
+                "url": category_product_url 
+            }
+        if name == "Nombre no encontrado" and (price_text and price_text != "Precio no encontrado"):
+            logger.warning(f"  - Producto Kalea omitido (nombre no encontrado). PrecioTexto='{price_text}'")
+        elif name != "Nombre no encontrado" and numeric_price is None and (price_text and price_text != "Precio no encontrado"):
+             logger.warning(f"  - Producto Kalea omitido (precio no parseado): Nombre='{name}', PrecioTexto='{price_text}'")
+        return None
@@ -6,6 +6,7 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException
 import logging
 from .base import BaseScraper
+from config import KROMI_EXTRACTION_MODE, KROMI_SCROLL_MODE, SCRAPER_CAPTURE_MODE
 logger = logging.getLogger(__name__)
 
 class KromiScraper(BaseScraper):
@@ -43,6 +44,7 @@ class KromiScraper(BaseScraper):
             logger.debug(f"Scroll attempt #{scrolls_done + 1}. Productos antes de este scroll: {current_products_before_scroll}")
             
             self.scroll_slowly(driver)
+            self._page_loaded(driver)
             time.sleep(initial_load_pause) 
 
             patience_counter = 0
@@ -106,16 +108,83 @@ class KromiScraper(BaseScraper):
                 consecutive_no_new_global_products = 0
                 last_total_product_count = current_total_product_count
 
-    def scrape(self, driver, url):
+    def _scroll_until_catalogue_loaded(self, driver, timeout=15, settle=0.75, idle=2.0,
+                                       max_consecutive_no_new_products=2):
+        """
+        Carga el catálogo completo saltando al final de la página en cada paso y esperando
+        en el navegador (scroll_to_bottom_and_wait) en lugar de hacer scroll de a 20px con pausas fijas.
+        """
+        logger.info(f"Iniciando scroll por eventos en {self.site_name}...")
+        scrolls_done = 0
+        consecutive_no_new_products = 0
+        while True:
+            result = self.scroll_to_bottom_and_wait(driver, ".itemProductoPasilloContainer",
+                                                    loader_selector="#loadingMore img[src*='loading_cart.svg']",
+                                                    sentinel_selector="#loadingMore",
+                                                    timeout=timeout, settle=settle, idle=idle)
+            scrolls_done += 1
+            if result.get('timed_out'):
+                logger.warning(f"Scroll #{scrolls_done}: se agotó la espera de {timeout}s con el indicador de carga visible.")
+            logger.info(f"Scroll #{scrolls_done} completado. Total productos ahora: {result['count']}")
+
+            if result['count'] > result['initial']:
+                consecutive_no_new_products = 0
+                continue
+            consecutive_no_new_products += 1
+            logger.info(f"No se cargaron nuevos productos en este scroll. Strike {consecutive_no_new_products}/{max_consecutive_no_new_products}.")
+            if consecutive_no_new_products >= max_consecutive_no_new_products:
+                logger.info("No se cargaron más productos después de varios intentos. Asumiendo fin de página.")
+                break
+
+    def _trigger_next_page_request(self, driver):
+        """Provoca la carga de la página siguiente para que su petición quede capturada."""
+        self.scroll_to_bottom_and_wait(driver, ".itemProductoPasilloContainer",
+                                       loader_selector="#loadingMore img[src*='loading_cart.svg']",
+                                       sentinel_selector="#loadingMore")
+
+    # Extrae en una sola llamada los campos de todas las tarjetas de producto.
+    BULK_EXTRACTION_SCRIPT = """
+        return Array.from(document.getElementsByClassName('itemProductoPasilloContainer')).map(function (card) {
+            var anchor = card.querySelector('.product-name-carousel a');
+            var price = card.querySelector('.tag_precio_producto');
+            return {
+                name: anchor ? anchor.innerText : null,
+                href: anchor ? anchor.href : null,
+                price_text: price ? price.innerText : null
+            };
+        });
+    """
+
+    def scrape(self, driver, url, extraction_mode=KROMI_EXTRACTION_MODE, scroll_mode=KROMI_SCROLL_MODE,
+               capture_mode=SCRAPER_CAPTURE_MODE):
+        """
+        Args:
+            extraction_mode (str): 'bulk' obtiene nombre, enlace y precio de todas las tarjetas
+                                   con un único execute_script; 'element' consulta cada tarjeta
+                                   con find_element (varias llamadas a WebDriver por producto).
+            scroll_mode (str): 'event' salta al final y espera en el navegador a que lleguen productos;
+                               'slow' usa scroll_slowly con chequeos de estabilización por sondeo.
+            capture_mode (str): 'network' lee los productos de las respuestas JSON capturadas por CDP
+                                y recurre al DOM si no encuentra ninguno; 'dom' sólo usa el DOM.
+        """
         logger.info(f"Iniciando scraping para {self.site_name} en URL: {url}")
+        if capture_mode == 'network':
+            network_data = self.scrape_via_network(driver, url, trigger=self._trigger_next_page_request)
+            if network_data:
+                return network_data
+            logger.warning(f"La captura de red no devolvió un catálogo completo de {self.site_name}. Se usará el DOM.")
+
         driver.get(url)
-        scraped_data = []
+        self._page_loaded(driver, url)
 
-        self._scroll_and_wait_for_load_stabilization(driver, 
-                                                     initial_load_pause=1,
-                                                     stabilization_check_interval=0.75,
-                                                     stabilization_patience=4,
-                                                     loading_img_timeout=15,)  
+        if scroll_mode == 'event':
+            self._scroll_until_catalogue_loaded(driver, timeout=15)
+        else:
+            self._scroll_and_wait_for_load_stabilization(driver, 
+                                                         initial_load_pause=1,
+                                                         stabilization_check_interval=0.75,
+                                                         stabilization_patience=4,
+                                                         loading_img_timeout=15,)  
         
         product_container_selector = (By.CLASS_NAME, "itemProductoPasilloContainer")
         try:
@@ -127,18 +196,48 @@ class KromiScraper(BaseScraper):
             print(f"Timeout: No se encontraron contenedores de productos en {url} para {self.site_name}")
             return []
 
-        product_elements = driver.find_elements(*product_container_selector)
-        if not product_elements:
+        if extraction_mode == 'bulk':
+            raw_products = self._extract_raw_products_bulk(driver)
+        else:
+            raw_products = self._extract_raw_products_per_element(driver.find_elements(*product_container_selector))
+
+        if not raw_products:
             logger.warning(f"Timeout: No se encontraron contenedores de productos en {url} para {self.site_name}")
             return []
 
-        logger.info(f"Procesando {len(product_elements)} productos...")
+        logger.info(f"Procesando {len(raw_products)} productos...")
+        scraped_data = self._track_page(url, raw_products, lambda: self._build_product_items(raw_products))
+
+        logger.info(f"Scraping para {self.site_name} completado. Datos obtenidos: {len(scraped_data)} items.")
+        return scraped_data
+
+    def _build_product_items(self, raw_products):
+        scraped_data = []
+        for name, product_url, price_text in raw_products:
+            data_item = self._build_product_item(name, product_url, price_text)
+            if data_item:
+                scraped_data.append(data_item)
+        return scraped_data
+
+    def _extract_raw_products_bulk(self, driver):
+        """Devuelve una lista de (nombre, url, texto de precio) con una sola llamada a WebDriver."""
+        cards = driver.execute_script(self.BULK_EXTRACTION_SCRIPT) or []
+        raw_products = []
+        for card in cards:
+            name = card['name'].strip() if card.get('name') is not None else "Nombre no encontrado"
+            product_url = card.get('href') or "#"
+            price_text = card['price_text'].strip() if card.get('price_text') is not None else "Precio no encontrado"
+            if card.get('name') is None or card.get('price_text') is None:
+                logger.warning(f"Elemento faltante para un producto en {self.site_name}. Nombre parcial: {name}")
+            raw_products.append((name, product_url, price_text))
+        return raw_products
 
+    def _extract_raw_products_per_element(self, product_elements):
+        """Devuelve una lista de (nombre, url, texto de precio) consultando cada tarjeta por separado."""
+        raw_products = []
         for product_element in product_elements:
             name = "Nombre no encontrado"
             price_text = "Precio no encontrado"
-            numeric_price = None
-            currency = "Moneda no encontrada"
             product_url = "#"
 
             try:
@@ -148,46 +247,48 @@ class KromiScraper(BaseScraper):
 
                 price_element = product_element.find_element(By.CLASS_NAME, "tag_precio_producto")
                 price_text = price_element.text.strip()
-
-                if price_text and price_text != "Precio no encontrado":
-                    match_currency = re.match(r"([^\d\s.,]+)", price_text)
-                    if match_currency:
-                        currency_symbol = match_currency.group(1)
-                        if currency_symbol == "$":
-                            currency = "USD"
-                        else:
-                            currency = currency_symbol
-
-                    match_price = re.search(r"([\d,.]+)", price_text)
-                    if match_price:
-                        price_str_cleaned = match_price.group(1).replace(',', '')
-                        try:
-                            numeric_price = float(price_str_cleaned)
-                        except ValueError:
-                            logger.warning(f"No se pudo convertir '{price_str_cleaned}' a número para el producto '{name}'")
-                            numeric_price = None
-                    else:
-                        numeric_price = None
-
-
             except NoSuchElementException as e:
                 logger.warning(f"Elemento faltante para un producto en {self.site_name}: {e}. Nombre parcial: {name}")
             except Exception as e:
                 logger.error(f"Error procesando un producto en {self.site_name}: {e}. Nombre parcial: {name}")
 
-            if name != "Nombre no encontrado" and numeric_price is not None:
-                data_item = {
-                    "name": name,
-                    "price": numeric_price,
-                    "currency": currency,
-                    "site": self.site_name,
-                    "url": product_url
-                }
-                scraped_data.append(data_item)
-                logger.debug(f"  - Producto scrapeado: {name}: {currency} {numeric_price}")
-            else:
-                logger.info(f"  - Producto omitido (datos incompletos): Nombre='{name}', PrecioTexto='{price_text}'")
+            raw_products.append((name, product_url, price_text))
+        return raw_products
 
+    def _build_product_item(self, name, product_url, price_text):
+        """
+        Convierte los campos crudos de una tarjeta en el diccionario de producto.
+        Devuelve None si falta el nombre o el precio no es numérico.
+        """
+        numeric_price = None
+        currency = "Moneda no encontrada"
 
-        logger.info(f"Scraping para {self.site_name} completado. Datos obtenidos: {len(scraped_data)} items.")
-        return scraped_data
\ No newline at end of file
+        if price_text and price_text != "Precio no encontrado":
+            match_currency = re.match(r"([^\d\s.,]+)", price_text)
+            if match_currency:
+                currency_symbol = match_currency.group(1)
+                if currency_symbol == "$":
+                    currency = "USD"
+                else:
+                    currency = currency_symbol
+
+            match_price = re.search(r"([\d,.]+)", price_text)
+            if match_price:
+                price_str_cleaned = match_price.group(1).replace(',', '')
+                try:
+                    numeric_price = float(price_str_cleaned)
+                except ValueError:
+                    logger.warning(f"No se pudo convertir '{price_str_cleaned}' a número para el producto '{name}'")
+                    numeric_price = None
+
+        if name != "Nombre no encontrado" and numeric_price is not None:
+            logger.debug(f"  - Producto scrapeado: {name}: {currency} {numeric_price}")
+            return {
+                "name": name,
+                "price": numeric_price,
+                "currency": currency,
+                "site": self.site_name,
+                "url": product_url
+            }
+        logger.info(f"  - Producto omitido (datos incompletos): Nombre='{name}', PrecioTexto='{price_text}'")
+        return None
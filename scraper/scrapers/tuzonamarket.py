@@ -1,7 +1,11 @@
+import asyncio
 import requests
 import time
 import logging
 from .base import BaseScraper 
+from ..http_engine import AsyncHttpFetcher
+from config import (TUZONA_HTTP_ENGINE, TUZONA_MAX_CONCURRENCY, TUZONA_RATE_PER_SECOND,
+                    TUZONA_MAX_RETRIES, TUZONA_MAX_EMPTY_PAGES, TUZONA_MAX_FAILED_PAGES, TUZONA_MAX_PAGES)
 
 logger = logging.getLogger(__name__)
 
@@ -24,10 +28,15 @@ class TuzonaMarketScraper(BaseScraper):
         'Sabores del Mundo' ,'Asia', 'Europa', 'Medio Oriente','Lavado de Ropa'
     }
 
-    def __init__(self):
-        """Inicializa el scraper con el nombre del sitio."""
+    DEFAULT_BASE_API_URL = "https://api.tuzonamarket.com/api/categoria/supermercado/2?pag="
+
+    def __init__(self, base_api_url=None):
+        """
+        Inicializa el scraper con el nombre del sitio.
+        'base_api_url' permite apuntar a otro servidor (p. ej. un stub local con páginas grabadas).
+        """
         super().__init__("Tuzona Market")
-        self.base_api_url = "https://api.tuzonamarket.com/api/categoria/supermercado/2?pag="
+        self.base_api_url = base_api_url or self.DEFAULT_BASE_API_URL
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
@@ -107,42 +116,207 @@ class TuzonaMarketScraper(BaseScraper):
 
   
 
-    def scrape(self, start_page=1, end_page=135, delay_between_requests=1):
+    def scrape(self, start_page=1, end_page=None, delay_between_requests=1, engine=TUZONA_HTTP_ENGINE):
         """
-        Realiza el scraping de la API de Tuzona Market página por página.
+        Realiza el scraping de la API de Tuzona Market.
+
+        La última página se toma de los metadatos de paginación de la primera respuesta
+        ('producto.last_page', o 'total' / 'per_page'). Si la API no los incluye, se avanza
+        hasta encontrar TUZONA_MAX_EMPTY_PAGES páginas vacías consecutivas.
         
         Args:
             start_page (int): La página por la que empezar.
-            end_page (int): La última página a scrapear.
-            delay_between_requests (int): Segundos de espera entre peticiones.
+            end_page (int, optional): Última página a scrapear como máximo. None usa la detectada.
+            delay_between_requests (int): Segundos de espera entre peticiones (sólo motor 'sequential').
+            engine (str): 'async' descarga las páginas de forma concurrente con AsyncHttpFetcher;
+                          'sequential' las descarga una a una con pausas fijas.
 
         Returns:
             list: Una lista de diccionarios, cada uno representando un producto.
         """
-        logger.info(f"Iniciando scraping para {self.site_name} desde la página {start_page} hasta la {end_page}.")
+        if engine == 'async':
+            return asyncio.run(self._scrape_async(start_page, end_page))
+        return self._scrape_sequential(start_page, end_page, delay_between_requests)
+
+    @staticmethod
+    def _page_items(api_data):
+        """Devuelve la lista cruda de productos de la respuesta de una página."""
+        return ((api_data or {}).get('producto') or {}).get('data') or []
+
+    @staticmethod
+    def _last_page_from_metadata(api_data):
+        """
+        Obtiene la última página a partir de los campos de paginación de 'producto'.
+        Devuelve None si la respuesta no los incluye.
+        """
+        paging = (api_data or {}).get('producto') or {}
+        try:
+            if paging.get('last_page') is not None:
+                return int(paging['last_page'])
+            if paging.get('total') is not None and paging.get('per_page'):
+                return max(1, -(-int(paging['total']) // int(paging['per_page'])))
+        except (TypeError, ValueError):
+            logger.warning(f"Metadatos de paginación no válidos: { {k: v for k, v in paging.items() if k != 'data'} }")
+        return None
+
+    def _resolve_last_page(self, first_page_data, end_page):
+        """Combina la última página detectada con el límite 'end_page' opcional."""
+        last_page = self._last_page_from_metadata(first_page_data)
+        if last_page is None:
+            return end_page
+        if end_page is not None and end_page < last_page:
+            return end_page
+        return last_page
+
+    def _page_url(self, page_num):
+        return f"{self.base_api_url}{page_num}"
+
+    def _parse_page(self, page_num, api_data, response_headers=None):
+        """
+        Parsea los productos de la respuesta de una página de la API. Si la página no cambió
+        desde la ejecución anterior (ver PageChangeTracker) devuelve los marcadores sin parsear.
+        """
+        products_list = self._page_items(api_data)
+        if not products_list:
+            logger.warning(f"No se encontraron productos en la página {page_num}. Podría ser el final.")
+            return []
+
+        def parse():
+            logger.info(f"Procesando {len(products_list)} productos de la página {page_num}...")
+            page_data = []
+            for item in products_list:
+                product_dict = self._parse_product_data(item)
+                if product_dict:
+                    page_data.append(product_dict)
+                    logger.debug(f"  - Producto scrapeado: {product_dict['name']}")
+            return page_data
+
+        response_headers = response_headers or {}
+        return self._track_page(self._page_url(page_num), products_list, parse,
+                                etag=response_headers.get('ETag'), last_modified=response_headers.get('Last-Modified'))
+
+    async def _scrape_async(self, start_page, end_page):
+        """
+        Descarga las páginas con un pool keep-alive, concurrencia acotada, limitador de tasa y
+        reintentos, parseando cada página en cuanto llega. El resultado se ensambla en orden de página.
+        """
+        logger.info(f"Iniciando scraping asíncrono para {self.site_name} desde la página {start_page}.")
+        start = time.perf_counter()
+        pages_data = {}
+
+        async def keep(page_num, page_items):
+            # Con sink cada página se entrega en cuanto se parsea, sin acumularla.
+            if self.batch_sink is None:
+                pages_data[page_num] = page_items
+            else:
+                await asyncio.to_thread(self.emit_batch, page_items)
+
+        async with AsyncHttpFetcher(headers=self.headers, max_concurrency=TUZONA_MAX_CONCURRENCY,
+                                    rate_per_second=TUZONA_RATE_PER_SECOND,
+                                    max_retries=TUZONA_MAX_RETRIES) as fetcher:
+            async def fetch_page(page_num, conditional=True):
+                """
+                Devuelve (página, JSON, tiene productos, productos). Las páginas distintas de la
+                primera (que aporta los metadatos de paginación) se piden de forma condicional;
+                una respuesta 304 arrastra los productos de la ejecución anterior sin parsear.
+                """
+                url = self._page_url(page_num)
+                headers = self.change_tracker.conditional_headers(url) if conditional and self.change_tracker else None
+                status, response_headers, api_data = await fetcher.fetch(url, headers=headers or None)
+                if status == 304:
+                    has_items = self.change_tracker.previous_item_count(url) > 0
+                    return page_num, None, has_items, self.change_tracker.carry_forward(
+                        url, response_headers.get('ETag'), response_headers.get('Last-Modified'))
+                if api_data is None:
+                    return page_num, None, None, None
+                return (page_num, api_data, bool(self._page_items(api_data)),
+                        self._parse_page(page_num, api_data, response_headers))
+
+            _, first_page_data, _, first_page_items = await fetch_page(start_page, conditional=False)
+            if first_page_items is not None:
+                await keep(start_page, first_page_items)
+            last_page = self._resolve_last_page(first_page_data, end_page)
+
+            if last_page is not None:
+                logger.info(f"{self.site_name}: última página {last_page}. Descargando {max(0, last_page - start_page)} páginas restantes.")
+                tasks = [asyncio.create_task(fetch_page(page_num)) for page_num in range(start_page + 1, last_page + 1)]
+                for next_page in asyncio.as_completed(tasks):
+                    page_num, _, _, page_items = await next_page
+                    if page_items is not None:
+                        await keep(page_num, page_items)
+            else:
+                logger.info(f"{self.site_name}: la API no informa la paginación. Avanzando hasta "
+                            f"{TUZONA_MAX_EMPTY_PAGES} páginas vacías consecutivas.")
+                consecutive_empty = 0 if self._page_items(first_page_data) or first_page_data is None else 1
+                # Las páginas fallidas (tras los reintentos) no cuentan como vacías ni reinician ese
+                # contador; si la API no responde se aborta en lugar de recorrer TUZONA_MAX_PAGES.
+                consecutive_failed = 0 if first_page_data is not None else 1
+                next_page_num = start_page + 1
+                while (consecutive_empty < TUZONA_MAX_EMPTY_PAGES and consecutive_failed < TUZONA_MAX_FAILED_PAGES
+                       and next_page_num <= TUZONA_MAX_PAGES):
+                    window = range(next_page_num, min(next_page_num + TUZONA_MAX_CONCURRENCY, TUZONA_MAX_PAGES + 1))
+                    results = await asyncio.gather(*(fetch_page(page_num) for page_num in window))
+                    for page_num, _, has_items, page_items in results:
+                        if page_items is None:
+                            consecutive_failed += 1
+                            if consecutive_failed >= TUZONA_MAX_FAILED_PAGES:
+                                logger.error(f"{self.site_name}: {consecutive_failed} páginas consecutivas fallidas "
+                                             f"(hasta la {page_num}). Se aborta el recorrido; el catálogo puede estar incompleto.")
+                                break
+                            continue
+                        consecutive_failed = 0
+                        if has_items:
+                            consecutive_empty = 0
+                            await keep(page_num, page_items)
+                        else:
+                            consecutive_empty += 1
+                            if consecutive_empty >= TUZONA_MAX_EMPTY_PAGES:
+                                break
+                    next_page_num = window.stop
+
+        scraped_data = [item for page_num in sorted(pages_data) for item in pages_data[page_num]]
+        logger.info(f"Scraping para {self.site_name} completado en {time.perf_counter() - start:.1f}s. "
+                    f"Total de datos obtenidos: {len(scraped_data) + self.items_emitted} items ({fetcher.requests_sent} peticiones, "
+                    f"{fetcher.retries} reintentos).")
+        return scraped_data
+
+    def _scrape_sequential(self, start_page, end_page, delay_between_requests):
+        """
+        Descarga las páginas una a una con una pausa fija entre peticiones, hasta la última
+        página detectada o hasta encontrar páginas vacías consecutivas.
+        """
+        logger.info(f"Iniciando scraping para {self.site_name} desde la página {start_page}.")
         scraped_data = []
+        last_page = end_page if end_page is not None else TUZONA_MAX_PAGES
+        consecutive_empty = 0
+        consecutive_failed = 0
 
-        for page_num in range(start_page, end_page + 1):
+        page_num = start_page
+        while (page_num <= last_page and consecutive_empty < TUZONA_MAX_EMPTY_PAGES
+               and consecutive_failed < TUZONA_MAX_FAILED_PAGES):
             url_to_scrape = f"{self.base_api_url}{page_num}"
-            logger.info(f"Scrapeando página {page_num}/{end_page} - URL: {url_to_scrape}")
+            logger.info(f"Scrapeando página {page_num}/{last_page} - URL: {url_to_scrape}")
 
+            page_failed = True
             try:
                 response = requests.get(url_to_scrape, headers=self.headers, timeout=15)
                 response.raise_for_status() 
                 
                 api_data = response.json()
-                products_list = api_data.get('producto', {}).get('data', [])
+                page_failed = False
+                if page_num == start_page:
+                    last_page = self._resolve_last_page(api_data, end_page) or last_page
+                products_list = self._page_items(api_data)
 
                 if not products_list:
+                    consecutive_empty += 1
                     logger.warning(f"No se encontraron productos en la página {page_num}. Podría ser el final.")
                     continue
 
-                logger.info(f"Procesando {len(products_list)} productos de la página {page_num}...")
-                for item in products_list:
-                    product_dict = self._parse_product_data(item)
-                    if product_dict:
-                        scraped_data.append(product_dict)
-                        logger.debug(f"  - Producto scrapeado: {product_dict['name']}")
+                consecutive_empty = 0
+                page_items = self._parse_page(page_num, api_data, response.headers)
+                if not self.emit_batch(page_items):
+                    scraped_data.extend(page_items)
 
             except requests.exceptions.HTTPError as e:
                 logger.error(f"Error HTTP en página {page_num}: {e}")
@@ -153,9 +327,13 @@ class TuzonaMarketScraper(BaseScraper):
             except ValueError as e: # Error decodificando JSON
                 logger.error(f"Error decodificando JSON en página {page_num}: {e}. Respuesta: {response.text[:200]}...")
             finally:
+                consecutive_failed = consecutive_failed + 1 if page_failed else 0
+                page_num += 1
                 logger.debug(f"Esperando {delay_between_requests} segundos...")
                 time.sleep(delay_between_requests)
         
-        logger.info(f"Scraping para {self.site_name} completado. Total de datos obtenidos: {len(scraped_data)} items.")
+        if consecutive_failed >= TUZONA_MAX_FAILED_PAGES:
+            logger.error(f"{self.site_name}: {consecutive_failed} páginas consecutivas fallidas. Se abortó el recorrido; "
+                         f"el catálogo puede estar incompleto.")
+        logger.info(f"Scraping para {self.site_name} completado. Total de datos obtenidos: {len(scraped_data) + self.items_emitted} items.")
         return scraped_data
-
@@ -10,20 +10,61 @@ except ImportError:
     CHROME_DRIVER_EXECUTABLE_PATH = None
     CHROME_BROWSER_PATH = None
 
+try:
+    from config import WEBDRIVER_PROFILE, WEBDRIVER_LEAN_WINDOW_SIZE
+except ImportError:
+    WEBDRIVER_PROFILE = "full"
+    WEBDRIVER_LEAN_WINDOW_SIZE = "1280,900"
+
+# Recursos que el perfil 'lean' bloquea con Network.setBlockedURLs: imágenes rasterizadas,
+# audio/video, fuentes y rastreadores de terceros. Los SVG se permiten porque algunos
+# indicadores de carga que esperan los scrapers son SVG.
+LEAN_BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.ico", "*.bmp",
+    "*.mp4", "*.webm", "*.ogg", "*.mp3", "*.wav", "*.m3u8",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*googlesyndication.com*",
+    "*facebook.net*", "*connect.facebook.com*", "*hotjar.com*", "*clarity.ms*", "*tiktok.com*",
+]
+# Preferencias de contenido del perfil 'lean' (2 = bloquear). Las imágenes no se bloquean aquí
+# (ni con --blink-settings=imagesEnabled=false) porque eso incluiría los SVG: basta con
+# LEAN_BLOCKED_URL_PATTERNS.
+LEAN_CONTENT_SETTINGS = {
+    "profile.managed_default_content_settings.media_stream": 2,
+    "profile.managed_default_content_settings.notifications": 2,
+    "profile.managed_default_content_settings.geolocation": 2,
+}
+
 
 class WebDriverManager:
-    def __init__(self, driver_executable_path=CHROME_DRIVER_EXECUTABLE_PATH, browser_path=CHROME_BROWSER_PATH):
+    def __init__(self, driver_executable_path=CHROME_DRIVER_EXECUTABLE_PATH, browser_path=CHROME_BROWSER_PATH,
+                 capture_network=False, profile=WEBDRIVER_PROFILE):
+        """
+        Args:
+            profile (str): 'full' abre Chrome maximizado y con todos los recursos; 'lean' lo abre
+                           headless, con ventana pequeña, sin extensiones y bloqueando imágenes,
+                           multimedia, fuentes y rastreadores para reducir memoria y tiempo de carga.
+            capture_network (bool): Habilita el registro 'performance' para que los scrapers
+                                    puedan leer los eventos de red por CDP (BaseScraper.scrape_via_network).
+        """
         self.driver_executable_path = driver_executable_path
         self.browser_path = browser_path
+        self.capture_network = capture_network
+        self.profile = profile
         self.driver = None
 
     def start_driver(self):
         chrome_options = Options()
-        chrome_options.add_argument("--start-maximized")
+        if self.profile == "lean":
+            self._apply_lean_options(chrome_options)
+        else:
+            chrome_options.add_argument("--start-maximized")
         chrome_options.add_argument("--disable-gpu")
         chrome_options.add_argument("--no-sandbox")
         chrome_options.add_argument("--disable-dev-shm-usage")
         chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.212 Safari/537.36")
+        if self.capture_network:
+            chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
 
         if self.browser_path and os.path.exists(self.browser_path):
             chrome_options.binary_location = self.browser_path
@@ -44,8 +85,6 @@ class WebDriverManager:
 
         try:
             self.driver = webdriver.Chrome(service=service, options=chrome_options)
-            print("WebDriver iniciado correctamente.")
-            return self.driver
         except Exception as e:
             print(f"Error al iniciar WebDriver: {e}")
             print("Asegúrate de que ChromeDriver esté en el PATH o que CHROME_DRIVER_EXECUTABLE_PATH sea correcto y compatible con tu versión de Chrome.")
@@ -55,6 +94,35 @@ class WebDriverManager:
                 print(f"Path del navegador Chrome: {self.browser_path}")
             return None
 
+        if self.profile == "lean":
+            try:
+                self.driver.execute_cdp_cmd("Network.enable", {})
+                self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": LEAN_BLOCKED_URL_PATTERNS})
+            except Exception as e:
+                # Chrome ya está corriendo: se cierra para no dejar un navegador huérfano.
+                print(f"Error al configurar el bloqueo de recursos del perfil 'lean': {e}")
+                try:
+                    self.driver.quit()
+                except Exception as quit_error:
+                    print(f"Error al cerrar WebDriver: {quit_error}")
+                self.driver = None
+                return None
+        print(f"WebDriver iniciado correctamente (perfil '{self.profile}').")
+        return self.driver
+
+    @staticmethod
+    def _apply_lean_options(chrome_options):
+        chrome_options.add_argument("--headless=new")
+        chrome_options.add_argument(f"--window-size={WEBDRIVER_LEAN_WINDOW_SIZE}")
+        chrome_options.add_argument("--disable-extensions")
+        chrome_options.add_argument("--disable-background-networking")
+        chrome_options.add_argument("--disable-component-update")
+        chrome_options.add_argument("--disable-default-apps")
+        chrome_options.add_argument("--disable-sync")
+        chrome_options.add_argument("--mute-audio")
+        chrome_options.add_argument("--no-first-run")
+        chrome_options.add_experimental_option("prefs", LEAN_CONTENT_SETTINGS)
+
     def stop_driver(self):
         if self.driver:
             self.driver.quit()
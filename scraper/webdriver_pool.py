@@ -0,0 +1,249 @@
+import atexit
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from .webdriver_manager import WebDriverManager
+from config import WEBDRIVER_POOL_SIZE, WEBDRIVER_POOL_MAX_PAGES, WEBDRIVER_POOL_ACQUIRE_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+# Pool dueño de cada driver, para que los scrapers informen las páginas cargadas sin
+# conocer el pool (ver record_page_load).
+_driver_owners = {}
+
+
+def _origin_of(url):
+    parts = urlsplit(url or "")
+    if parts.scheme not in ("http", "https") or not parts.netloc:
+        return None
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+class WebDriverPool:
+    """
+    Pool de sesiones de Chrome ya iniciadas que los scrapers toman prestadas y devuelven.
+
+    Al devolver un driver se borran las cookies y todo el almacenamiento de los orígenes
+    visitados y se navega a about:blank, de modo que la siguiente tarea empieza limpia pero
+    sin pagar el arranque de Chrome. Antes de prestarlo se comprueba que la sesión responda;
+    si no, se reemplaza. Cada driver se recicla (se cierra y se abre uno nuevo) después de
+    'max_pages' páginas cargadas (navegaciones y pasos de scroll o "Cargar más" informados
+    con record_page_load) para acotar las fugas de memoria del navegador.
+
+    Args:
+        size (int): Número de sesiones de Chrome.
+        max_pages (int): Páginas servidas antes de reciclar un driver.
+        acquire_timeout (float): Segundos de espera por un driver libre.
+        manager_kwargs (dict, optional): Argumentos para cada WebDriverManager.
+    """
+    def __init__(self, size=WEBDRIVER_POOL_SIZE, max_pages=WEBDRIVER_POOL_MAX_PAGES,
+                 acquire_timeout=WEBDRIVER_POOL_ACQUIRE_TIMEOUT, manager_kwargs=None):
+        self.size = size
+        self.max_pages = max_pages
+        self.acquire_timeout = acquire_timeout
+        self.manager_kwargs = manager_kwargs or {}
+        self._idle = queue.LifoQueue()
+        self._managers = {}
+        self._pages = {}
+        self._loan_pages = {}
+        self._origins = {}
+        self._lock = threading.Lock()
+        self._starting = 0
+        self._closed = False
+
+    def start(self):
+        """Inicia las 'size' sesiones. Las que no logran iniciarse se reintentan al pedir un driver."""
+        for _ in range(self.size):
+            driver = self._create_driver()
+            if driver is not None:
+                self._idle.put(driver)
+        logger.info(f"Pool de WebDriver iniciado con {self._idle.qsize()}/{self.size} sesiones.")
+        return self
+
+    def _create_driver(self):
+        manager = WebDriverManager(**self.manager_kwargs)
+        driver = manager.start_driver()
+        if driver is None:
+            logger.error("No se pudo iniciar una sesión de Chrome para el pool.")
+            return None
+        with self._lock:
+            self._managers[id(driver)] = manager
+            self._pages[id(driver)] = 0
+            self._loan_pages[id(driver)] = 0
+            self._origins[id(driver)] = set()
+            _driver_owners[id(driver)] = self
+        return driver
+
+    def _discard_driver(self, driver):
+        with self._lock:
+            manager = self._managers.pop(id(driver), None)
+            self._pages.pop(id(driver), None)
+            self._loan_pages.pop(id(driver), None)
+            self._origins.pop(id(driver), None)
+            if _driver_owners.get(id(driver)) is self:
+                del _driver_owners[id(driver)]
+        if manager is not None:
+            try:
+                manager.stop_driver()
+            except Exception as e:
+                logger.warning(f"Error al cerrar una sesión del pool: {e}")
+
+    def _replace_driver(self, driver):
+        self._discard_driver(driver)
+        return self._create_driver()
+
+    def _reserve_slot(self):
+        """Reserva lugar para una sesión nueva si el pool tiene menos de 'size' sesiones."""
+        with self._lock:
+            if len(self._managers) + self._starting >= self.size:
+                return False
+            self._starting += 1
+            return True
+
+    def _release_slot(self):
+        with self._lock:
+            self._starting -= 1
+
+    @staticmethod
+    def _is_healthy(driver):
+        try:
+            return driver.execute_script("return 1;") == 1
+        except Exception:
+            return False
+
+    def record_pages(self, driver, pages=1, url=None):
+        """Suma 'pages' páginas al préstamo actual de 'driver' y anota el origen de 'url'."""
+        origin = _origin_of(url)
+        with self._lock:
+            if id(driver) not in self._managers:
+                return
+            self._loan_pages[id(driver)] += pages
+            if origin:
+                self._origins[id(driver)].add(origin)
+
+    def _reset_driver(self, driver):
+        """
+        Borra cookies de todos los dominios y, por CDP, todo el almacenamiento (localStorage,
+        IndexedDB, service workers, caché...) de cada origen visitado y del origen actual.
+        """
+        with self._lock:
+            origins = self._origins.get(id(driver), set())
+            self._origins[id(driver)] = set()
+        current = _origin_of(driver.current_url)
+        if current:
+            origins.add(current)
+        for origin in sorted(origins):
+            driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+        driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        driver.get("about:blank")
+
+    def acquire(self):
+        """
+        Presta un driver sano. Si no hay uno libre en 'acquire_timeout' segundos, o no se
+        puede reemplazar uno caído, devuelve None (igual que WebDriverManager.start_driver).
+        """
+        if self._closed:
+            raise RuntimeError("El pool de WebDriver está cerrado.")
+        try:
+            driver = self._idle.get_nowait()
+        except queue.Empty:
+            if self._reserve_slot():
+                try:
+                    return self._create_driver()
+                finally:
+                    self._release_slot()
+            try:
+                driver = self._idle.get(timeout=self.acquire_timeout)
+            except queue.Empty:
+                logger.error(f"No hubo un WebDriver libre en {self.acquire_timeout}s.")
+                return None
+
+        if not self._is_healthy(driver):
+            logger.warning("Sesión del pool sin respuesta. Se reemplaza.")
+            driver = self._replace_driver(driver)
+        return driver
+
+    def release(self, driver, pages=0):
+        """
+        Devuelve un driver al pool. A las páginas informadas durante el préstamo (ver
+        record_page_load) se suman 'pages'; un préstamo cuenta al menos como una página.
+        Al alcanzar 'max_pages' el driver se recicla.
+        """
+        if driver is None:
+            return
+        with self._lock:
+            loaned = self._loan_pages.get(id(driver), 0) + pages
+            self._loan_pages[id(driver)] = 0
+            self._pages[id(driver)] = self._pages.get(id(driver), 0) + max(loaned, 1)
+            served = self._pages[id(driver)]
+
+        if self._closed:
+            self._discard_driver(driver)
+            return
+        if served >= self.max_pages:
+            logger.info(f"Reciclando sesión del pool después de {served} páginas.")
+            driver = self._replace_driver(driver)
+        else:
+            try:
+                self._reset_driver(driver)
+            except Exception as e:
+                logger.warning(f"No se pudo limpiar la sesión del pool ({e}). Se reemplaza.")
+                driver = self._replace_driver(driver)
+        if driver is not None:
+            self._idle.put(driver)
+
+    @contextmanager
+    def driver(self, pages=0):
+        """Context manager que presta un driver (o None) y lo devuelve al salir."""
+        driver = self.acquire()
+        try:
+            yield driver
+        finally:
+            self.release(driver, pages)
+
+    def close(self):
+        """Cierra todas las sesiones. Las prestadas se cierran al devolverse."""
+        self._closed = True
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard_driver(driver)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def record_page_load(driver, url=None, pages=1):
+    """
+    Informa al pool dueño de 'driver' que se cargaron 'pages' páginas (una navegación a 'url'
+    o un paso de scroll / "Cargar más"). No hace nada si el driver no pertenece a un pool.
+    """
+    owner = _driver_owners.get(id(driver))
+    if owner is not None:
+        owner.record_pages(driver, pages, url)
+
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_shared_pool(**manager_kwargs):
+    """
+    Devuelve el pool compartido por todas las ejecuciones del proceso, creándolo la primera
+    vez. Devuelve None si WEBDRIVER_POOL_SIZE es 0 (cada tarea abre su propio WebDriver).
+    """
+    global _shared_pool
+    if WEBDRIVER_POOL_SIZE <= 0:
+        return None
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = WebDriverPool(manager_kwargs=manager_kwargs).start()
+            atexit.register(_shared_pool.close)
+        return _shared_pool